@@ -0,0 +1,397 @@
+"""
+Benchmark por endpoint de las apps FastAPI (gateway, auth y
+transacciones), sin red: cada petición entra a la app por
+httpx.ASGITransport.
+
+Dobles (ver servicios.py): SQLite por servicio en lugar de MySQL, un
+publicador nulo en lugar de RabbitMQ y, para el gateway, un transporte
+que enruta por host hacia las apps de auth y transacciones. Los casos
+del gateway pasan por la validación real del token contra auth.
+
+Se ejecuta desde backend/ con las dependencias de los servicios instaladas:
+
+    python -m benchmarks.endpoints [--segundos 3] [--concurrencia 1,16]
+    python -m benchmarks.endpoints --filtro auth. --base a1b2c3d --umbral 0.15
+
+Por caso y nivel de concurrencia mide peticiones/s y latencia p50/p95/p99;
+aparte, con tracemalloc y peticiones secuenciales, la memoria pico
+asignada por petición (KiB). Cada corrida se guarda en
+benchmarks/resultados/endpoints/<commit>.json y se compara con --base o
+con la corrida más reciente de otro commit: una caída de peticiones/s
+mayor que --umbral es regresión (código de salida 1).
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import httpx
+
+from .servicios import PublicadorNulo, TransporteRuteado, cargar, preparar_entorno, usar_sqlite
+
+RESULTADOS = Path(__file__).parent / "resultados" / "endpoints"
+CLAVE = "Password123!"
+
+_secuencia = itertools.count(1)
+
+
+def _revision() -> str:
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        sucio = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "sin-git"
+    return f"{rev}-dirty" if sucio else rev
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+class Apps:
+    """Las tres apps cargadas en este proceso, con un cliente ASGI por app."""
+
+    def __init__(self, directorio: Path):
+        preparar_entorno(directorio)
+        auth = cargar("auth", ["app.main"])
+        transacciones = cargar("transacciones", ["app.main"])
+        gateway = cargar("gateway", ["main"])
+
+        usar_sqlite(auth["app.database"], directorio / "auth.db")
+        usar_sqlite(transacciones["app.database"], directorio / "transacciones.db")
+
+        self.publicador = PublicadorNulo()
+        self.modulos_transacciones = transacciones
+        app_transacciones = transacciones["app.main"].app
+        app_transacciones.dependency_overrides[transacciones["app.dependencies"].get_publisher] = \
+            lambda: self.publicador
+        gateway["security"].transporte_servicios = TransporteRuteado({
+            "auth_service": auth["app.main"].app,
+            "transactions_service": app_transacciones,
+        })
+
+        def cliente(app, host: str) -> httpx.AsyncClient:
+            return httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+                base_url=f"http://{host}",
+                timeout=60.0,
+            )
+
+        self.auth = cliente(auth["app.main"].app, "auth_service")
+        self.transacciones = cliente(app_transacciones, "transactions_service")
+        self.gateway = cliente(gateway["main"].app, "gateway")
+
+    async def cerrar(self):
+        for cliente in (self.auth, self.transacciones, self.gateway):
+            await cliente.aclose()
+
+    def transacciones_pendientes(self, cantidad: int) -> list[int]:
+        """Inserta transacciones PENDING directo en la BD (sin publicarlas); retorna sus IDs."""
+        database = self.modulos_transacciones["app.database"]
+        Transaction = self.modulos_transacciones["app.models.transaccion_model"].Transaction
+        with database.SessionLocal() as db:
+            filas = [Transaction(**_transaccion()) for _ in range(cantidad)]
+            db.add_all(filas)
+            db.flush()
+            ids = [fila.id for fila in filas]
+            db.commit()
+        return ids
+
+    async def registrar(self) -> dict:
+        """Usuario nuevo; retorna sus tokens."""
+        n = next(_secuencia)
+        respuesta = await self.auth.post("/api/auth/register", json={
+            "email": f"bench{n}@ejemplo.com", "username": f"bench{n}", "password": CLAVE,
+        })
+        respuesta.raise_for_status()
+        return {"email": f"bench{n}@ejemplo.com", **respuesta.json()["tokens"]}
+
+
+def _transaccion() -> dict:
+    n = next(_secuencia)
+    return {
+        "cuenta_origen": f"ACC-{n % 5000:08d}",
+        "cuenta_destino": f"ACC-{(n * 7) % 5000:08d}",
+        "monto": float(50 + n % 900),
+        "ubicacion": "La Paz",
+    }
+
+
+# --- Casos ---
+# Cada caso prepara sus datos para 'trabajadores' clientes concurrentes y
+# retorna (código esperado, función async(trabajador) -> Response).
+
+CASOS = {}
+
+
+def caso(nombre: str):
+    def registrar(funcion):
+        CASOS[nombre] = funcion
+        return funcion
+    return registrar
+
+
+def _registro(cliente_attr: str):
+    async def preparar(apps: Apps, trabajadores: int):
+        cliente = getattr(apps, cliente_attr)
+
+        async def peticion(_):
+            n = next(_secuencia)
+            return await cliente.post("/api/auth/register", json={
+                "email": f"nuevo{n}@ejemplo.com", "username": f"nuevo{n}", "password": CLAVE,
+            })
+        return (201 if cliente_attr == "auth" else 200), peticion
+    return preparar
+
+
+def _login(cliente_attr: str):
+    async def preparar(apps: Apps, trabajadores: int):
+        cliente = getattr(apps, cliente_attr)
+        usuarios = [await apps.registrar() for _ in range(trabajadores)]
+
+        async def peticion(t):
+            return await cliente.post("/api/auth/login", json={"email": usuarios[t]["email"], "password": CLAVE})
+        return 200, peticion
+    return preparar
+
+
+def _refresh(cliente_attr: str):
+    async def preparar(apps: Apps, trabajadores: int):
+        cliente = getattr(apps, cliente_attr)
+        # Cada refresh revoca el token usado: cada trabajador encadena el suyo
+        tokens = [(await apps.registrar())["refresh_token"] for _ in range(trabajadores)]
+
+        async def peticion(t):
+            respuesta = await cliente.post("/api/auth/refresh", json={"refresh_token": tokens[t]})
+            if respuesta.status_code == 200:
+                tokens[t] = respuesta.json()["refresh_token"]
+            return respuesta
+        return 200, peticion
+    return preparar
+
+
+def _me(cliente_attr: str):
+    async def preparar(apps: Apps, trabajadores: int):
+        cliente = getattr(apps, cliente_attr)
+        encabezados = [
+            {"Authorization": f"Bearer {(await apps.registrar())['access_token']}"} for _ in range(trabajadores)
+        ]
+
+        async def peticion(t):
+            return await cliente.get("/api/auth/me", headers=encabezados[t])
+        return 200, peticion
+    return preparar
+
+
+caso("auth.register")(_registro("auth"))
+caso("auth.login")(_login("auth"))
+caso("auth.refresh")(_refresh("auth"))
+caso("auth.me")(_me("auth"))
+
+
+@caso("transacciones.create")
+async def _(apps: Apps, trabajadores: int):
+    async def peticion(_):
+        return await apps.transacciones.post("/transactions/", json=_transaccion())
+    return 201, peticion
+
+
+@caso("transacciones.status")
+async def _(apps: Apps, trabajadores: int):
+    # Cada PATCH decide una transacción pendiente distinta. Si la ronda da
+    # la vuelta, repite la misma decisión (200 sin escribir): otra daría 409
+    ids = apps.transacciones_pendientes(20_000)
+    ronda = itertools.count()
+
+    async def peticion(_):
+        i = next(ronda) % len(ids)
+        return await apps.transacciones.patch(
+            f"/transactions/{ids[i]}/status",
+            json={"status": "REJECTED" if i % 7 == 0 else "APPROVED", "reglas_activadas": 1 if i % 7 == 0 else 0},
+        )
+    return 200, peticion
+
+
+caso("gateway.register")(_registro("gateway"))
+caso("gateway.login")(_login("gateway"))
+caso("gateway.refresh")(_refresh("gateway"))
+caso("gateway.me")(_me("gateway"))
+
+
+@caso("gateway.create_transaction")
+async def _(apps: Apps, trabajadores: int):
+    encabezados = [
+        {"Authorization": f"Bearer {(await apps.registrar())['access_token']}"} for _ in range(trabajadores)
+    ]
+
+    async def peticion(t):
+        return await apps.gateway.post("/transactions/", json=_transaccion(), headers=encabezados[t])
+    return 200, peticion
+
+
+# --- Medición ---
+
+async def medir(apps: Apps, preparar, concurrencia: int, segundos: float, muestras_memoria: int) -> dict:
+    esperado, peticion = await preparar(apps, concurrencia)
+    for _ in range(3):  # calentamiento
+        await peticion(0)
+
+    latencias: list[float] = []
+    errores = 0
+    fin = time.perf_counter() + segundos
+
+    async def trabajador(t: int):
+        nonlocal errores
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            respuesta = await peticion(t)
+            latencias.append(time.perf_counter() - inicio)
+            if respuesta.status_code != esperado:
+                errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador(t) for t in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+
+    # Memoria pico por petición, secuencial (tracemalloc sigue todos los hilos)
+    picos = []
+    tracemalloc.start()
+    try:
+        for _ in range(muestras_memoria):
+            base, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await peticion(0)
+            _, pico = tracemalloc.get_traced_memory()
+            picos.append(pico - base)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "peticiones": len(latencias),
+        "errores": errores,
+        "rps": round(len(latencias) / duracion, 1),
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        "kib_pico_por_peticion": round(statistics.fmean(picos) / 1024, 1) if picos else None,
+    }
+
+
+def _cargar_base(revision_actual: str, base: str | None) -> dict | None:
+    if base:
+        ruta = RESULTADOS / f"{base}.json"
+        if not ruta.exists():
+            raise SystemExit(f"No hay resultados guardados para {base} en {RESULTADOS}")
+        return json.loads(ruta.read_text())
+    anteriores = sorted(
+        (r for r in RESULTADOS.glob("*.json") if r.stem != revision_actual),
+        key=lambda r: r.stat().st_mtime,
+    )
+    return json.loads(anteriores[-1].read_text()) if anteriores else None
+
+
+def comparar(actual: dict, base: dict, umbral: float) -> list[str]:
+    """Compara peticiones/s caso por caso; retorna los casos con regresión."""
+    regresiones = []
+    print(f"\n📊 Comparación con {base['revision']} ({base['fecha']}), umbral {umbral:.0%}")
+    for nombre, medida in actual["casos"].items():
+        anterior = base["casos"].get(nombre)
+        if anterior is None or not anterior["rps"]:
+            print(f"   {nombre:<34} {medida['rps']:>9.1f} req/s  (nuevo)")
+            continue
+        cambio = medida["rps"] / anterior["rps"] - 1
+        marca = "  "
+        if cambio < -umbral:
+            marca = "❌"
+            regresiones.append(nombre)
+        elif cambio > umbral:
+            marca = "🚀"
+        print(f" {marca} {nombre:<34} {anterior['rps']:>9.1f} -> {medida['rps']:>9.1f} req/s  ({cambio:+.1%})")
+    return regresiones
+
+
+async def ejecutar(args) -> dict:
+    niveles = [int(c) for c in args.concurrencia.split(",")]
+    resultado = {
+        "revision": _revision(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "segundos": args.segundos,
+        "casos": {},
+    }
+    with tempfile.TemporaryDirectory() as directorio:
+        # Los servicios imprimen y loguean por petición: se silencian
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            apps = Apps(Path(directorio))
+        try:
+            for nombre, preparar in CASOS.items():
+                if args.filtro not in nombre:
+                    continue
+                for concurrencia in niveles:
+                    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+                        logging.disable(logging.CRITICAL)
+                        try:
+                            medida = await medir(apps, preparar, concurrencia, args.segundos, args.muestras_memoria)
+                        finally:
+                            logging.disable(logging.NOTSET)
+                    clave = f"{nombre}@c{concurrencia}"
+                    resultado["casos"][clave] = medida
+                    print(f"   {clave:<34} {medida['rps']:>9.1f} req/s | p50 {medida['p50_ms']:>8} ms | "
+                          f"p95 {medida['p95_ms']:>8} ms | p99 {medida['p99_ms']:>8} ms | "
+                          f"{medida['kib_pico_por_peticion']} KiB/pet"
+                          + (f" | ❌ {medida['errores']} errores" if medida["errores"] else ""))
+        finally:
+            await apps.cerrar()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segundos", type=float, default=3.0, help="Duración de cada caso y nivel")
+    parser.add_argument("--concurrencia", default="1,16", help="Clientes concurrentes; varios separados por coma")
+    parser.add_argument("--muestras-memoria", type=int, default=20, help="Peticiones medidas con tracemalloc")
+    parser.add_argument("--filtro", default="", help="Solo casos cuyo nombre contiene este texto")
+    parser.add_argument("--base", help="Commit de referencia (archivo en benchmarks/resultados/endpoints)")
+    parser.add_argument("--umbral", type=float, default=0.10, help="Caída de req/s tolerada (0.10 = 10%%)")
+    parser.add_argument("--no-guardar", action="store_true", help="No guarda la corrida")
+    args = parser.parse_args()
+
+    print(f"⏱️  Endpoints en proceso (ASGI), {args.segundos} s por caso, concurrencia {args.concurrencia}")
+    resultado = asyncio.run(ejecutar(args))
+
+    base = _cargar_base(resultado["revision"], args.base)
+    regresiones = comparar(resultado, base, args.umbral) if base else []
+    if base is None:
+        print("\nℹ️  Sin corridas anteriores para comparar")
+
+    if not args.no_guardar:
+        RESULTADOS.mkdir(parents=True, exist_ok=True)
+        ruta = RESULTADOS / f"{resultado['revision']}.json"
+        ruta.write_text(json.dumps(resultado, indent=2, ensure_ascii=False) + "\n")
+        print(f"\n💾 Guardado en {ruta}")
+
+    if regresiones:
+        print(f"\n❌ Regresiones por encima del {args.umbral:.0%}: {', '.join(regresiones)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Generador de carga del pipeline completo, sin docker-compose:
+
+    gateway -> transacciones (BD) -> broker -> fraud worker -> PATCH de estado
+
+Todos los servicios corren en este proceso (ver servicios.py): SQLite en
+lugar de MySQL, un broker en memoria en lugar de RabbitMQ y transportes
+ASGI en lugar de la red. La autenticación del gateway se reemplaza por un
+usuario fijo (el auth_service no es parte del camino de una transacción).
+
+Se ejecuta desde backend/ con las dependencias de los servicios instaladas:
+
+    python -m benchmarks.pipeline --tasa 200 --duracion 30
+    python -m benchmarks.pipeline --tasa 50,100,200,400 --duracion 15 --shards 4
+
+Las llegadas son de lazo abierto (Poisson por defecto): la tasa ofrecida
+no baja si el sistema se atrasa, así se ve dónde se forma la cola. Por
+transacción se marcan llegada, publicación, entrega al worker, inicio del
+PATCH y decisión registrada; el reporte da throughput, percentiles del
+tiempo hasta la decisión y de cada etapa, y la etapa cuello de botella.
+
+Todo comparte un event loop y el GIL: los números absolutos no son los
+del despliegue, pero la etapa que se satura primero sí es comparable
+entre commits. Cada corrida se añade a benchmarks/resultados/pipeline.jsonl.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from .servicios import (
+    BrokerEnMemoria, PoliticaReintentosEnMemoria, cargar, preparar_entorno, usar_sqlite
+)
+
+RESULTADOS = Path(__file__).parent / "resultados" / "pipeline.jsonl"
+UBICACIONES = ["La Paz", "Santa Cruz", "Cochabamba", "Sucre", "Tarija", "Panamá", "Suiza", "Islas Caimán"]
+
+# Etapas en orden: (nombre, marca inicial, marca final)
+ETAPAS = [
+    ("api", "llegada", "publicado"),            # gateway + transacciones + INSERT
+    ("cola", "publicado", "entregado"),         # espera en el broker
+    ("reglas", "entregado", "patch"),           # worker: decodificar + reglas
+    ("actualizacion", "patch", "decidida"),     # PATCH + UPDATE en la BD
+]
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+class ClienteConTiempos:
+    """Cliente HTTP del worker que marca el inicio y el fin del PATCH."""
+
+    def __init__(self, cliente, marcas: dict):
+        self.cliente = cliente
+        self.marcas = marcas
+
+    async def patch(self, url: str, json=None):
+        # .../transactions/{id}/status
+        id_trans = int(url.rstrip("/").split("/")[-2])
+        self.marcas[id_trans]["patch"] = time.perf_counter()
+        respuesta = await self.cliente.patch(url, json=json)
+        if respuesta.status_code == 200:
+            self.marcas[id_trans]["decidida"] = time.perf_counter()
+        return respuesta
+
+    async def aclose(self):
+        await self.cliente.aclose()
+
+
+class Pipeline:
+    """Servicios cargados y conectados entre sí con los dobles locales."""
+
+    def __init__(self, shards: int, directorio: Path):
+        import httpx
+
+        preparar_entorno(directorio)
+        os.environ["FRAUD_SHARD_COUNT"] = str(shards)
+        self.shards = shards
+        self.marcas: dict[int, dict] = defaultdict(dict)
+
+        self.transacciones = cargar("transacciones", ["app.main"])
+        self.fraude = cargar("fraud_service", ["app.worker"])
+        self.gateway = cargar("gateway", ["main"])
+
+        database = self.transacciones["app.database"]
+        motor = usar_sqlite(database, directorio / "transacciones.db")
+        self.capacidad_pool = database.settings.DB_POOL_SIZE + database.settings.DB_MAX_OVERFLOW
+
+        self.app_transacciones = self.transacciones["app.main"].app
+        gateway = self.gateway["main"]
+        # raise_app_exceptions=False: un error del servicio llega como 500,
+        # igual que por la red
+        self.gateway["security"].transporte_servicios = httpx.ASGITransport(app=self.app_transacciones, raise_app_exceptions=False)
+        gateway.app.dependency_overrides[self.gateway["security"].get_current_user] = lambda: {"id": 1}
+        self.cliente_gateway = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=gateway.app, raise_app_exceptions=False),
+            base_url="http://gateway", timeout=60.0,
+        )
+
+        self.worker = self.fraude["app.worker"]
+        # Un solo worker con todos los shards, como lo arranca main()
+        self.worker.preparar_estado_por_cuenta(list(range(self.worker.settings.FRAUD_SHARD_COUNT)))
+        self.worker.cliente_http = ClienteConTiempos(
+            httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=self.app_transacciones, raise_app_exceptions=False), timeout=60.0
+            ),
+            self.marcas,
+        )
+        self.motor = motor
+        self.broker: BrokerEnMemoria | None = None
+        self.politica: PoliticaReintentosEnMemoria | None = None
+        self.consumidores: list[asyncio.Task] = []
+
+    def conectar_broker(self):
+        """Se llama con el loop ya corriendo: el broker entrega a colas asyncio."""
+        self.broker = BrokerEnMemoria(
+            self.transacciones["app.services.messaging"],
+            self.transacciones["app.services.codec"],
+            asyncio.get_running_loop(),
+            self.shards,
+            al_publicar=lambda id_trans: self.marcas[id_trans].__setitem__("publicado", time.perf_counter()),
+        )
+        dependencias = self.transacciones["app.dependencies"]
+        self.app_transacciones.dependency_overrides[dependencias.get_publisher] = lambda: self.broker
+        self.politica = PoliticaReintentosEnMemoria(
+            self.broker, self.worker.HEADER_REINTENTOS, self.worker.settings.FRAUD_MAX_ATTEMPTS
+        )
+        self.worker.politica_reintentos = self.politica
+        prefetch = self.worker.settings.FRAUD_PREFETCH_COUNT
+        for nombre, (carril, cola) in self.broker.colas.items():
+            self.consumidores.append(asyncio.create_task(self._consumir(cola, nombre, carril, prefetch)))
+
+    async def _consumir(self, cola: asyncio.Queue, nombre: str, carril: str, prefetch: int):
+        """Como un consumidor de aio_pika: hasta 'prefetch' mensajes sin confirmar."""
+        cupos = asyncio.Semaphore(prefetch)
+        while True:
+            mensaje = await cola.get()
+            await cupos.acquire()
+            self.marcas[mensaje.id_transaccion]["entregado"] = time.perf_counter()
+            tarea = asyncio.create_task(self.worker.procesar_mensaje(mensaje, nombre, carril))
+            tarea.add_done_callback(lambda _: cupos.release())
+
+    async def crear(self, cuerpo: dict) -> int | None:
+        llegada = time.perf_counter()
+        respuesta = await self.cliente_gateway.post(
+            "/transactions/", json=cuerpo, headers={"Authorization": "Bearer harness"}
+        )
+        if respuesta.status_code >= 400:
+            return None
+        id_trans = respuesta.json()["id"]
+        self.marcas[id_trans]["llegada"] = llegada
+        self.marcas[id_trans]["respuesta"] = time.perf_counter()
+        return id_trans
+
+    async def cerrar(self):
+        for tarea in self.consumidores:
+            tarea.cancel()
+        await asyncio.gather(*self.consumidores, return_exceptions=True)
+        await self.cliente_gateway.aclose()
+        await self.worker.cliente_http.aclose()
+
+
+def _transaccion(rnd: random.Random, cuentas: int) -> dict:
+    return {
+        "cuenta_origen": f"ACC-{rnd.randrange(cuentas):08d}",
+        "cuenta_destino": f"ACC-{rnd.randrange(cuentas):08d}",
+        "monto": round(min(rnd.lognormvariate(5, 1.5), 50_000), 2),
+        "ubicacion": rnd.choice(UBICACIONES),
+    }
+
+
+async def correr_nivel(pipeline: Pipeline, tasa: float, duracion: float, args, rnd: random.Random) -> dict:
+    """Ofrece 'tasa' transacciones/s durante 'duracion' s y espera sus decisiones."""
+    pipeline.marcas.clear()
+    errores = 0
+    creadas: list[int] = []
+    en_vuelo: set[asyncio.Task] = set()
+    maximos = {"cola": 0, "conexiones_bd": 0, "hilos": 0}
+    reintentos_antes, dlq_antes = pipeline.politica.reintentos, pipeline.politica.dlq
+
+    async def enviar():
+        nonlocal errores
+        try:
+            id_trans = await pipeline.crear(_transaccion(rnd, args.cuentas))
+        except Exception:
+            id_trans = None
+        if id_trans is None:
+            errores += 1
+        else:
+            creadas.append(id_trans)
+
+    async def muestrear():
+        # Profundidad de las colas, conexiones de la BD en uso e hilos vivos
+        while True:
+            maximos["cola"] = max(maximos["cola"], pipeline.broker.pendientes())
+            maximos["conexiones_bd"] = max(maximos["conexiones_bd"], pipeline.motor.pool.checkedout())
+            maximos["hilos"] = max(maximos["hilos"], threading.active_count())
+            await asyncio.sleep(0.1)
+
+    muestreo = asyncio.create_task(muestrear())
+    inicio = time.perf_counter()
+    proxima = inicio
+    ofrecidas = 0
+    while proxima - inicio < duracion:
+        espera = proxima - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        tarea = asyncio.create_task(enviar())
+        en_vuelo.add(tarea)
+        tarea.add_done_callback(en_vuelo.discard)
+        ofrecidas += 1
+        proxima += rnd.expovariate(tasa) if args.llegadas == "poisson" else 1.0 / tasa
+    fin_llegadas = time.perf_counter()
+
+    # Drenaje: hasta que todo lo creado tenga decisión, se agote la espera
+    # final o no haya avances en 'sin_progreso' segundos (pipeline estancado)
+    estancado = False
+    limite = time.perf_counter() + args.espera_final
+    avance_antes, ultimo_avance = None, time.perf_counter()
+    while time.perf_counter() < limite:
+        if not en_vuelo and all("decidida" in pipeline.marcas[i] for i in creadas):
+            break
+        avance = (sum(1 for m in pipeline.marcas.values() if "decidida" in m), len(creadas) + errores)
+        if avance != avance_antes:
+            avance_antes, ultimo_avance = avance, time.perf_counter()
+        elif time.perf_counter() - ultimo_avance > args.sin_progreso:
+            estancado = True
+            break
+        await asyncio.sleep(0.05)
+    for tarea in list(en_vuelo):
+        tarea.cancel()
+    muestreo.cancel()
+
+    completas = [pipeline.marcas[i] for i in creadas if "decidida" in pipeline.marcas[i]]
+    resultado = {
+        "tasa_ofrecida": tasa,
+        "duracion_s": duracion,
+        "ofrecidas": ofrecidas,
+        "creadas": len(creadas),
+        "decididas": len(completas),
+        "errores": errores,
+        "sin_respuesta": len(en_vuelo),
+        "reintentos_worker": pipeline.politica.reintentos - reintentos_antes,
+        "dlq": pipeline.politica.dlq - dlq_antes,
+        "profundidad_cola_max": maximos["cola"],
+        "conexiones_bd_max": maximos["conexiones_bd"],
+        "hilos_max": maximos["hilos"],
+        "estancado": estancado,
+    }
+    # Estancado con el pool de conexiones lleno: las peticiones retienen su
+    # conexión mientras esperan hilo del threadpool y los hilos esperan
+    # conexión; nada avanza hasta el timeout del pool.
+    if estancado and maximos["conexiones_bd"] >= pipeline.capacidad_pool:
+        resultado["cuello_de_botella"] = "pool_bd"
+    if not completas:
+        return resultado
+
+    ultima = max(m["decidida"] for m in completas)
+    resultado["tasa_llegadas_real"] = round(ofrecidas / (fin_llegadas - inicio), 1)
+    resultado["throughput_decisiones"] = round(len(completas) / (ultima - inicio), 1)
+
+    def resumen(valores: list) -> dict:
+        return {
+            "p50_ms": round(percentil(valores, 50) * 1000, 2),
+            "p95_ms": round(percentil(valores, 95) * 1000, 2),
+            "p99_ms": round(percentil(valores, 99) * 1000, 2),
+            "media_ms": round(statistics.fmean(valores) * 1000, 2),
+        }
+
+    resultado["tiempo_decision"] = resumen([m["decidida"] - m["llegada"] for m in completas])
+    resultado["respuesta_api"] = resumen([m["respuesta"] - m["llegada"] for m in completas])
+    resultado["etapas"] = {
+        nombre: resumen([max(0.0, m[fin] - m[ini]) for m in completas])
+        for nombre, ini, fin in ETAPAS
+    }
+    # Cuello de botella: la etapa que más aporta en promedio al tiempo
+    # hasta la decisión. Si es "cola", el worker no da abasto; si es "api"
+    # o "actualizacion", la BD o el threadpool de transacciones.
+    resultado.setdefault(
+        "cuello_de_botella", max(resultado["etapas"], key=lambda e: resultado["etapas"][e]["media_ms"])
+    )
+    return resultado
+
+
+def _imprimir(r: dict):
+    print(f"\n📈 Tasa ofrecida {r['tasa_ofrecida']}/s durante {r['duracion_s']} s")
+    print(f"   Ofrecidas {r['ofrecidas']} | creadas {r['creadas']} | decididas {r['decididas']} | "
+          f"errores {r['errores']} | sin respuesta {r['sin_respuesta']}")
+    print(f"   Cola máx {r['profundidad_cola_max']} | conexiones BD máx {r['conexiones_bd_max']} | "
+          f"hilos máx {r['hilos_max']} | reintentos {r['reintentos_worker']} | DLQ {r['dlq']}")
+    if r["estancado"]:
+        print("   ⚠️  Sin avances durante la espera final: nivel estancado")
+    if r.get("cuello_de_botella") == "pool_bd":
+        print("   🔥 Pool de conexiones de la BD agotado (las peticiones esperan conexión y hilo a la vez)")
+    if "tiempo_decision" not in r:
+        print("   ❌ Ninguna transacción llegó a decidirse")
+        return
+    print(f"   Throughput: {r['throughput_decisiones']} decisiones/s (llegadas reales {r['tasa_llegadas_real']}/s)")
+    t = r["tiempo_decision"]
+    print(f"   Tiempo hasta la decisión: p50 {t['p50_ms']} ms | p95 {t['p95_ms']} ms | p99 {t['p99_ms']} ms")
+    for nombre, e in r["etapas"].items():
+        marca = "🔥" if nombre == r["cuello_de_botella"] else "  "
+        print(f"   {marca} {nombre:<14} media {e['media_ms']:>9} ms | p95 {e['p95_ms']:>9} ms")
+    print(f"   Cuello de botella: {r['cuello_de_botella']}")
+
+
+async def ejecutar(args) -> list[dict]:
+    tasas = [float(t) for t in args.tasa.split(",")]
+    rnd = random.Random(args.semilla)
+    with tempfile.TemporaryDirectory() as directorio:
+        pipeline = Pipeline(args.shards, Path(directorio))
+        pipeline.conectar_broker()
+        resultados = []
+        try:
+            for tasa in tasas:
+                # Los servicios imprimen por mensaje: se silencian durante la carga
+                with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+                    logging.disable(logging.INFO)
+                    try:
+                        resultado = await correr_nivel(pipeline, tasa, args.duracion, args, rnd)
+                    finally:
+                        logging.disable(logging.NOTSET)
+                _imprimir(resultado)
+                resultados.append(resultado)
+        finally:
+            await pipeline.cerrar()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasa", default="100", help="Transacciones/s ofrecidas; varias separadas por coma")
+    parser.add_argument("--duracion", type=float, default=20.0, help="Segundos de carga por tasa")
+    parser.add_argument("--llegadas", choices=["poisson", "constante"], default="poisson")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--cuentas", type=int, default=10_000, help="Cuentas distintas en la carga")
+    parser.add_argument("--espera-final", type=float, default=30.0, help="Segundos para drenar al final")
+    parser.add_argument("--sin-progreso", type=float, default=10.0,
+                        help="Segundos sin respuestas ni decisiones para dar el nivel por estancado")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"🚦 Pipeline en proceso: {args.shards} shards, tasas {args.tasa}/s, {args.duracion} s por tasa")
+    resultados = asyncio.run(ejecutar(args))
+
+    RESULTADOS.parent.mkdir(parents=True, exist_ok=True)
+    with RESULTADOS.open("a") as f:
+        for resultado in resultados:
+            resultado["fecha"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Carga de los servicios en un mismo proceso, con dobles locales.
+
+transacciones y fraud_service tienen cada uno su paquete ``app``, así que
+no pueden importarse juntos de la forma habitual. ``cargar`` importa un
+servicio con su directorio al frente de sys.path y, al terminar, retira
+de sys.modules sus módulos raíz: el siguiente servicio importa su propio
+``app`` y los módulos ya cargados conservan sus referencias internas.
+Funciona porque ningún servicio importa módulos dentro de funciones.
+
+Dobles:
+- BD: SQLite (WAL) en un archivo temporal en lugar de MySQL;
+- RabbitMQ: BrokerEnMemoria, con la misma interfaz que RabbitMQPublisher
+  y los mismos carriles y shards, entrega a colas asyncio;
+- HTTP: transportes ASGI de httpx entre gateway, servicios y worker
+  (TransporteRuteado elige la app según el host de la URL).
+"""
+import asyncio
+import importlib
+import os
+import sys
+import time
+import zlib
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+
+SERVICIOS = Path(__file__).resolve().parent.parent / "services"
+
+def cargar(servicio: str, modulos: list[str]) -> dict:
+    """
+    Importa 'modulos' del servicio y retorna {nombre: módulo} con todo lo
+    que se importó desde su directorio (p. ej. "app.database").
+    """
+    directorio = str(SERVICIOS / servicio)
+    antes = set(sys.modules)
+    sys.path.insert(0, directorio)
+    try:
+        for modulo in modulos:
+            importlib.import_module(modulo)
+    finally:
+        sys.path.remove(directorio)
+        # Raíces propias del servicio ("app", "main"...). Los paquetes sin
+        # __init__.py no tienen __file__: se reconocen por su __path__
+        raices = set()
+        for nombre in set(sys.modules) - antes:
+            modulo = sys.modules[nombre]
+            rutas = [getattr(modulo, "__file__", None) or ""] + list(getattr(modulo, "__path__", []))
+            if any(str(ruta).startswith(directorio) for ruta in rutas):
+                raices.add(nombre.split(".")[0])
+        nuevos = {
+            nombre: sys.modules[nombre] for nombre in set(sys.modules) - antes
+            if nombre.split(".")[0] in raices
+        }
+        for nombre in nuevos:
+            del sys.modules[nombre]
+    return nuevos
+
+
+def usar_sqlite(database, ruta: Path):
+    """
+    Reemplaza el engine del módulo app.database de un servicio por SQLite
+    en 'ruta', compartido entre los hilos del threadpool, con el mismo
+    pool y las mismas métricas de BD que el original, y crea las tablas.
+    """
+    from sqlalchemy import create_engine, event
+
+    motor = create_engine(
+        f"sqlite:///{ruta}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+        poolclass=database.QueuePoolMedido,
+        pool_size=database.settings.DB_POOL_SIZE,
+        max_overflow=database.settings.DB_MAX_OVERFLOW,
+        pool_timeout=database.settings.DB_POOL_TIMEOUT_SECONDS,
+    )
+    # Misma instrumentación que el engine original (db_metrics)
+    if database.db_metrics is not None:
+        database.db_metrics.instrumentar(motor)
+
+    @event.listens_for(motor, "connect")
+    def _wal(conexion, _):
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+
+    database.SessionLocal.configure(bind=motor)
+    database.engine = motor
+    database.Base.metadata.create_all(motor)
+    return motor
+
+
+class TransporteRuteado(httpx.AsyncBaseTransport):
+    """Transporte httpx que envía cada petición a la app ASGI de su host."""
+
+    def __init__(self, apps: dict):
+        # raise_app_exceptions=False: un error del servicio llega como 500,
+        # igual que por la red
+        self.transportes = {
+            host: httpx.ASGITransport(app=app, raise_app_exceptions=False) for host, app in apps.items()
+        }
+
+    async def handle_async_request(self, request):
+        return await self.transportes[request.url.host].handle_async_request(request)
+
+
+# --- Broker en memoria ---
+
+class MensajeEnMemoria:
+    """Lo que el worker usa de aio_pika.IncomingMessage."""
+
+    __slots__ = ("body", "content_type", "headers", "redelivered", "id_transaccion")
+
+    def __init__(self, body: bytes, content_type: str, headers: dict, id_transaccion=None):
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers
+        self.redelivered = False
+        # Solo para el harness: medir la espera en cola sin decodificar
+        self.id_transaccion = id_transaccion
+
+    @asynccontextmanager
+    async def process(self):
+        yield
+
+
+class BrokerEnMemoria:
+    """
+    Reemplaza a RabbitMQPublisher: codifica como el publicador real, elige
+    carril y shard (hash de la cuenta de origen, como x-consistent-hash) y
+    deja el mensaje en la cola asyncio correspondiente. publish_message se
+    llama desde el threadpool de FastAPI; la entrega al loop es thread-safe.
+    """
+
+    def __init__(self, mensajeria, codec, loop: asyncio.AbstractEventLoop, shards: int, al_publicar=None):
+        self.mensajeria = mensajeria
+        self.codec = codec
+        self.loop = loop
+        self.shards = shards
+        self.al_publicar = al_publicar
+        # Nombre de la cola shard -> (carril, cola asyncio)
+        self.colas: dict[str, tuple[str, asyncio.Queue]] = {
+            mensajeria.shard_queue_name(shard, carril): (carril, asyncio.Queue())
+            for carril in mensajeria.LANE_EXCHANGES for shard in range(shards)
+        }
+        self.publicados = defaultdict(int)
+
+    def publish_message(self, message_body: dict):
+        body, content_type = self.codec.codificar(message_body, self.mensajeria.settings.FRAUD_MESSAGE_ENCODING)
+        carril = self.mensajeria.lane_for(message_body)
+        shard = zlib.crc32(str(message_body.get("cuenta_origen", "")).encode()) % self.shards
+        mensaje = MensajeEnMemoria(body, content_type, {"x-published-at": time.time()}, message_body.get("id"))
+        if self.al_publicar is not None:
+            self.al_publicar(message_body.get("id"))
+        self.publicados[carril] += 1
+        _, cola = self.colas[self.mensajeria.shard_queue_name(shard, carril)]
+        self.loop.call_soon_threadsafe(cola.put_nowait, mensaje)
+
+    def pendientes(self) -> int:
+        return sum(cola.qsize() for _, cola in self.colas.values())
+
+    def close(self):
+        pass
+
+
+class PoliticaReintentosEnMemoria:
+    """
+    Reemplaza a PoliticaReintentos: en lugar de las colas de espera de
+    RabbitMQ, devuelve el mensaje a su cola shard tras 'retraso' segundos
+    con el header de reintentos incrementado. Al agotar los intentos (o
+    con un mensaje corrupto) solo lo cuenta como enviado a la DLQ.
+    """
+
+    def __init__(self, broker: BrokerEnMemoria, header_reintentos: str, max_intentos: int, retraso: float = 0.5):
+        self.broker = broker
+        self.header_reintentos = header_reintentos
+        self.max_intentos = max_intentos
+        self.retraso = retraso
+        self.reintentos = 0
+        self.dlq = 0
+
+    async def programar(self, message, cola_origen: str, error: str):
+        intentos = int((message.headers or {}).get(self.header_reintentos, 0)) + 1
+        if intentos >= self.max_intentos:
+            self.dlq += 1
+            return
+        self.reintentos += 1
+        reintento = MensajeEnMemoria(
+            message.body, message.content_type,
+            {**(message.headers or {}), self.header_reintentos: intentos}, message.id_transaccion,
+        )
+        _, cola = self.broker.colas[cola_origen]
+        self.broker.loop.call_later(self.retraso, cola.put_nowait, reintento)
+
+    async def enviar_a_dlq(self, message, cola_origen: str, error: str):
+        self.dlq += 1
+
+
+class PublicadorNulo:
+    """Publicador que descarta los mensajes: mide la API sin el broker."""
+
+    def __init__(self):
+        self.publicados = 0
+
+    def publish_message(self, message_body: dict):
+        self.publicados += 1
+
+    def close(self):
+        pass
+
+
+def preparar_entorno(directorio_datos: Path):
+    """Variables que los Settings de los servicios exigen, apuntando a los dobles."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{directorio_datos / 'transacciones.db'}"
+    os.environ.setdefault("SECRET_KEY", "harness-de-carga")
+    os.environ.setdefault("RESULTS_CONSUMER_ENABLED", "false")
+    os.environ.setdefault("TRANSACTIONS_SERVICE_URL", "http://transactions_service:8001")
+    os.environ.setdefault("FRAUD_PROFILE_SNAPSHOT_DIR", str(directorio_datos / "perfiles"))
+    os.environ.setdefault("FRAUD_AUTOTUNE_ENABLED", "false")
+    # Los módulos de cada servicio salen de sys.modules (ver cargar), así que
+    # el pool de procesos de auth no podría serializar sus funciones por
+    # nombre: aquí el hashing va en línea (el pool se mide en
+    # auth/benchmarks/hashing.py)
+    os.environ.setdefault("ARGON2_POOL_PROCESSES", "0")
+    # Todos los logins del benchmark salen de la misma IP
+    os.environ.setdefault("LOGIN_LIMIT_ENABLED", "false")
@@ -0,0 +1,92 @@
+"""Agregar token_hash (SHA-256, índice único) a refresh_tokens
+
+Revision ID: b7e2d94c1a06
+Revises: 40d97bbdeab2
+Create Date: 2026-10-19 21:12:40.582913
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d94c1a06'
+down_revision: Union[str, Sequence[str], None] = '40d97bbdeab2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Filas por UPDATE del backfill (rangos de id: transacciones cortas)
+LOTE = 50_000
+
+
+def _backfill(conexion) -> None:
+    limites = conexion.execute(sa.text('SELECT MIN(id), MAX(id) FROM refresh_tokens')).one()
+    if limites[0] is None:
+        return
+    mysql = conexion.dialect.name == 'mysql'
+    for desde in range(limites[0], limites[1] + 1, LOTE):
+        rango = {'desde': desde, 'hasta': desde + LOTE - 1}
+        if mysql:
+            conexion.execute(sa.text(
+                'UPDATE refresh_tokens SET token_hash = SHA2(token, 256) '
+                'WHERE id BETWEEN :desde AND :hasta AND token_hash IS NULL'
+            ), rango)
+        else:
+            # Otros motores (SQLite en desarrollo): hash calculado aquí
+            filas = conexion.execute(sa.text(
+                'SELECT id, token FROM refresh_tokens '
+                'WHERE id BETWEEN :desde AND :hasta AND token_hash IS NULL'
+            ), rango).all()
+            if filas:
+                conexion.execute(
+                    sa.text('UPDATE refresh_tokens SET token_hash = :hash WHERE id = :id'),
+                    [{'id': id_, 'hash': hashlib.sha256(token.encode()).hexdigest()} for id_, token in filas],
+                )
+
+
+def _eliminar_duplicados(conexion) -> None:
+    """
+    Antes del jti, dos refresh tokens del mismo usuario emitidos en el mismo
+    segundo eran idénticos. Se conserva la fila más reciente de cada grupo,
+    revocada si cualquiera de las copias lo estaba.
+    """
+    grupos = conexion.execute(sa.text(
+        'SELECT token_hash, MAX(id), MAX(CASE WHEN is_revoked THEN 1 ELSE 0 END) '
+        'FROM refresh_tokens GROUP BY token_hash HAVING COUNT(*) > 1'
+    )).all()
+    for token_hash, id_conservado, revocado in grupos:
+        conexion.execute(
+            sa.text('UPDATE refresh_tokens SET is_revoked = :revocado WHERE id = :id'),
+            {'revocado': bool(revocado), 'id': id_conservado},
+        )
+        conexion.execute(
+            sa.text('DELETE FROM refresh_tokens WHERE token_hash = :hash AND id <> :id'),
+            {'hash': token_hash, 'id': id_conservado},
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_tokens', sa.Column('token_hash', sa.String(length=64), nullable=True))
+
+    conexion = op.get_bind()
+    _backfill(conexion)
+    # Índice provisional (no único): la búsqueda y el borrado de duplicados
+    # no recorren la tabla una vez por grupo
+    op.create_index('ix_refresh_tokens_token_hash_tmp', 'refresh_tokens', ['token_hash'], unique=False)
+    _eliminar_duplicados(conexion)
+
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.drop_index('ix_refresh_tokens_token_hash_tmp')
+        batch_op.alter_column('token_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_index(op.f('ix_refresh_tokens_token_hash'), ['token_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.drop_index(op.f('ix_refresh_tokens_token_hash'))
+        batch_op.drop_column('token_hash')
@@ -0,0 +1,34 @@
+"""Índices de refresh_tokens para la purga y la revocación por usuario
+
+Revision ID: d41c8e5f7a92
+Revises: b7e2d94c1a06
+Create Date: 2026-10-19 22:03:17.904215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c8e5f7a92'
+down_revision: Union[str, Sequence[str], None] = 'b7e2d94c1a06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Purga de vencidos, de los más antiguos a los más recientes
+    op.create_index(op.f('ix_refresh_tokens_expires_at'), 'refresh_tokens', ['expires_at'], unique=False)
+    # revoke_all_user_tokens; reemplaza al índice solo por user_id (prefijo)
+    op.create_index('ix_refresh_tokens_user_id_is_revoked', 'refresh_tokens', ['user_id', 'is_revoked'], unique=False)
+    op.drop_index(op.f('ix_refresh_tokens_user_id'), table_name='refresh_tokens')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_refresh_tokens_user_id'), 'refresh_tokens', ['user_id'], unique=False)
+    op.drop_index('ix_refresh_tokens_user_id_is_revoked', table_name='refresh_tokens')
+    op.drop_index(op.f('ix_refresh_tokens_expires_at'), table_name='refresh_tokens')
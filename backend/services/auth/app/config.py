@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     # Database
@@ -11,6 +12,64 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
+    # Argon2 (por defecto, los valores de passlib: los hashes existentes
+    # no necesitan migrar). Memoria en KiB.
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    
+    # Pool de procesos para hashing: None = un proceso por núcleo, 0 = en línea
+    ARGON2_POOL_PROCESSES: Optional[int] = None
+    ARGON2_POOL_MAX_PENDING: int = 64     # en curso + en espera; más allá, 503
+    ARGON2_POOL_TIMEOUT_SECONDS: float = 10.0
+    
+    # Purga en segundo plano de refresh tokens vencidos o revocados
+    TOKEN_PURGE_ENABLED: bool = True
+    TOKEN_PURGE_INTERVAL_SECONDS: float = 900.0
+    TOKEN_PURGE_BATCH_SIZE: int = 1000          # filas por DELETE/commit
+    TOKEN_PURGE_PAUSE_SECONDS: float = 0.2      # pausa entre lotes
+    TOKEN_PURGE_EXPIRED_GRACE_MINUTES: int = 60 # margen tras el vencimiento
+    
+    # Caché de usuarios de get_current_user (app/services/user_cache.py)
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    USER_CACHE_REDIS_URL: Optional[str] = None  # compartida entre workers
+    
+    # Limitador de intentos de login (app/services/login_limiter.py)
+    LOGIN_LIMIT_ENABLED: bool = True
+    LOGIN_WINDOW_SECONDS: float = 300.0
+    LOGIN_IP_MAX_ATTEMPTS: int = 50             # intentos por IP en la ventana
+    LOGIN_EMAIL_MAX_FAILURES: int = 10          # fallos por email hasta el bloqueo
+    LOGIN_DELAY_AFTER_FAILURES: int = 3         # desde aquí, retraso 1s, 2s, 4s...
+    LOGIN_DELAY_BASE_SECONDS: float = 1.0
+    LOGIN_LOCKOUT_SECONDS: float = 900.0
+    LOGIN_LIMITER_MAX_KEYS: int = 100000        # emails + IPs en memoria
+    LOGIN_LIMITER_REDIS_URL: Optional[str] = None
+    # Proxies cuyo X-Forwarded-For se acepta: solo el gateway (su IP fija en
+    # docker-compose.yml). Cualquier otro par podría falsear su IP y saltarse
+    # el límite por IP, así que no se confía en rangos privados enteros
+    LOGIN_TRUSTED_PROXIES: str = "172.28.0.10/32"
+    
+    # Pool de conexiones de la BD (app/services/db_pool.py). size + overflow
+    # cubre los 40 hilos del threadpool de FastAPI: con menos conexiones que
+    # hilos, una ráfaga deja peticiones con conexión esperando hilo y hilos
+    # esperando conexión (benchmarks/pipeline.py lo mostró con 5 + 10)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 30
+    DB_POOL_TIMEOUT_SECONDS: float = 5.0
+    DB_POOL_RECYCLE_SECONDS: int = 3600
+    # "always" (un ping en cada checkout), "idle" (solo si la conexión
+    # estuvo inactiva más de DB_POOL_PRE_PING_IDLE_SECONDS) o "never"
+    DB_POOL_PRE_PING: str = "idle"
+    DB_POOL_PRE_PING_IDLE_SECONDS: float = 30.0
+    
+    # Métricas de BD por petición y ruta (app/services/db_metrics.py); con
+    # DEBUG también como cabeceras X-DB-* de cada respuesta
+    DB_METRICS_ENABLED: bool = True
+    DB_SLOW_QUERY_MS: float = 200.0             # desde aquí se guarda la sentencia
+    DB_SLOW_QUERY_SAMPLES: int = 100            # últimas sentencias lentas guardadas
+    
     # App
     APP_NAME: str = "Auth Service"
     DEBUG: bool = False
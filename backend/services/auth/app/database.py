@@ -2,15 +2,21 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import get_settings
+from app.services.db_metrics import db_metrics
+from app.services.db_pool import QueuePoolMedido, configurar_pre_ping, opciones_engine
 
 settings = get_settings()
 
+# Tamaño, timeout, reciclado y pre-ping del pool: DB_POOL_* en Settings
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    **opciones_engine(settings.DATABASE_URL)
 )
+configurar_pre_ping(engine)
+
+if db_metrics is not None:
+    db_metrics.instrumentar(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.services.security import decode_token
 from app.services.user_service import UserService
+from app.services.user_cache import user_cache
 from app.models.user_model import User
 
 security = HTTPBearer()
@@ -41,13 +42,18 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Buscar usuario en BD
-    user = UserService.get_user_by_id(db, int(user_id))
+    # Buscar usuario (caché con TTL; en un fallo, en BD). El User de la
+    # caché no está ligado a la sesión: solo se leen sus campos
+    user = user_cache.get(int(user_id)) if user_cache is not None else None
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuario no encontrado"
-        )
+        user = UserService.get_user_by_id(db, int(user_id))
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Usuario no encontrado"
+            )
+        if user_cache is not None:
+            user_cache.set(user)
     
     # Verificar si el usuario está activo
     if not user.is_active:
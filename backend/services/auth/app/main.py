@@ -1,14 +1,39 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes.auth_routes import router
+from app import database
 from app.config import get_settings
+from app.metrics import CONTENT_TYPE, MetricsMiddleware, registro
+from app.services.db_metrics import DbMetricsMiddleware, db_metrics
+from app.services.db_pool import registrar_metricas
+from app.services.security import pool_hashing
+from app.services.token_purge import TokenPurger
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Los procesos de hashing se crean al arrancar, no en el primer login
+    pool_hashing.iniciar()
+    print(f"🔑 Pool de hashing: {pool_hashing.procesos or 'en línea'} procesos")
+    purger = None
+    if settings.TOKEN_PURGE_ENABLED:
+        purger = TokenPurger()
+        purger.start()
+    app.state.token_purger = purger
+    yield
+    if purger is not None:
+        purger.stop()
+    pool_hashing.cerrar()
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     description="Microservicio de autenticación para sistema de detección de fraudes",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -20,6 +45,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Sentencias, tiempo de BD y espera por conexión de cada petición
+if db_metrics is not None:
+    app.add_middleware(DbMetricsMiddleware, metrics=db_metrics, headers=settings.DEBUG)
+
+# Latencia por ruta para /metrics (el último en agregarse envuelve a todos)
+app.add_middleware(MetricsMiddleware)
+registrar_metricas(lambda: database.engine)
+
 # Incluir rutas
 app.include_router(router)
 
@@ -33,4 +66,10 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+# Métricas en formato Prometheus (interno: el gateway no lo expone)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(registro.exponer(), media_type=CONTENT_TYPE)
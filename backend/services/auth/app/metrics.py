@@ -0,0 +1,275 @@
+"""
+Métricas en el formato de texto de Prometheus, sin dependencias:
+contadores, gauges e histogramas de buckets fijos.
+
+Debe mantenerse igual en los cuatro servicios (gateway/metrics.py,
+auth/app/metrics.py, transacciones/app/metrics.py y
+fraud_service/app/metrics.py): cada imagen solo copia su servicio.
+backend/tests/test_modulos_compartidos.py falla si las copias divergen.
+
+    LATENCIA = registro.histograma("x_seconds", "Ayuda", ("carril",))
+    LATENCIA_ALTA = LATENCIA.labels("alta")   # una vez, fuera del camino caliente
+    LATENCIA_ALTA.observe(0.012)
+
+Cada combinación de etiquetas crea su serie una sola vez; después,
+registrar un valor es una suma (y una búsqueda binaria en los
+histogramas), sin asignar memoria. Los valores se actualizan sin locks:
+bajo el GIL, una carrera entre hilos puede perder como mucho un
+incremento, lo que es aceptable para métricas.
+"""
+import bisect
+import math
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets (segundos) por defecto de los histogramas de latencia
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _numero(valor) -> str:
+    if isinstance(valor, bool):
+        return "1" if valor else "0"
+    if isinstance(valor, int):
+        return str(valor)
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    return repr(float(valor))
+
+
+def _etiquetas(nombres: tuple, valores: tuple, extra: str = "") -> str:
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class _Serie:
+    __slots__ = ("valores", "valor")
+
+    def __init__(self, valores: tuple):
+        self.valores = valores
+        self.valor = 0
+
+
+class SerieContador(_Serie):
+    __slots__ = ()
+
+    def inc(self, cantidad=1):
+        if cantidad < 0:
+            raise ValueError("Un contador solo puede aumentar")
+        self.valor += cantidad
+
+
+class SerieGauge(_Serie):
+    __slots__ = ()
+
+    def inc(self, cantidad=1):
+        self.valor += cantidad
+
+    def dec(self, cantidad=1):
+        self.valor -= cantidad
+
+    def set(self, valor):
+        self.valor = valor
+
+
+class SerieHistograma:
+    __slots__ = ("valores", "limites", "conteos", "suma")
+
+    def __init__(self, valores: tuple, limites: tuple):
+        self.valores = valores
+        self.limites = limites
+        # Un conteo por bucket (no acumulado) más el de +Inf
+        self.conteos = [0] * (len(limites) + 1)
+        self.suma = 0.0
+
+    def observe(self, valor: float):
+        self.conteos[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), funcion=None):
+        if funcion is not None and etiquetas:
+            raise ValueError(f"{nombre}: una métrica calculada no lleva etiquetas")
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        # Valor leído al exponer (p. ej. conexiones en uso de un pool)
+        self.funcion = funcion
+        self._series: dict = {}
+        if not self.etiquetas:
+            self._series[()] = self._nueva_serie(())
+
+    def _nueva_serie(self, valores: tuple):
+        raise NotImplementedError
+
+    def labels(self, *valores):
+        """Serie de esas etiquetas; conviene guardarla en lugar de pedirla cada vez."""
+        serie = self._series.get(valores)
+        if serie is None:
+            if len(valores) != len(self.etiquetas):
+                raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+            serie = self._series.setdefault(valores, self._nueva_serie(tuple(str(v) for v in valores)))
+        return serie
+
+    def _lineas(self) -> list[str]:
+        if self.funcion is not None:
+            return [f"{self.nombre} {_numero(self.funcion())}"]
+        return [
+            f"{self.nombre}{_etiquetas(self.etiquetas, serie.valores)} {_numero(serie.valor)}"
+            for serie in list(self._series.values())
+        ]
+
+    def exponer(self) -> str:
+        ayuda = self.ayuda.replace("\\", "\\\\").replace("\n", "\\n")
+        lineas = [f"# HELP {self.nombre} {ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        lineas.extend(self._lineas())
+        return "\n".join(lineas)
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def _nueva_serie(self, valores: tuple):
+        return SerieContador(valores)
+
+    def inc(self, cantidad=1):
+        self._series[()].inc(cantidad)
+
+
+class Gauge(_Metrica):
+    tipo = "gauge"
+
+    def _nueva_serie(self, valores: tuple):
+        return SerieGauge(valores)
+
+    def inc(self, cantidad=1):
+        self._series[()].inc(cantidad)
+
+    def dec(self, cantidad=1):
+        self._series[()].dec(cantidad)
+
+    def set(self, valor):
+        self._series[()].set(valor)
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), buckets: tuple = BUCKETS_LATENCIA):
+        self.limites = tuple(sorted(buckets))
+        super().__init__(nombre, ayuda, etiquetas)
+
+    def _nueva_serie(self, valores: tuple):
+        return SerieHistograma(valores, self.limites)
+
+    def observe(self, valor: float):
+        self._series[()].observe(valor)
+
+    def _lineas(self) -> list[str]:
+        lineas = []
+        for serie in list(self._series.values()):
+            acumulado = 0
+            for limite, conteo in zip(self.limites + (math.inf,), list(serie.conteos)):
+                acumulado += conteo
+                le = f'le="{_numero(limite)}"'
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, serie.valores, le)} {acumulado}")
+            etiquetas = _etiquetas(self.etiquetas, serie.valores)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {_numero(serie.suma)}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {acumulado}")
+        return lineas
+
+
+class Registro:
+    """
+    Métricas de un proceso. Registrar dos veces el mismo nombre con el
+    mismo tipo retorna la métrica existente (p. ej. si una app arma su
+    middleware de nuevo).
+    """
+
+    def __init__(self):
+        self._metricas: dict[str, _Metrica] = {}
+
+    def _registrar(self, clase, nombre: str, *args, **kwargs):
+        existente = self._metricas.get(nombre)
+        if existente is not None:
+            if type(existente) is not clase:
+                raise ValueError(f"La métrica {nombre} ya existe como {existente.tipo}")
+            return existente
+        metrica = self._metricas[nombre] = clase(nombre, *args, **kwargs)
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: tuple = (), funcion=None) -> Contador:
+        return self._registrar(Contador, nombre, ayuda, etiquetas, funcion)
+
+    def gauge(self, nombre: str, ayuda: str, etiquetas: tuple = (), funcion=None) -> Gauge:
+        return self._registrar(Gauge, nombre, ayuda, etiquetas, funcion)
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: tuple = (), buckets: tuple = BUCKETS_LATENCIA) -> Histograma:
+        return self._registrar(Histograma, nombre, ayuda, etiquetas, buckets)
+
+    def exponer(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus."""
+        bloques = []
+        for metrica in list(self._metricas.values()):
+            try:
+                bloques.append(metrica.exponer())
+            except Exception as e:
+                # Una métrica calculada que falla no tumba el scrape
+                bloques.append(f"# {metrica.nombre} no disponible: {type(e).__name__}")
+        return "\n".join(bloques) + "\n"
+
+
+# Registro único del proceso
+registro = Registro()
+
+
+def _ruta(scope: dict) -> str:
+    """Plantilla de la ruta, no la URL: acota las series."""
+    ruta = scope.get("route")
+    return getattr(ruta, "path", None) or "(sin ruta)"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: duración de cada petición por método, plantilla de la
+    ruta y código de estado (http_request_duration_seconds; su _count es
+    el total de peticiones) y peticiones en curso.
+    """
+
+    def __init__(self, app, registro_metricas: Registro = registro):
+        self.app = app
+        self.duracion = registro_metricas.histograma(
+            "http_request_duration_seconds", "Duración de las peticiones HTTP",
+            ("method", "route", "status"),
+        )
+        self.en_curso = registro_metricas.gauge("http_requests_in_progress", "Peticiones HTTP en curso")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        self.en_curso.inc()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            self.en_curso.dec()
+            self.duracion.labels(scope["method"], _ruta(scope), estado).observe(time.perf_counter() - inicio)
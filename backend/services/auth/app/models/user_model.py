@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -17,10 +17,19 @@ class User(Base):
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        # revoke_all_user_tokens (user_id, is_revoked = False); también
+        # cubre las búsquedas solo por user_id
+        Index("ix_refresh_tokens_user_id_is_revoked", "user_id", "is_revoked"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, index=True, nullable=False)
+    user_id = Column(Integer, nullable=False)
     token = Column(Text, nullable=False)
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    # SHA-256 (hex) del token: las búsquedas van por este índice único,
+    # no por comparación del texto completo
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    # Indexado para la purga de vencidos (app/services/token_purge.py)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
     is_revoked = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
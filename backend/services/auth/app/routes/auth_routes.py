@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
+from app import database
 from app.database import get_db
 from app.schemas.user_schema import (
     UserCreate, UserResponse, LoginRequest, Token, 
@@ -10,6 +11,10 @@ from app.services.user_service import UserService
 from app.services.token_services import TokenService
 from app.dependencies import get_current_user, get_current_superuser
 from app.models.user_model import User
+from app.services.user_cache import user_cache
+from app.services.login_limiter import login_limiter, client_ip
+from app.services.db_metrics import db_metrics
+from app.services.db_pool import pool_stats
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
@@ -54,33 +59,28 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
                 detail="La contraseña debe tener al menos 8 caracteres"
             )
         
-        # Verificar si el usuario ya existe
-        existing_user = UserService.get_user_by_email(db, user.email)
-        if existing_user:
-            print(f"⚠️ Usuario ya existe: {user.email}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="El email ya está registrado"
-            )
-        
-        # Crear usuario
+        # Crear usuario y tokens en una sola transacción: INSERT del usuario
+        # (un email o username repetido falla aquí, por los índices únicos),
+        # INSERT del refresh token y un único commit
         db_user = UserService.create_user(db, user)
-        print(f"✅ Usuario creado exitosamente: {db_user.email} (ID: {db_user.id})")
+        tokens = TokenService.create_tokens(db_user, db, commit=False)
         
-        # Crear tokens
-        tokens = TokenService.create_tokens(db_user, db)
-        print(f"✅ Tokens generados para usuario ID: {db_user.id}")
-        
-        return {
-            "user": db_user,
+        # La respuesta se arma antes del commit, que expira el objeto:
+        # leerlo después costaría otro SELECT
+        respuesta = {
+            "user": UserResponse.model_validate(db_user),
             "tokens": tokens
         }
+        db.commit()
+        print(f"✅ Usuario creado exitosamente: {respuesta['user'].email} (ID: {respuesta['user'].id})")
+        
+        return respuesta
         
     except HTTPException:
         # Re-lanzar HTTPException tal cual
         raise
     except IntegrityError as e:
-        # Error de integridad de base de datos (email duplicado, etc.)
+        # Duplicados en el commit (create_user ya los detecta en el INSERT)
         print(f"❌ Error de integridad: {str(e)}")
         db.rollback()
         raise HTTPException(
@@ -99,7 +99,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+def login(login_data: LoginRequest, request: Request, db: Session = Depends(get_db)):
     """Inicia sesión y retorna tokens JWT"""
     try:
         print(f"🔐 Intento de login: {login_data.email}")
@@ -117,11 +117,17 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
                 detail="La contraseña es requerida"
             )
         
+        # Limitar intentos antes de cualquier verificación Argon2
+        if login_limiter is not None:
+            login_limiter.check(login_data.email, client_ip(request))
+        
         # Autenticar usuario
         user = UserService.authenticate_user(db, login_data.email, login_data.password)
         
         if not user:
             print(f"❌ Credenciales inválidas para: {login_data.email}")
+            if login_limiter is not None:
+                login_limiter.record_failure(login_data.email)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Email o contraseña incorrectos",
@@ -129,10 +135,14 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
             )
         
         print(f"✅ Usuario autenticado: {user.email} (ID: {user.id})")
+        if login_limiter is not None:
+            login_limiter.record_success(login_data.email)
         
-        # Crear tokens
+        # Crear tokens: un solo commit, que también guarda el hash
+        # actualizado si authenticate_user lo migró (p. ej. de bcrypt)
+        user_id = user.id
         tokens = TokenService.create_tokens(user, db)
-        print(f"✅ Tokens generados para usuario ID: {user.id}")
+        print(f"✅ Tokens generados para usuario ID: {user_id}")
         
         return tokens
         
@@ -246,6 +256,9 @@ def update_me(
         updated_user = UserService.update_user(db, current_user.id, user_update)
         print(f"✅ Usuario actualizado ID: {current_user.id}")
         return updated_user
+    except HTTPException:
+        # 400/404 de update_user y 503 + Retry-After del pool de hashing
+        raise
     except Exception as e:
         print(f"❌ Error al actualizar usuario: {str(e)}")
         raise HTTPException(
@@ -279,6 +292,43 @@ def get_user(
             detail="Error al obtener usuario"
         )
 
+@router.get("/admin/token-purge")
+def token_purge_stats(
+    request: Request,
+    current_user: User = Depends(get_current_superuser)
+):
+    """Métricas de la purga de refresh tokens (solo superusuarios)"""
+    purger = getattr(request.app.state, "token_purger", None)
+    if purger is None:
+        return {"enabled": False}
+    return purger.stats()
+
+@router.get("/admin/user-cache")
+def user_cache_stats(current_user: User = Depends(get_current_superuser)):
+    """Aciertos de la caché de usuarios y consultas ahorradas (solo superusuarios)"""
+    if user_cache is None:
+        return {"enabled": False}
+    return user_cache.stats()
+
+@router.get("/admin/login-limiter")
+def login_limiter_stats(current_user: User = Depends(get_current_superuser)):
+    """Intentos de login rechazados y bloqueos (solo superusuarios)"""
+    if login_limiter is None:
+        return {"enabled": False}
+    return login_limiter.stats()
+
+@router.get("/admin/db-metrics")
+def db_metrics_stats(current_user: User = Depends(get_current_superuser)):
+    """Sentencias SQL y tiempo de BD por ruta, y sentencias lentas (solo superusuarios)"""
+    if db_metrics is None:
+        return {"enabled": False}
+    return db_metrics.stats()
+
+@router.get("/admin/db-pool")
+def db_pool_stats(current_user: User = Depends(get_current_superuser)):
+    """Conexiones en uso, overflow, espera por conexión y timeouts del pool (solo superusuarios)"""
+    return pool_stats(database.engine)
+
 @router.get("/verify", response_model=MessageResponse)
 def verify_token(current_user: User = Depends(get_current_user)):
     """Verifica si el token es válido"""
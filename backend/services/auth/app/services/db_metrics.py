@@ -0,0 +1,221 @@
+# Copia idéntica en auth/ y transacciones/ (app/services/db_metrics.py);
+# backend/tests/test_modulos_compartidos.py falla si divergen.
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class EstadisticasPeticion:
+    """Sentencias, tiempo en la BD y espera por conexiones de una petición."""
+
+    __slots__ = ("scope", "queries", "db_seconds", "checkouts", "checkout_wait_seconds")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.checkouts = 0
+        self.checkout_wait_seconds = 0.0
+
+    def cabeceras(self) -> list[tuple[bytes, bytes]]:
+        return [
+            (b"x-db-queries", str(self.queries).encode()),
+            (b"x-db-time-ms", f"{self.db_seconds * 1000:.2f}".encode()),
+            (b"x-db-checkout-wait-ms", f"{self.checkout_wait_seconds * 1000:.2f}".encode()),
+        ]
+
+
+# Petición en curso. El middleware guarda un objeto mutable: el threadpool
+# de FastAPI copia el contexto, así que los hilos que atienden la petición
+# acumulan en ese mismo objeto
+_peticion_actual: ContextVar[Optional[EstadisticasPeticion]] = ContextVar("db_metrics_peticion", default=None)
+
+
+def _ruta(scope: dict) -> str:
+    """Plantilla de la ruta ("GET /transactions/{id}"), no la URL: acota las claves."""
+    ruta = scope.get("route")
+    if ruta is None or not hasattr(ruta, "path"):
+        return "(sin ruta)"
+    return f"{scope.get('method', '')} {ruta.path}"
+
+
+class _Ruta:
+    __slots__ = ("requests", "queries", "queries_max", "db_seconds", "checkout_wait_seconds", "checkout_wait_max")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.queries_max = 0
+        self.db_seconds = 0.0
+        self.checkout_wait_seconds = 0.0
+        self.checkout_wait_max = 0.0
+
+    def a_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "queries_avg": round(self.queries / self.requests, 2),
+            "queries_max": self.queries_max,
+            "db_ms_avg": round(self.db_seconds * 1000 / self.requests, 3),
+            "db_ms_total": round(self.db_seconds * 1000, 1),
+            "checkout_wait_ms_avg": round(self.checkout_wait_seconds * 1000 / self.requests, 3),
+            "checkout_wait_ms_max": round(self.checkout_wait_max * 1000, 3),
+        }
+
+
+class DbMetrics:
+    """
+    Cuántas sentencias SQL emite cada endpoint, cuánto tarda en la BD y
+    cuánto espera por una conexión del pool, sin el echo de SQLAlchemy
+    (que imprime todo).
+
+    - instrumentar(engine) cuelga los eventos before/after_cursor_execute;
+    - QueuePoolMedido (db_pool.py) le pasa la espera de cada checkout;
+    - DbMetricsMiddleware abre las estadísticas de cada petición, las
+      suma a las de su ruta y, con DEBUG, las envía como cabeceras
+      X-DB-Queries, X-DB-Time-Ms y X-DB-Checkout-Wait-Ms.
+
+    Las sentencias más lentas que slow_query_seconds se guardan (solo el
+    SQL, nunca los parámetros) en un buffer de las últimas
+    slow_query_samples. El trabajo fuera de una petición (hilos de fondo)
+    cuenta solo en los totales.
+
+    Los totales y los agregados por ruta se actualizan desde los hilos del
+    threadpool: van bajo _lock. Las estadísticas de una petición no, solo
+    las toca la petición en curso.
+    """
+
+    def __init__(self, slow_query_seconds: float, slow_query_samples: int):
+        self.slow_query_seconds = slow_query_seconds
+        self._lentas: deque = deque(maxlen=slow_query_samples)
+        self._rutas: dict[str, _Ruta] = {}
+        self._lock = threading.Lock()
+
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.checkouts = 0
+        self.checkout_wait_seconds = 0.0
+        self.checkout_wait_max = 0.0
+        self.slow_queries = 0
+
+    def instrumentar(self, engine):
+        event.listen(engine, "before_cursor_execute", self._antes)
+        event.listen(engine, "after_cursor_execute", self._despues)
+
+    def _antes(self, conexion, _cursor, _sql, _parametros, _contexto, _executemany):
+        conexion.info["db_metrics_inicio"] = time.perf_counter()
+
+    def _despues(self, conexion, _cursor, sql, _parametros, _contexto, _executemany):
+        inicio = conexion.info.pop("db_metrics_inicio", None)
+        if inicio is None:
+            return
+        duracion = time.perf_counter() - inicio
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            peticion.queries += 1
+            peticion.db_seconds += duracion
+        lenta = None
+        if duracion >= self.slow_query_seconds:
+            lenta = {
+                "at": datetime.utcnow().isoformat(),
+                "route": _ruta(peticion.scope) if peticion is not None else None,
+                "ms": round(duracion * 1000, 3),
+                "statement": " ".join(sql.split())[:1000],
+            }
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += duracion
+            if lenta is not None:
+                self.slow_queries += 1
+                self._lentas.append(lenta)
+
+    def registrar_checkout(self, espera: float):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_seconds += espera
+            self.checkout_wait_max = max(self.checkout_wait_max, espera)
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            peticion.checkouts += 1
+            peticion.checkout_wait_seconds += espera
+
+    def registrar_peticion(self, peticion: EstadisticasPeticion):
+        clave = _ruta(peticion.scope)
+        with self._lock:
+            ruta = self._rutas.get(clave)
+            if ruta is None:
+                ruta = self._rutas[clave] = _Ruta()
+            ruta.requests += 1
+            ruta.queries += peticion.queries
+            ruta.queries_max = max(ruta.queries_max, peticion.queries)
+            ruta.db_seconds += peticion.db_seconds
+            ruta.checkout_wait_seconds += peticion.checkout_wait_seconds
+            ruta.checkout_wait_max = max(ruta.checkout_wait_max, peticion.checkout_wait_seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            rutas = {clave: ruta.a_dict() for clave, ruta in self._rutas.items()}
+            datos = {
+                "enabled": True,
+                "queries": self.queries,
+                "db_seconds": round(self.db_seconds, 3),
+                "checkouts": self.checkouts,
+                "checkout_wait_seconds": round(self.checkout_wait_seconds, 3),
+                "checkout_wait_ms_max": round(self.checkout_wait_max * 1000, 3),
+                "slow_query_ms": self.slow_query_seconds * 1000,
+                "slow_queries": self.slow_queries,
+            }
+            lentas = list(reversed(self._lentas))
+        # Las rutas que más tiempo pasan en la BD primero
+        datos["routes"] = dict(sorted(rutas.items(), key=lambda item: item[1]["db_ms_total"], reverse=True))
+        datos["slow_query_samples"] = lentas
+        return datos
+
+
+class DbMetricsMiddleware:
+    """
+    Middleware ASGI: abre las estadísticas de la petición y al terminar las
+    suma a su ruta. Las cabeceras reflejan lo hecho hasta que empieza la
+    respuesta (un streaming posterior solo cuenta en los agregados).
+    """
+
+    def __init__(self, app, metrics: DbMetrics, headers: bool = False):
+        self.app = app
+        self.metrics = metrics
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        peticion = EstadisticasPeticion(scope)
+        token = _peticion_actual.set(peticion)
+
+        async def enviar(mensaje):
+            if self.headers and mensaje["type"] == "http.response.start":
+                mensaje["headers"] = list(mensaje.get("headers", [])) + peticion.cabeceras()
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _peticion_actual.reset(token)
+            self.metrics.registrar_peticion(peticion)
+
+
+db_metrics: Optional[DbMetrics] = None
+if settings.DB_METRICS_ENABLED:
+    db_metrics = DbMetrics(
+        slow_query_seconds=settings.DB_SLOW_QUERY_MS / 1000,
+        slow_query_samples=settings.DB_SLOW_QUERY_SAMPLES,
+    )
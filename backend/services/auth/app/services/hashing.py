@@ -0,0 +1,163 @@
+"""
+Hashing de contraseñas (Argon2) en un pool de procesos dedicado.
+
+Un hash o una verificación Argon2 cuesta decenas de milisegundos de CPU.
+Hechos en línea, cada uno ocupa un hilo del threadpool de FastAPI y, por
+el GIL, varios logins simultáneos no escalan con los núcleos. Aquí se
+envían a un ProcessPoolExecutor; el hilo de la petición solo espera el
+resultado.
+
+La cola es acotada: con 'max_pendientes' trabajos en curso o en espera,
+un trabajo nuevo se rechaza al instante con 503 y Retry-After en lugar de
+acumular latencia (y conexiones de BD retenidas) detrás de los demás.
+
+Con procesos=0 el hashing se hace en línea, como antes (útil en
+desarrollo y como referencia en el benchmark).
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+
+def crear_contexto(time_cost: int, memory_cost: int, parallelism: int) -> CryptContext:
+    """
+    Argon2id por defecto; bcrypt solo se verifica (obsoleto). Un hash con
+    parámetros distintos a los actuales se marca para actualizar en
+    verify_and_update, así que subir el costo migra los hashes en el login.
+    """
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated="bcrypt",
+        argon2__rounds=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+
+
+# --- Lado del proceso hijo ---
+
+_contexto: Optional[CryptContext] = None
+
+
+def _inicializar_proceso(parametros: tuple):
+    global _contexto
+    _contexto = crear_contexto(*parametros)
+
+
+def _hash(password: str) -> str:
+    return _contexto.hash(password)
+
+
+def _verificar(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return _contexto.verify_and_update(password, hashed)
+
+
+# --- Lado del servicio ---
+
+class PoolHashing:
+    """Pool de procesos con admisión acotada para hash/verify de contraseñas."""
+
+    def __init__(self, parametros: tuple, procesos: Optional[int], max_pendientes: int, timeout: float):
+        self.parametros = parametros
+        self.procesos = (os.cpu_count() or 1) if procesos is None else procesos
+        self.timeout = timeout
+        self.contexto_local = crear_contexto(*parametros)
+        self._cupos = threading.BoundedSemaphore(max_pendientes)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Contadores para observar la saturación
+        self.completados = 0
+        self.rechazados = 0
+
+    def iniciar(self) -> Optional[ProcessPoolExecutor]:
+        """
+        Crea el pool (se llama en el arranque; si no, en el primer uso) y lo
+        retorna: quien lo usa se queda con esa referencia aunque otro hilo
+        lo cierre o lo recree después.
+        """
+        if self.procesos <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.procesos,
+                    initializer=_inicializar_proceso,
+                    initargs=(self.parametros,),
+                )
+            return self._executor
+
+    def cerrar(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _descartar(self, executor: ProcessPoolExecutor):
+        """Olvida un pool roto o cerrado; el próximo uso crea otro."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _no_disponible(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio de autenticación no disponible, reintente en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+
+    def _ejecutar(self, funcion, *args):
+        if not self._cupos.acquire(blocking=False):
+            self.rechazados += 1
+            if self.rechazados % 100 == 1:  # en saturación, no inundar el log
+                print(f"⚠️ Pool de hashing saturado, peticiones rechazadas: {self.rechazados}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servicio de autenticación saturado, reintente en unos segundos",
+                headers={"Retry-After": "1"},
+            )
+        executor = self.iniciar()
+        try:
+            futuro = executor.submit(funcion, *args)
+        except (BrokenProcessPool, RuntimeError):
+            # Roto, o cerrado por otro hilo entre iniciar() y submit()
+            self._cupos.release()
+            print("❌ Pool de hashing roto o cerrado, se recreará")
+            self._descartar(executor)
+            raise self._no_disponible()
+        # El cupo se libera cuando el trabajo termina (o se cancela antes de
+        # empezar), no cuando la petición deja de esperarlo: un trabajo que
+        # venció sigue ocupando un proceso hasta terminar
+        futuro.add_done_callback(lambda _: self._cupos.release())
+
+        try:
+            resultado = futuro.result(timeout=self.timeout)
+        except FuturesTimeout:
+            futuro.cancel()  # solo surte efecto si aún no empezó
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Tiempo de espera agotado al procesar la contraseña",
+                headers={"Retry-After": "1"},
+            )
+        except BrokenProcessPool:
+            # Un proceso murió (p. ej. OOM): se recrea el pool en el próximo uso
+            print("❌ Pool de hashing roto, se recreará")
+            self._descartar(executor)
+            raise self._no_disponible()
+        self.completados += 1
+        return resultado
+
+    def hash(self, password: str) -> str:
+        if self.procesos <= 0:
+            return self.contexto_local.hash(password)
+        return self._ejecutar(_hash, password)
+
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        if self.procesos <= 0:
+            return self.contexto_local.verify_and_update(password, hashed)
+        return self._ejecutar(_verificar, password, hashed)
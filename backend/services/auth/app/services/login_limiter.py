@@ -0,0 +1,250 @@
+import ipaddress
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class _MemoryStore:
+    """Ventanas deslizantes y bloqueos en el proceso, acotados a max_keys (LRU)."""
+
+    def __init__(self, max_keys: int, max_events: int):
+        self.max_keys = max_keys
+        self.max_events = max_events
+        self._eventos: "OrderedDict[str, deque]" = OrderedDict()
+        self._bloqueos: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _acotar(self, tabla: OrderedDict, clave: str):
+        tabla.move_to_end(clave)
+        while len(tabla) > self.max_keys:
+            tabla.popitem(last=False)
+
+    def add(self, clave: str, ahora: float, ventana: float) -> int:
+        """Registra un evento; retorna cuántos hay en la ventana."""
+        with self._lock:
+            eventos = self._eventos.get(clave)
+            if eventos is None:
+                eventos = self._eventos[clave] = deque(maxlen=self.max_events)
+            eventos.append(ahora)
+            self._acotar(self._eventos, clave)
+            while eventos and eventos[0] <= ahora - ventana:
+                eventos.popleft()
+            return len(eventos)
+
+    def count(self, clave: str, ahora: float, ventana: float) -> tuple[int, Optional[float]]:
+        """(eventos en la ventana, momento del último)."""
+        with self._lock:
+            eventos = self._eventos.get(clave)
+            if not eventos:
+                return 0, None
+            while eventos and eventos[0] <= ahora - ventana:
+                eventos.popleft()
+            return len(eventos), (eventos[-1] if eventos else None)
+
+    def clear(self, clave: str):
+        with self._lock:
+            self._eventos.pop(clave, None)
+
+    def lock(self, clave: str, hasta: float):
+        with self._lock:
+            self._bloqueos[clave] = hasta
+            self._acotar(self._bloqueos, clave)
+
+    def locked_until(self, clave: str, ahora: float) -> Optional[float]:
+        with self._lock:
+            hasta = self._bloqueos.get(clave)
+            if hasta is not None and hasta <= ahora:
+                del self._bloqueos[clave]
+                return None
+            return hasta
+
+
+class _RedisStore:
+    """Las mismas operaciones sobre Redis (sorted sets), compartidas entre workers."""
+
+    def __init__(self, cliente):
+        self.redis = cliente
+
+    def add(self, clave: str, ahora: float, ventana: float) -> int:
+        pipe = self.redis.pipeline()
+        pipe.zremrangebyscore(clave, 0, ahora - ventana)
+        pipe.zadd(clave, {f"{ahora}:{uuid.uuid4().hex[:8]}": ahora})
+        pipe.zcard(clave)
+        pipe.expire(clave, math.ceil(ventana))
+        return pipe.execute()[2]
+
+    def count(self, clave: str, ahora: float, ventana: float) -> tuple[int, Optional[float]]:
+        pipe = self.redis.pipeline()
+        pipe.zremrangebyscore(clave, 0, ahora - ventana)
+        pipe.zcard(clave)
+        pipe.zrange(clave, -1, -1, withscores=True)
+        _, n, ultimo = pipe.execute()
+        return n, (ultimo[0][1] if ultimo else None)
+
+    def clear(self, clave: str):
+        self.redis.delete(clave)
+
+    def lock(self, clave: str, hasta: float):
+        self.redis.set(f"{clave}:lock", hasta, ex=max(1, math.ceil(hasta - time.time())))
+
+    def locked_until(self, clave: str, ahora: float) -> Optional[float]:
+        hasta = self.redis.get(f"{clave}:lock")
+        return float(hasta) if hasta is not None else None
+
+
+class LoginLimiter:
+    """
+    Limita los intentos de login antes de verificar la contraseña (la
+    verificación Argon2 es la operación más cara del servicio), para que
+    una ráfaga de credential stuffing no sature la CPU:
+
+    - por IP: todos los intentos en una ventana deslizante; al superar el
+      máximo, la IP queda bloqueada un tiempo;
+    - por email: los fallos en la ventana. Desde cierto número de fallos,
+      cada intento debe esperar un retraso que se duplica con cada fallo
+      (se responde 429 con Retry-After, sin retener un hilo dormido); al
+      llegar al máximo, el email queda bloqueado.
+
+    Un login exitoso limpia los fallos de su email. Si el almacén
+    compartido (Redis) falla, el limitador deja pasar: no bloquea logins
+    legítimos por una caída de la caché.
+    """
+
+    def __init__(self, store, window_seconds: float, ip_max_attempts: int, email_max_failures: int,
+                 delay_after_failures: int, delay_base_seconds: float, lockout_seconds: float):
+        self.store = store
+        self.window_seconds = window_seconds
+        self.ip_max_attempts = ip_max_attempts
+        self.email_max_failures = email_max_failures
+        self.delay_after_failures = delay_after_failures
+        self.delay_base_seconds = delay_base_seconds
+        self.lockout_seconds = lockout_seconds
+
+        self.rejected = {"locked": 0, "ip": 0, "delay": 0}
+        self.lockouts = 0
+        self.errors = 0
+
+    def _rechazar(self, motivo: str, segundos: float):
+        self.rejected[motivo] += 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos de inicio de sesión, intente más tarde",
+            headers={"Retry-After": str(max(1, math.ceil(segundos)))},
+        )
+
+    def check(self, email: str, ip: str):
+        """Lanza 429 si el intento no debe llegar a verificar la contraseña."""
+        ahora = time.time()
+        clave_email, clave_ip = f"login:email:{email.lower()}", f"login:ip:{ip}"
+        try:
+            for clave in (clave_ip, clave_email):
+                hasta = self.store.locked_until(clave, ahora)
+                if hasta is not None:
+                    self._rechazar("locked", hasta - ahora)
+
+            if self.store.add(clave_ip, ahora, self.window_seconds) > self.ip_max_attempts:
+                self.store.lock(clave_ip, ahora + self.lockout_seconds)
+                self.lockouts += 1
+                print(f"🚫 IP {ip} bloqueada {self.lockout_seconds:.0f}s por exceso de intentos de login")
+                self._rechazar("ip", self.lockout_seconds)
+
+            fallos, ultimo = self.store.count(clave_email, ahora, self.window_seconds)
+            if fallos >= self.delay_after_failures and ultimo is not None:
+                espera = min(self.delay_base_seconds * 2 ** (fallos - self.delay_after_failures), self.lockout_seconds)
+                if ahora < ultimo + espera:
+                    self._rechazar("delay", ultimo + espera - ahora)
+        except HTTPException:
+            raise
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Limitador de login no disponible, se permite el intento: {e}")
+
+    def record_failure(self, email: str):
+        ahora = time.time()
+        clave = f"login:email:{email.lower()}"
+        try:
+            if self.store.add(clave, ahora, self.window_seconds) >= self.email_max_failures:
+                self.store.lock(clave, ahora + self.lockout_seconds)
+                self.store.clear(clave)
+                self.lockouts += 1
+                print(f"🚫 Email {email} bloqueado {self.lockout_seconds:.0f}s por fallos de login")
+        except Exception:
+            self.errors += 1
+
+    def record_success(self, email: str):
+        try:
+            self.store.clear(f"login:email:{email.lower()}")
+        except Exception:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": True,
+            "backend": "redis" if isinstance(self.store, _RedisStore) else "local",
+            "rejected": dict(self.rejected),
+            "rejected_total": sum(self.rejected.values()),
+            "lockouts": self.lockouts,
+            "errors": self.errors,
+        }
+
+
+_proxies_confiables = [ipaddress.ip_network(red.strip()) for red in settings.LOGIN_TRUSTED_PROXIES.split(",") if red.strip()]
+
+
+def _es_confiable(ip: str) -> bool:
+    try:
+        direccion = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(direccion in red for red in _proxies_confiables)
+
+
+def client_ip(request: Request) -> str:
+    """
+    IP del cliente. Detrás del gateway (un proxy confiable) se toma de
+    X-Forwarded-For, de derecha a izquierda saltando los proxies
+    confiables; de otro modo, un cliente podría falsear su IP.
+    """
+    ip = request.client.host if request.client else "desconocida"
+    reenviado = request.headers.get("x-forwarded-for")
+    if not reenviado or not _es_confiable(ip):
+        return ip
+    cadena = [parte.strip() for parte in reenviado.split(",") if parte.strip()]
+    for salto in reversed(cadena):
+        if not _es_confiable(salto):
+            return salto
+    return cadena[0] if cadena else ip
+
+
+def _crear_store():
+    eventos = max(settings.LOGIN_IP_MAX_ATTEMPTS, settings.LOGIN_EMAIL_MAX_FAILURES) + 1
+    if settings.LOGIN_LIMITER_REDIS_URL:
+        try:
+            import redis
+        except ImportError:
+            print("⚠️ LOGIN_LIMITER_REDIS_URL configurado pero 'redis' no está instalado; se usa memoria local")
+        else:
+            return _RedisStore(redis.Redis.from_url(settings.LOGIN_LIMITER_REDIS_URL, socket_timeout=0.05))
+    return _MemoryStore(settings.LOGIN_LIMITER_MAX_KEYS, eventos)
+
+
+login_limiter: Optional[LoginLimiter] = None
+if settings.LOGIN_LIMIT_ENABLED:
+    login_limiter = LoginLimiter(
+        store=_crear_store(),
+        window_seconds=settings.LOGIN_WINDOW_SECONDS,
+        ip_max_attempts=settings.LOGIN_IP_MAX_ATTEMPTS,
+        email_max_failures=settings.LOGIN_EMAIL_MAX_FAILURES,
+        delay_after_failures=settings.LOGIN_DELAY_AFTER_FAILURES,
+        delay_base_seconds=settings.LOGIN_DELAY_BASE_SECONDS,
+        lockout_seconds=settings.LOGIN_LOCKOUT_SECONDS,
+    )
@@ -1,8 +1,10 @@
+import hashlib
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional, Tuple  # <-- MODIFICADO: Añadido Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from app.config import get_settings
+from app.services.hashing import PoolHashing
 
 settings = get_settings()
 
@@ -11,10 +13,15 @@ settings = get_settings()
 # 2. "bcrypt" se marca como obsoleto (deprecated).
 #    Esto significa que `passlib` PUEDE verificar hashes bcrypt,
 #    pero NUNCA creará uno nuevo.
-pwd_context = CryptContext(
-    schemes=["argon2", "bcrypt"], 
-    deprecated="bcrypt"
+# 3. El hash y la verificación corren en un pool de procesos acotado
+#    (ver app/services/hashing.py), con el costo de Argon2 en Settings.
+pool_hashing = PoolHashing(
+    parametros=(settings.ARGON2_TIME_COST, settings.ARGON2_MEMORY_COST, settings.ARGON2_PARALLELISM),
+    procesos=settings.ARGON2_POOL_PROCESSES,
+    max_pendientes=settings.ARGON2_POOL_MAX_PENDING,
+    timeout=settings.ARGON2_POOL_TIMEOUT_SECONDS,
 )
+pwd_context = pool_hashing.contexto_local
 # --- FIN DE MODIFICACIÓN ---
 
 
@@ -30,7 +37,7 @@ def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Op
     # 1. Compara la contraseña con el hash (entiende si es bcrypt o argon2).
     # 2. Si es válida Y el hash es "bcrypt" (obsoleto), genera un nuevo hash "argon2".
     # 3. Si el hash ya es "argon2" (o no es obsoleto), nuevo_hash_opcional será None.
-    return pwd_context.verify_and_update(plain_password, hashed_password)
+    return pool_hashing.verify_and_update(plain_password, hashed_password)
 # --- FIN DE MODIFICACIÓN ---
 
 
@@ -39,7 +46,7 @@ def get_password_hash(password: str) -> str:
     Genera el hash de una contraseña.
     (Ahora usará argon2 por defecto, ¡sin límite de 72 caracteres!)
     """
-    return pwd_context.hash(password)
+    return pool_hashing.hash(password)
 
 # --- TUS FUNCIONES JWT (Están perfectas, no necesitan cambios) ---
 
@@ -65,10 +72,16 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None)
     else:
         expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     
-    to_encode.update({"exp": expire, "type": "refresh"})
+    # jti: dos refresh tokens del mismo usuario emitidos en el mismo
+    # segundo ya no son idénticos (token_hash es único)
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def hash_token(token: str) -> str:
+    """SHA-256 (hex) con el que se guarda y se busca un refresh token"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
 def decode_token(token: str) -> dict:
     """Decodifica y verifica un token JWT"""
     try:
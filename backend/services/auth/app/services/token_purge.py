@@ -0,0 +1,158 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.user_model import RefreshToken
+
+settings = get_settings()
+
+
+class TokenPurger:
+    """
+    Borra en segundo plano los refresh tokens vencidos o revocados, que
+    de otro modo se acumulan para siempre (cada login inserta uno).
+
+    Trabaja en lotes pequeños, cada uno en su propia transacción corta
+    (SELECT de ids + DELETE por clave primaria) y con una pausa entre
+    lotes, para no retener locks sobre filas que el login y el refresh
+    están usando:
+    - vencidos: por el índice de expires_at, los más antiguos primero;
+    - revocados: recorriendo la clave primaria por ventanas acotadas, así
+      cada consulta examina un número fijo de filas.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = None,
+        pause_seconds: float = None,
+        interval_seconds: float = None,
+        expired_grace_minutes: int = None,
+    ):
+        self.batch_size = batch_size or settings.TOKEN_PURGE_BATCH_SIZE
+        self.pause_seconds = pause_seconds if pause_seconds is not None else settings.TOKEN_PURGE_PAUSE_SECONDS
+        self.interval_seconds = interval_seconds or settings.TOKEN_PURGE_INTERVAL_SECONDS
+        self.expired_grace = timedelta(minutes=(
+            expired_grace_minutes if expired_grace_minutes is not None else settings.TOKEN_PURGE_EXPIRED_GRACE_MINUTES
+        ))
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Métricas (ver stats())
+        self.cycles = 0
+        self.batches = 0
+        self.purged_expired = 0
+        self.purged_revoked = 0
+        self.seconds_in_db = 0.0
+        self.errors = 0
+        self.last_cycle: Optional[dict] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="token-purger", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_cycle()
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Error en la purga de refresh tokens: {e}")
+            self._stop.wait(self.interval_seconds)
+
+    def run_cycle(self) -> dict:
+        """Un recorrido completo: vencidos y luego revocados."""
+        inicio = time.monotonic()
+        expired = self._purge_expired()
+        revoked = self._purge_revoked()
+        self.cycles += 1
+        self.last_cycle = {
+            "finished_at": datetime.utcnow().isoformat(),
+            "duration_seconds": round(time.monotonic() - inicio, 3),
+            "purged_expired": expired,
+            "purged_revoked": revoked,
+        }
+        if expired or revoked:
+            print(f"🧹 Purga de refresh tokens: {expired} vencidos, {revoked} revocados "
+                  f"en {self.last_cycle['duration_seconds']} s")
+        return self.last_cycle
+
+    def _delete_batch(self, db, ids: list) -> int:
+        db.query(RefreshToken).filter(RefreshToken.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        return len(ids)
+
+    def _purge_expired(self) -> int:
+        total = 0
+        cutoff = datetime.utcnow() - self.expired_grace
+        while not self._stop.is_set():
+            inicio = time.monotonic()
+            with SessionLocal() as db:
+                ids = [fila.id for fila in db.query(RefreshToken.id)
+                       .filter(RefreshToken.expires_at < cutoff)
+                       .order_by(RefreshToken.expires_at)
+                       .limit(self.batch_size)]
+                if ids:
+                    total += self._delete_batch(db, ids)
+            self._account(inicio)
+            self.purged_expired += len(ids)
+            if len(ids) < self.batch_size:
+                break
+            self._stop.wait(self.pause_seconds)
+        return total
+
+    def _purge_revoked(self) -> int:
+        total = 0
+        with SessionLocal() as db:
+            max_id = db.query(func.max(RefreshToken.id)).scalar()
+        if max_id is None:
+            return 0
+        # Ventana de ids por consulta: acota las filas examinadas aunque
+        # haya pocas revocadas
+        window = self.batch_size * 10
+        cursor = 0
+        while cursor <= max_id and not self._stop.is_set():
+            inicio = time.monotonic()
+            with SessionLocal() as db:
+                ids = [fila.id for fila in db.query(RefreshToken.id)
+                       .filter(RefreshToken.id > cursor,
+                               RefreshToken.id <= cursor + window,
+                               RefreshToken.is_revoked == True)  # noqa: E712
+                       .order_by(RefreshToken.id)
+                       .limit(self.batch_size)]
+                if ids:
+                    total += self._delete_batch(db, ids)
+            self._account(inicio)
+            self.purged_revoked += len(ids)
+            # Lote lleno: puede quedar más en esta ventana; si no, la siguiente
+            cursor = ids[-1] if len(ids) == self.batch_size else cursor + window
+            if ids:
+                self._stop.wait(self.pause_seconds)
+        return total
+
+    def _account(self, inicio: float):
+        self.batches += 1
+        self.seconds_in_db += time.monotonic() - inicio
+
+    def stats(self) -> dict:
+        return {
+            "enabled": True,
+            "batch_size": self.batch_size,
+            "interval_seconds": self.interval_seconds,
+            "cycles": self.cycles,
+            "batches": self.batches,
+            "purged_expired": self.purged_expired,
+            "purged_revoked": self.purged_revoked,
+            "seconds_in_db": round(self.seconds_in_db, 3),
+            "errors": self.errors,
+            "last_cycle": self.last_cycle,
+        }
@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.models.user_model import RefreshToken, User
-from app.services.security import create_access_token, create_refresh_token, decode_token
+from app.services.security import create_access_token, create_refresh_token, decode_token, hash_token
 from app.config import get_settings
 from typing import Dict
 
@@ -10,8 +10,12 @@ settings = get_settings()
 class TokenService:
     
     @staticmethod
-    def create_tokens(user: User, db: Session) -> Dict[str, str]:
-        """Crea access token y refresh token para un usuario"""
+    def create_tokens(user: User, db: Session, commit: bool = True) -> Dict[str, str]:
+        """
+        Crea access token y refresh token para un usuario.
+        Con commit=False el refresh token queda en la transacción en curso
+        (el registro lo confirma junto con el usuario).
+        """
         # Crear access token
         access_token = create_access_token(
             data={"sub": str(user.id), "email": user.email}
@@ -27,10 +31,12 @@ class TokenService:
         db_refresh_token = RefreshToken(
             user_id=user.id,
             token=refresh_token,
+            token_hash=hash_token(refresh_token),
             expires_at=expires_at
         )
         db.add(db_refresh_token)
-        db.commit()
+        if commit:
+            db.commit()
         
         return {
             "access_token": access_token,
@@ -50,9 +56,9 @@ class TokenService:
         if payload.get("type") != "refresh":
             return None
         
-        # Buscar en BD
+        # Buscar en BD (por el índice único de token_hash)
         db_token = db.query(RefreshToken).filter(
-            RefreshToken.token == token,
+            RefreshToken.token_hash == hash_token(token),
             RefreshToken.is_revoked == False
         ).first()
         
@@ -68,7 +74,7 @@ class TokenService:
     @staticmethod
     def revoke_refresh_token(token: str, db: Session) -> bool:
         """Revoca un refresh token"""
-        db_token = db.query(RefreshToken).filter(RefreshToken.token == token).first()
+        db_token = db.query(RefreshToken).filter(RefreshToken.token_hash == hash_token(token)).first()
         if db_token:
             db_token.is_revoked = True
             db.commit()
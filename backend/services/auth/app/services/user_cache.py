@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.user_model import User
+
+settings = get_settings()
+
+# Campos que necesitan get_current_user (la decisión de acceso) y
+# UserResponse; nunca el hash de la contraseña
+CAMPOS = ("id", "email", "username", "full_name", "is_active", "is_superuser", "created_at")
+
+
+def _a_dict(user: User) -> dict:
+    return {campo: getattr(user, campo) for campo in CAMPOS}
+
+
+class UserCache:
+    """
+    Caché con TTL de los usuarios que resuelve get_current_user, para no
+    consultar MySQL en cada /me, /verify o logout que valida el gateway.
+
+    Por defecto vive en el proceso (LRU acotado a max_entries). Con
+    USER_CACHE_REDIS_URL se comparte entre workers vía Redis; sin Redis,
+    la invalidación solo llega al worker que hizo el cambio y los demás
+    pueden ver el dato anterior hasta que venza el TTL.
+
+    La invalidación es automática: cualquier cambio o borrado de un User
+    por el ORM (update_user, una desactivación) lo saca de la caché al
+    hacer commit (ver _registrar_eventos). Los UPDATE masivos con
+    query().update() no pasan por aquí.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, redis_url: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local: "OrderedDict[int, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        if redis_url:
+            try:
+                import redis
+            except ImportError:
+                print("⚠️ USER_CACHE_REDIS_URL configurado pero 'redis' no está instalado; se usa la caché local")
+            else:
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.05)
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self._redis is not None else "local"
+
+    @staticmethod
+    def _clave(user_id: int) -> str:
+        return f"auth:user:{user_id}"
+
+    def get(self, user_id: int) -> Optional[User]:
+        """Usuario en caché como objeto User desligado de la sesión, o None."""
+        datos = self._leer(user_id)
+        if datos is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return User(**datos)
+
+    def set(self, user: User):
+        datos = _a_dict(user)
+        if self._redis is not None:
+            try:
+                serial = {**datos, "created_at": datos["created_at"].isoformat() if datos["created_at"] else None}
+                self._redis.setex(self._clave(user.id), int(self.ttl_seconds) or 1, json.dumps(serial))
+            except Exception:
+                self.errors += 1
+            return
+        with self._lock:
+            self._local[user.id] = (time.monotonic() + self.ttl_seconds, datos)
+            self._local.move_to_end(user.id)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        self.invalidations += 1
+        if self._redis is not None:
+            try:
+                self._redis.delete(self._clave(user_id))
+            except Exception:
+                self.errors += 1
+        with self._lock:
+            self._local.pop(user_id, None)
+
+    def _leer(self, user_id: int) -> Optional[dict]:
+        if self._redis is not None:
+            try:
+                crudo = self._redis.get(self._clave(user_id))
+            except Exception:
+                # Redis caído: se degrada a consultar la BD
+                self.errors += 1
+                return None
+            if crudo is None:
+                return None
+            datos = json.loads(crudo)
+            if datos["created_at"]:
+                datos["created_at"] = datetime.fromisoformat(datos["created_at"])
+            return datos
+        with self._lock:
+            entrada = self._local.get(user_id)
+            if entrada is None:
+                return None
+            vence, datos = entrada
+            if vence < time.monotonic():
+                del self._local[user_id]
+                return None
+            self._local.move_to_end(user_id)
+            return datos
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": True,
+            "backend": self.backend,
+            "ttl_seconds": self.ttl_seconds,
+            "entries": len(self._local) if self._redis is None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+            # Cada acierto es un SELECT de users que no se hizo
+            "db_queries_saved": self.hits,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+def _registrar_eventos(cache: UserCache):
+    """Invalida al hacer commit los User modificados o borrados en la sesión."""
+
+    @event.listens_for(Session, "after_flush")
+    def _anotar(session, _contexto):
+        ids = session.info.setdefault("usuarios_modificados", set())
+        for objeto in list(session.dirty) + list(session.deleted):
+            if isinstance(objeto, User) and objeto.id is not None:
+                ids.add(objeto.id)
+
+    @event.listens_for(Session, "after_commit")
+    def _invalidar(session):
+        for user_id in session.info.pop("usuarios_modificados", ()):
+            cache.invalidate(user_id)
+
+    @event.listens_for(Session, "after_rollback")
+    def _descartar(session):
+        session.info.pop("usuarios_modificados", None)
+
+
+user_cache: Optional[UserCache] = None
+if settings.USER_CACHE_ENABLED:
+    user_cache = UserCache(
+        ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+        max_entries=settings.USER_CACHE_MAX_ENTRIES,
+        redis_url=settings.USER_CACHE_REDIS_URL,
+    )
+    _registrar_eventos(user_cache)
@@ -1,10 +1,25 @@
+from datetime import datetime
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 from app.models.user_model import User
 from app.schemas.user_schema import UserCreate, UserUpdate
 from app.services.security import get_password_hash, verify_password
 from typing import Optional
 
+
+def _campo_duplicado(error: IntegrityError) -> str:
+    """
+    Campo único violado según el mensaje del motor: MySQL nombra el índice
+    ("Duplicate entry '...' for key 'users.ix_users_username'") y SQLite la
+    columna ("UNIQUE constraint failed: users.username"). Solo se mira esa
+    parte, no el valor duplicado.
+    """
+    mensaje = str(error.orig)
+    restriccion = mensaje.rsplit("for key", 1)[-1] if "for key" in mensaje else mensaje.rsplit(":", 1)[-1]
+    return "username" if "username" in restriccion else "email"
+
+
 class UserService:
     
     @staticmethod
@@ -24,33 +39,35 @@ class UserService:
     
     @staticmethod
     def create_user(db: Session, user: UserCreate) -> User:
-        """Crea un nuevo usuario"""
-        # Verificar si el email ya existe
-        if UserService.get_user_by_email(db, user.email):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="El email ya está registrado"
-            )
-        
-        # Verificar si el username ya existe
-        if UserService.get_user_by_username(db, user.username):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="El username ya está registrado"
-            )
+        """
+        Inserta un nuevo usuario SIN hacer commit: el llamador lo confirma
+        junto con sus tokens (una sola transacción en el registro).
         
-        # Crear usuario
+        Los duplicados los detectan los índices únicos de email y username
+        en el propio INSERT, en lugar de consultar antes de insertar.
+        """
+        # El hash va antes de tocar la BD: no se retiene una conexión
+        # mientras corre Argon2
         hashed_password = get_password_hash(user.password)
         db_user = User(
             email=user.email,
             username=user.username,
             full_name=user.full_name,
-            hashed_password=hashed_password
+            hashed_password=hashed_password,
+            # Asignado aquí y no por el servidor: sin RETURNING (MySQL)
+            # leerlo después del INSERT costaría otro SELECT
+            created_at=datetime.utcnow()
         )
         
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        try:
+            db.flush()
+        except IntegrityError as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El {_campo_duplicado(e)} ya está registrado"
+            )
         return db_user
     
     @staticmethod
@@ -71,12 +88,10 @@ class UserService:
             return None
         
         # Si la verificación fue exitosa y se generó un nuevo hash (porque el
-        # antiguo era obsoleto), se actualiza en la base de datos.
+        # antiguo era obsoleto), se actualiza en la base de datos. Sin commit
+        # propio: se confirma junto con el refresh token del login.
         if new_hash:
             user.hashed_password = new_hash
-            db.add(user)
-            db.commit()
-            db.refresh(user)
             
         if not user.is_active:
             # Considerar lanzar una excepción HTTPException 403 (Forbidden)
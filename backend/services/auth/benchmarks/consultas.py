@@ -0,0 +1,113 @@
+"""
+Presupuesto de idas y vueltas a la BD de register y login.
+
+Se ejecuta desde auth/:
+
+    python -m benchmarks.consultas [-v]
+
+Levanta la app con una BD SQLite temporal, hace cada petición con el
+TestClient de FastAPI y cuenta las sentencias SQL y los commits que
+llegan al engine durante esa petición. Si algún caso supera su
+presupuesto, el código de salida es 1 (-v muestra las sentencias).
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_directorio = tempfile.mkdtemp(prefix="auth-consultas-")
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_directorio) / 'auth.db'}"
+os.environ.setdefault("SECRET_KEY", "presupuesto-de-consultas")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ARGON2_POOL_PROCESSES", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user_model import User  # noqa: E402
+from app.services.hashing import crear_contexto  # noqa: E402
+
+CLAVE = "Password123!"
+
+
+class Contador:
+    def __init__(self):
+        self.sentencias: list[str] = []
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._sentencia)
+        event.listen(engine, "commit", self._commit)
+
+    def _sentencia(self, _conexion, _cursor, sql, *_):
+        self.sentencias.append(" ".join(sql.split())[:110])
+
+    def _commit(self, _conexion):
+        self.commits += 1
+
+    def reiniciar(self):
+        self.sentencias, self.commits = [], 0
+
+
+def _usuario_hash_anterior(email: str):
+    """
+    Usuario con un hash Argon2 de parámetros anteriores: el login debe
+    migrarlo (mismo camino que un hash bcrypt obsoleto).
+    """
+    hash_anterior = crear_contexto(2, 19456, 1).hash(CLAVE)
+    with SessionLocal() as db:
+        db.add(User(email=email, username=email.split("@")[0], hashed_password=hash_anterior))
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-v", action="store_true", help="Muestra las sentencias de cada caso")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    cliente = TestClient(app)
+    contador = Contador()
+
+    registro = {"email": "ana@ejemplo.com", "username": "ana", "password": CLAVE}
+    casos = [
+        # (nombre, preparación, petición, código esperado, máx. sentencias, máx. commits)
+        ("register", None, lambda: cliente.post("/api/auth/register", json=registro), 201, 2, 1),
+        ("register email repetido", None,
+         lambda: cliente.post("/api/auth/register", json={**registro, "username": "otra"}), 400, 1, 0),
+        ("register username repetido", None,
+         lambda: cliente.post("/api/auth/register", json={**registro, "email": "otra@ejemplo.com"}), 400, 1, 0),
+        ("login", None,
+         lambda: cliente.post("/api/auth/login", json={"email": "ana@ejemplo.com", "password": CLAVE}), 200, 2, 1),
+        ("login clave incorrecta", None,
+         lambda: cliente.post("/api/auth/login", json={"email": "ana@ejemplo.com", "password": "incorrecta"}), 401, 1, 0),
+        ("login con hash a migrar", lambda: _usuario_hash_anterior("legado@ejemplo.com"),
+         lambda: cliente.post("/api/auth/login", json={"email": "legado@ejemplo.com", "password": CLAVE}), 200, 3, 1),
+    ]
+
+    fallos = 0
+    print("📏 Sentencias SQL y commits por petición (presupuesto entre paréntesis)")
+    for nombre, preparar, peticion, esperado, max_sentencias, max_commits in casos:
+        if preparar is not None:
+            preparar()
+        contador.reiniciar()
+        respuesta = peticion()
+        ok = (respuesta.status_code == esperado
+              and len(contador.sentencias) <= max_sentencias and contador.commits <= max_commits)
+        fallos += not ok
+        print(f" {'✅' if ok else '❌'} {nombre:<28} HTTP {respuesta.status_code} | "
+              f"{len(contador.sentencias)} sentencias ({max_sentencias}) | {contador.commits} commits ({max_commits})")
+        if args.v or not ok:
+            if respuesta.status_code != esperado:
+                print(f"      esperado HTTP {esperado}: {respuesta.text[:120]}")
+            for sentencia in contador.sentencias:
+                print(f"      {sentencia}")
+
+    if fallos:
+        print(f"\n❌ {fallos} caso(s) fuera de presupuesto")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Logins por segundo (verificación Argon2) según el costo y el modo de hashing.
+
+Se ejecuta desde auth/:
+
+    python -m benchmarks.hashing [--segundos 5] [--hilos 40]
+    python -m benchmarks.hashing --costos 2,19456,1 3,65536,4 --procesos 0,2,4
+
+Por cada costo (time_cost,memory_cost_kib,parallelism) y cada número de
+procesos del pool (0 = en línea, como antes del pool) lanza --hilos hilos
+que verifican contraseñas sin pausa, igual que el threadpool de FastAPI
+con logins concurrentes. Reporta verificaciones/s, por núcleo usado, la
+latencia p50/p99 y cuántas se rechazaron con 503 por cola llena
+(--max-pendientes).
+"""
+import argparse
+import contextlib
+import os
+import statistics
+import threading
+import time
+
+from fastapi import HTTPException
+
+from app.services.hashing import PoolHashing
+
+CLAVE = "Password123!"
+
+
+def medir(costo: tuple, procesos: int, hilos: int, segundos: float, max_pendientes: int) -> dict:
+    pool = PoolHashing(costo, procesos, max_pendientes, timeout=60.0)
+    pool.iniciar()
+    hashed = pool.contexto_local.hash(CLAVE)
+    pool.verify_and_update(CLAVE, hashed)  # calentamiento: arranca los procesos
+
+    latencias: list[float] = []
+    rechazadas = 0
+    lock = threading.Lock()
+    fin = time.perf_counter() + segundos
+
+    def trabajador():
+        nonlocal rechazadas
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            try:
+                valida, _ = pool.verify_and_update(CLAVE, hashed)
+                assert valida
+            except HTTPException:
+                with lock:
+                    rechazadas += 1
+                time.sleep(0.05)  # el cliente recibe el 503 y reintenta
+                continue
+            with lock:
+                latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabajador) for _ in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracion = time.perf_counter() - inicio
+    pool.cerrar()
+
+    nucleos = min(procesos or 1, os.cpu_count() or 1)
+    ordenadas = sorted(latencias) or [0.0]
+    return {
+        "por_segundo": len(latencias) / duracion,
+        "por_nucleo": len(latencias) / duracion / nucleos,
+        "p50_ms": statistics.median(ordenadas) * 1000,
+        "p99_ms": ordenadas[min(len(ordenadas) - 1, int(0.99 * len(ordenadas)))] * 1000,
+        "rechazadas": rechazadas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--costos", nargs="+", default=["2,19456,1", "3,65536,4"],
+                        help="time_cost,memory_cost_kib,parallelism (el segundo es el valor por defecto)")
+    parser.add_argument("--procesos", default=f"0,{os.cpu_count() or 1}",
+                        help="Procesos del pool, separados por coma (0 = en línea)")
+    parser.add_argument("--hilos", type=int, default=40, help="Logins concurrentes (threadpool de FastAPI: 40)")
+    parser.add_argument("--segundos", type=float, default=5.0)
+    parser.add_argument("--max-pendientes", type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"⏱️  Verificación Argon2: {args.hilos} hilos, {args.segundos} s por combinación, "
+          f"{os.cpu_count()} núcleos")
+    for texto in args.costos:
+        costo = tuple(int(v) for v in texto.split(","))
+        for procesos in (int(p) for p in args.procesos.split(",")):
+            with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+                r = medir(costo, procesos, args.hilos, args.segundos, args.max_pendientes)
+            modo = "en línea" if procesos == 0 else f"{procesos} procesos"
+            print(f"   t={costo[0]} m={costo[1]:>6} KiB p={costo[2]} | {modo:<11} | "
+                  f"{r['por_segundo']:>7.1f} logins/s | {r['por_nucleo']:>7.1f} /núcleo | "
+                  f"p50 {r['p50_ms']:>7.1f} ms | p99 {r['p99_ms']:>7.1f} ms | 503: {r['rechazadas']}")
+
+
+if __name__ == "__main__":
+    main()
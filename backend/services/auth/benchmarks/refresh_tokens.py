@@ -0,0 +1,112 @@
+"""
+Búsqueda de refresh tokens: texto completo vs token_hash (índice único).
+
+Se ejecuta desde auth/:
+
+    python -m benchmarks.refresh_tokens [--filas 10000000]
+    python -m benchmarks.refresh_tokens --url mysql+pymysql://u:p@localhost/bench --filas 10000000
+
+Llena una tabla refresh_tokens con --filas tokens de largo similar a un
+JWT real (por defecto en SQLite, en un archivo temporal; con --url en la
+BD indicada, que debe estar vacía) y mide la misma consulta que hace
+TokenService.verify_refresh_token filtrando por el texto del token
+(recorrido completo de la tabla, como antes) y por su token_hash.
+"""
+import argparse
+import os
+import random
+import secrets
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.models.user_model import RefreshToken  # noqa: E402
+from app.services.security import hash_token  # noqa: E402
+
+LOTE = 50_000
+
+
+def _token() -> str:
+    # Cabecera fija + cuerpo y firma aleatorios: ~190 caracteres, como un JWT HS256
+    return "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9." + secrets.token_urlsafe(110) + "." + secrets.token_urlsafe(32)
+
+
+def llenar(motor, filas: int) -> list[str]:
+    """Inserta 'filas' tokens y retorna una muestra para consultar."""
+    tabla = RefreshToken.__table__
+    tabla.create(motor)
+    indice = next(i for i in tabla.indexes if "token_hash" in i.columns)
+    indice.drop(motor)  # se crea al final: insertar sin él es mucho más rápido
+
+    muestra = []
+    vence = datetime.utcnow() + timedelta(days=7)
+    inicio = time.perf_counter()
+    with motor.begin() as conexion:
+        for desde in range(0, filas, LOTE):
+            lote = [_token() for _ in range(min(LOTE, filas - desde))]
+            muestra.append(random.choice(lote))
+            conexion.execute(insert(tabla), [
+                {"user_id": (desde + i) % 100_000, "token": t, "token_hash": hash_token(t),
+                 "expires_at": vence, "is_revoked": False}
+                for i, t in enumerate(lote)
+            ])
+            print(f"\r   insertadas {desde + len(lote):,}/{filas:,}", end="", flush=True)
+    print(f"  ({time.perf_counter() - inicio:.0f} s)")
+
+    inicio = time.perf_counter()
+    indice.create(motor)
+    print(f"   índice único de token_hash creado en {time.perf_counter() - inicio:.1f} s")
+    return muestra
+
+
+def medir(motor, tokens: list[str], por_hash: bool) -> list[float]:
+    tiempos = []
+    with Session(motor) as db:
+        for token in tokens:
+            condicion = RefreshToken.token_hash == hash_token(token) if por_hash else RefreshToken.token == token
+            inicio = time.perf_counter()
+            encontrado = db.query(RefreshToken).filter(condicion, RefreshToken.is_revoked == False).first()  # noqa: E712
+            tiempos.append(time.perf_counter() - inicio)
+            assert encontrado is not None
+            db.expunge_all()
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=10_000_000)
+    parser.add_argument("--url", help="BD vacía donde crear la tabla (por defecto, SQLite temporal)")
+    parser.add_argument("--consultas-texto", type=int, default=5, help="Cada una recorre toda la tabla")
+    parser.add_argument("--consultas-hash", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        url = args.url or f"sqlite:///{Path(directorio) / 'refresh_tokens.db'}"
+        motor = create_engine(url)
+        print(f"⏱️  refresh_tokens con {args.filas:,} filas en {motor.dialect.name}")
+        try:
+            muestra = llenar(motor, args.filas)
+
+            por_hash = medir(motor, random.choices(muestra, k=args.consultas_hash), por_hash=True)
+            por_texto = medir(motor, random.choices(muestra, k=args.consultas_texto), por_hash=False)
+
+            mediana_hash = statistics.median(por_hash) * 1000
+            mediana_texto = statistics.median(por_texto) * 1000
+            print(f"   token (texto completo) | mediana {mediana_texto:>10.3f} ms | máx {max(por_texto) * 1000:>10.3f} ms")
+            print(f"   token_hash (índice)    | mediana {mediana_hash:>10.3f} ms | máx {max(por_hash) * 1000:>10.3f} ms")
+            print(f"   🚀 {mediana_texto / mediana_hash:,.0f}x más rápido por token_hash")
+        finally:
+            RefreshToken.__table__.drop(motor)
+            motor.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# Los tests importan el paquete 'app' desde auth/, sin BD real
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "clave-de-pruebas")
+os.environ["ALGORITHM"] = "HS256"
@@ -0,0 +1,43 @@
+"""Admisión del pool de hashing (app/services/hashing.py)."""
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.hashing import PoolHashing
+
+# Argon2 barato: los tests miden la admisión, no el costo
+PARAMETROS = (1, 8, 1)
+
+
+@pytest.fixture
+def pool():
+    pool = PoolHashing(PARAMETROS, procesos=1, max_pendientes=1, timeout=0.1)
+    pool.iniciar()
+    yield pool
+    pool.cerrar()
+
+
+def test_el_cupo_sigue_ocupado_hasta_que_termina_el_trabajo_vencido(pool):
+    with pytest.raises(HTTPException) as vencido:
+        pool._ejecutar(time.sleep, 0.6)
+    assert vencido.value.status_code == 503
+
+    # El proceso sigue con el trabajo vencido: no se admite otro
+    with pytest.raises(HTTPException) as saturado:
+        pool.hash("secreta")
+    assert "saturado" in saturado.value.detail
+    assert pool.rechazados == 1
+
+    time.sleep(0.8)
+    assert pool.hash("secreta").startswith("$argon2")
+
+
+def test_un_pool_cerrado_por_otro_hilo_responde_503_y_se_recrea(pool):
+    # Otro hilo lo cerró entre iniciar() y submit()
+    pool._executor.shutdown()
+    with pytest.raises(HTTPException) as cerrado:
+        pool.hash("secreta")
+    assert cerrado.value.status_code == 503
+
+    assert pool.hash("secreta").startswith("$argon2")
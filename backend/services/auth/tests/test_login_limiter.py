@@ -0,0 +1,28 @@
+"""IP del cliente para el limitador de login (app/services/login_limiter.py)."""
+from starlette.requests import Request
+
+from app.services.login_limiter import client_ip
+
+GATEWAY = "172.28.0.10"
+
+
+def _request(par: str, reenviado: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", reenviado.encode())] if reenviado is not None else []
+    return Request({"type": "http", "method": "POST", "path": "/auth/login",
+                    "headers": headers, "client": (par, 50000)})
+
+
+def test_cabecera_falsa_de_un_par_no_confiable_se_ignora():
+    # Un cliente que llega directo (sin gateway) no elige su IP
+    assert client_ip(_request("10.1.2.3", "203.0.113.7")) == "10.1.2.3"
+    assert client_ip(_request("192.168.1.20", "1.1.1.1, 2.2.2.2")) == "192.168.1.20"
+    assert client_ip(_request("127.0.0.1", "203.0.113.7")) == "127.0.0.1"
+
+
+def test_detras_del_gateway_se_usa_la_ip_reenviada():
+    assert client_ip(_request(GATEWAY, "203.0.113.7")) == "203.0.113.7"
+
+
+def test_sin_cabecera_se_usa_el_par():
+    assert client_ip(_request(GATEWAY)) == GATEWAY
+    assert client_ip(_request("10.1.2.3")) == "10.1.2.3"
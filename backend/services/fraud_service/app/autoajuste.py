@@ -0,0 +1,219 @@
+import asyncio
+import math
+import time
+from collections import deque
+
+
+class LimiteConcurrencia:
+    """
+    Semáforo con límite ajustable en caliente y reparto ponderado entre
+    carriles de prioridad.
+
+    Cuando no hay cupo, cada mensaje espera en la fila de su carril. Al
+    liberarse un cupo se elige el carril con round-robin ponderado suave
+    (el de nginx) entre los carriles con mensajes esperando: con pesos
+    {"high": 4, "normal": 1} el carril alto recibe 4 de cada 5 turnos
+    mientras haya cola, y el normal nunca se queda sin servicio.
+
+    Cuenta cuántas adquisiciones tuvieron que esperar (señal de saturación).
+    Solo se usa desde el bucle de asyncio, no necesita locks.
+    """
+
+    def __init__(self, limite: int, pesos: dict[str, int] | None = None):
+        self.limite = limite
+        self.activos = 0
+        self.esperas = 0
+        self.pesos = dict(pesos or {"normal": 1})
+        self._filas = {carril: deque() for carril in self.pesos}
+        self._credito = {carril: 0 for carril in self.pesos}
+
+    def carril(self, nombre: str) -> "_Turno":
+        """Context manager que ocupa un cupo del carril 'nombre'."""
+        return _Turno(self, nombre)
+
+    async def adquirir(self, carril: str):
+        turno = asyncio.get_running_loop().create_future()
+        self._filas[carril].append(turno)
+        # Con cupo libre el turno se asigna en el acto (respetando a los
+        # que ya esperaban en otros carriles)
+        self._despertar()
+        if turno.done():
+            return
+
+        self.esperas += 1
+        try:
+            await turno
+        except asyncio.CancelledError:
+            # Si ya se le había asignado el cupo hay que devolverlo;
+            # si no, el futuro cancelado se descarta al despertar
+            if not turno.cancelled():
+                self.liberar()
+            raise
+
+    def liberar(self):
+        self.activos -= 1
+        self._despertar()
+
+    async def ajustar(self, limite: int):
+        self.limite = limite
+        self._despertar()
+
+    def _despertar(self):
+        while self.activos < self.limite:
+            carril = self._elegir_carril()
+            if carril is None:
+                return
+            turno = self._filas[carril].popleft()
+            if turno.cancelled():
+                continue
+            self.activos += 1
+            turno.set_result(None)
+
+    def _elegir_carril(self) -> str | None:
+        """Round-robin ponderado suave entre los carriles con espera."""
+        candidatos = [carril for carril, fila in self._filas.items() if fila]
+        if not candidatos:
+            return None
+        total = 0
+        for carril in candidatos:
+            self._credito[carril] += self.pesos[carril]
+            total += self.pesos[carril]
+        elegido = max(candidatos, key=self._credito.__getitem__)
+        self._credito[elegido] -= total
+        return elegido
+
+
+class _Turno:
+    def __init__(self, limite: LimiteConcurrencia, carril: str):
+        self.limite = limite
+        self.nombre = carril
+
+    async def __aenter__(self):
+        await self.limite.adquirir(self.nombre)
+
+    async def __aexit__(self, *exc):
+        self.limite.liberar()
+
+
+class AutoAjuste:
+    """
+    Ajusta la concurrencia y el prefetch a partir de la latencia de
+    procesamiento y la tasa de acks medidas en cada ventana.
+
+    - Si la latencia supera en más de 'tolerancia' la mejor observada, el
+      downstream se está saturando: se reduce la concurrencia (x0.75).
+    - Si hubo mensajes esperando turno y el throughput no cayó, se sube
+      la concurrencia (+25%, al menos +1).
+    - Si tras una subida el throughput cae, se deshace el paso.
+
+    El prefetch acompaña a la concurrencia: el buffer total por proceso
+    es ~2x la concurrencia, repartido entre los consumidores (shards), lo
+    que evita tanto la inanición como el bloqueo de cabeza de cola.
+    """
+
+    def __init__(
+        self,
+        shards: int,
+        concurrencia_min: int,
+        concurrencia_max: int,
+        prefetch_min: int,
+        prefetch_max: int,
+        tolerancia_latencia: float = 0.5,
+        concurrencia_inicial: int | None = None,
+    ):
+        self.shards = max(1, shards)
+        self.concurrencia_min = concurrencia_min
+        self.concurrencia_max = concurrencia_max
+        self.prefetch_min = prefetch_min
+        self.prefetch_max = prefetch_max
+        self.tolerancia_latencia = tolerancia_latencia
+
+        self.concurrencia = concurrencia_inicial or concurrencia_min
+        self.concurrencia = min(max(self.concurrencia, concurrencia_min), concurrencia_max)
+        self.prefetch = self._prefetch_para(self.concurrencia)
+
+        # Medición de la ventana actual
+        self._completados = 0
+        self._latencia_total = 0.0
+        self._inicio_ventana = time.monotonic()
+
+        self.latencia_base = None
+        self.throughput_previo = 0.0
+        self.ultimo_paso = 0  # +1 subida, -1 bajada, 0 sin cambio
+
+        # Exportado como métricas
+        self.latencia_ms = 0.0
+        self.throughput = 0.0
+        self.ajustes = 0
+        self.motivo = "inicial"
+
+    def _prefetch_para(self, concurrencia: int) -> int:
+        prefetch = math.ceil(2 * concurrencia / self.shards)
+        return min(max(prefetch, self.prefetch_min), self.prefetch_max)
+
+    def registrar(self, latencia_s: float):
+        """Registra el tiempo de procesamiento de un mensaje confirmado."""
+        self._completados += 1
+        self._latencia_total += latencia_s
+
+    def descartar_ventana(self):
+        """Descarta lo medido (p. ej. mientras el circuito no está cerrado)."""
+        self._completados = 0
+        self._latencia_total = 0.0
+        self._inicio_ventana = time.monotonic()
+
+    def evaluar(self, esperas: int) -> str | None:
+        """
+        Cierra la ventana y decide el siguiente paso.
+        esperas: adquisiciones del límite que tuvieron que esperar.
+        Retorna el motivo si hubo ajuste, None si no hay cambios.
+        """
+        ahora = time.monotonic()
+        duracion = max(ahora - self._inicio_ventana, 1e-6)
+        completados = self._completados
+        latencia = self._latencia_total / completados if completados else 0.0
+        self._completados = 0
+        self._latencia_total = 0.0
+        self._inicio_ventana = ahora
+
+        if completados == 0:
+            # Sin tráfico no hay nada que medir
+            return None
+
+        self.throughput = completados / duracion
+        self.latencia_ms = latencia * 1000.0
+        if self.latencia_base is None or latencia < self.latencia_base:
+            self.latencia_base = latencia
+        else:
+            # La base se "olvida" despacio para adaptarse a cambios reales
+            self.latencia_base += (latencia - self.latencia_base) * 0.05
+
+        nueva = self.concurrencia
+        motivo = None
+        if latencia > self.latencia_base * (1 + self.tolerancia_latencia):
+            nueva = max(self.concurrencia_min, int(self.concurrencia * 0.75))
+            motivo = (
+                f"latencia {latencia * 1000:.0f} ms > base "
+                f"{self.latencia_base * 1000:.0f} ms: bajar concurrencia"
+            )
+        elif self.ultimo_paso > 0 and self.throughput < self.throughput_previo * 0.95:
+            nueva = max(self.concurrencia_min, self.concurrencia - max(1, self.concurrencia // 5))
+            motivo = (
+                f"throughput cayó ({self.throughput_previo:.1f} -> {self.throughput:.1f} msg/s) "
+                f"tras subir: deshacer"
+            )
+        elif esperas > 0 and self.throughput >= self.throughput_previo * 0.95:
+            nueva = min(self.concurrencia_max, self.concurrencia + max(1, self.concurrencia // 4))
+            motivo = f"{esperas} mensajes esperaron turno con throughput estable: subir concurrencia"
+
+        self.throughput_previo = self.throughput
+        if motivo is None or nueva == self.concurrencia:
+            self.ultimo_paso = 0
+            return None
+
+        self.ultimo_paso = 1 if nueva > self.concurrencia else -1
+        self.concurrencia = nueva
+        self.prefetch = self._prefetch_para(nueva)
+        self.ajustes += 1
+        self.motivo = motivo
+        return motivo
@@ -0,0 +1,362 @@
+"""
+Backtest de las reglas de fraude sobre el historial de transacciones.
+
+Evalúa el conjunto de reglas actual (umbrales de logic.py) y uno
+candidato sobre un export histórico y reporta los cambios de decisión
+(aprobadas que pasarían a rechazadas y viceversa), la tasa de activación
+de cada regla y el throughput:
+
+    python -m app.backtest historial.csv --candidato limite_monto_alto=4000
+    python -m app.backtest historial.parquet --candidato hora_nocturna_fin=5 \\
+        --candidato ubicaciones_de_riesgo="Panamá,Suiza" --procesos 8
+
+Fuentes (columnas por nombre: monto, ubicacion, hora y, opcional, status):
+
+- CSV con encabezado, o TSV (``--formato tsv``). Un export de la BD sirve
+  tal cual: ``mysql -B -e "SELECT monto, ubicacion, hora, status FROM
+  transactions" > historial.tsv``. Se asume que ningún campo contiene
+  saltos de línea (el archivo se reparte entre procesos por bytes).
+- Parquet, si ``pyarrow`` está instalado (es opcional); se reparte por
+  row groups y las reglas se evalúan con ``pyarrow.compute``.
+
+Memoria acotada: cada proceso lee un bloque (``--bloque-mb``) y lo evalúa
+por lotes de columnas; el proceso principal solo mantiene una ventana de
+bloques en vuelo y suma contadores. Solo participan las reglas sin
+estado (monto, ubicación, hora): las de perfil y grafo dependen del
+orden de llegada por cuenta y no se reproducen aquí.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field, fields, replace
+
+from .logic import (
+    BITS_REGLAS, HORA_NOCTURNA_FIN, HORA_NOCTURNA_INICIO, LIMITE_MONTO_ALTO, UBICACIONES_DE_RIESGO
+)
+
+REGLAS_EVALUADAS = ("Monto_Alto", "Ubicacion_Riesgosa", "Hora_Nocturna_Riesgosa")
+BIT_MONTO = BITS_REGLAS["Monto_Alto"]
+BIT_UBICACION = BITS_REGLAS["Ubicacion_Riesgosa"]
+BIT_HORA = BITS_REGLAS["Hora_Nocturna_Riesgosa"]
+
+
+@dataclass(frozen=True)
+class ConjuntoReglas:
+    """Umbrales de las reglas sin estado; por defecto, los de logic.py."""
+    limite_monto_alto: float = LIMITE_MONTO_ALTO
+    ubicaciones_de_riesgo: frozenset = field(default=UBICACIONES_DE_RIESGO)
+    hora_nocturna_inicio: int = HORA_NOCTURNA_INICIO
+    hora_nocturna_fin: int = HORA_NOCTURNA_FIN
+
+    def con_cambios(self, parametros: list[str]) -> "ConjuntoReglas":
+        """Aplica cambios "clave=valor" (ubicaciones separadas por comas)."""
+        tipos = {f.name: f.type for f in fields(self)}
+        cambios = {}
+        for parametro in parametros:
+            clave, _, valor = parametro.partition("=")
+            if clave not in tipos:
+                raise ValueError(f"Parámetro desconocido: {clave!r} (válidos: {', '.join(tipos)})")
+            if clave == "ubicaciones_de_riesgo":
+                cambios[clave] = frozenset(v.strip() for v in valor.split(",") if v.strip())
+            elif clave == "limite_monto_alto":
+                cambios[clave] = float(valor)
+            else:
+                cambios[clave] = int(valor)
+        return replace(self, **cambios)
+
+
+def evaluar_lote(montos: list, ubicaciones: list, horas: list, reglas: ConjuntoReglas) -> list[int]:
+    """
+    Máscara de reglas activadas por fila, evaluando el lote por columnas.
+    Una hora de -1 (no legible) no activa la regla nocturna.
+    """
+    limite = reglas.limite_monto_alto
+    riesgo = reglas.ubicaciones_de_riesgo
+    inicio, fin = reglas.hora_nocturna_inicio, reglas.hora_nocturna_fin
+    return [
+        (BIT_MONTO if monto > limite else 0)
+        | (BIT_UBICACION if ubicacion in riesgo else 0)
+        | (BIT_HORA if inicio <= hora < fin else 0)
+        for monto, ubicacion, hora in zip(montos, ubicaciones, horas)
+    ]
+
+
+def _contar(montos, ubicaciones, horas, estados, actual, candidato) -> Counter:
+    """Cuenta combinaciones (máscara actual, máscara candidata, estado histórico)."""
+    return Counter(zip(
+        evaluar_lote(montos, ubicaciones, horas, actual),
+        evaluar_lote(montos, ubicaciones, horas, candidato),
+        estados,
+    ))
+
+
+# --- Lectura por bloques (se ejecuta en los procesos del pool) ---
+
+def _hora_de_texto(valor: str) -> int:
+    # "2025-01-01 02:13:00" o "2025-01-01T02:13:00": la hora está en [11:13]
+    try:
+        return int(valor[11:13])
+    except ValueError:
+        return -1
+
+
+def _procesar_bloque_csv(
+    ruta: str, inicio: int, fin: int, delimitador: str, columnas: dict,
+    actual: ConjuntoReglas, candidato: ConjuntoReglas, filas_lote: int,
+) -> tuple[Counter, int]:
+    """
+    Procesa las líneas que *empiezan* en [inicio, fin). Retorna el conteo
+    de combinaciones y las filas inválidas.
+    """
+    i_monto, i_ubicacion, i_hora = columnas["monto"], columnas["ubicacion"], columnas["hora"]
+    i_status = columnas.get("status")
+    conteo = Counter()
+    invalidas = 0
+
+    with open(ruta, "rb") as f:
+        # Si el bloque empieza a mitad de línea, esa línea es del anterior
+        f.seek(max(0, inicio - 1))
+        if inicio > 0:
+            f.readline()
+        posicion = f.tell()
+        if posicion >= fin:
+            # La única línea que toca el bloque empezó antes: no hay nada propio
+            texto = b""
+        else:
+            texto = f.read(fin - posicion)
+            if not texto.endswith(b"\n"):
+                texto += f.readline()  # completa la última línea, que empieza antes de fin
+
+    montos, ubicaciones, horas, estados = [], [], [], []
+    for fila in csv.reader(io.StringIO(texto.decode("utf-8")), delimiter=delimitador):
+        try:
+            montos.append(float(fila[i_monto]))
+            ubicaciones.append(fila[i_ubicacion])
+            horas.append(_hora_de_texto(fila[i_hora]))
+            estados.append(fila[i_status] if i_status is not None else "")
+        except (ValueError, IndexError):
+            invalidas += 1
+            # Deja las columnas del mismo largo si falló a mitad de fila
+            del montos[len(estados):], ubicaciones[len(estados):], horas[len(estados):]
+            continue
+        if len(montos) >= filas_lote:
+            conteo.update(_contar(montos, ubicaciones, horas, estados, actual, candidato))
+            montos, ubicaciones, horas, estados = [], [], [], []
+    if montos:
+        conteo.update(_contar(montos, ubicaciones, horas, estados, actual, candidato))
+    return conteo, invalidas
+
+
+def _mascara_arrow(pc, montos, ubicaciones, horas, reglas: ConjuntoReglas):
+    import pyarrow as pa
+    bits = pc.add(
+        pc.add(
+            pc.multiply(pc.cast(pc.greater(montos, reglas.limite_monto_alto), pa.int8()), BIT_MONTO),
+            pc.multiply(
+                pc.cast(pc.is_in(ubicaciones, value_set=pa.array(sorted(reglas.ubicaciones_de_riesgo))), pa.int8()),
+                BIT_UBICACION,
+            ),
+        ),
+        pc.multiply(
+            pc.cast(
+                pc.and_(
+                    pc.greater_equal(horas, reglas.hora_nocturna_inicio),
+                    pc.less(horas, reglas.hora_nocturna_fin),
+                ),
+                pa.int8(),
+            ),
+            BIT_HORA,
+        ),
+    )
+    return pc.fill_null(bits, 0).to_pylist()
+
+
+def _procesar_grupos_parquet(
+    ruta: str, grupos: list, actual: ConjuntoReglas, candidato: ConjuntoReglas, filas_lote: int,
+) -> tuple[Counter, int]:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    archivo = pq.ParquetFile(ruta)
+    con_status = "status" in archivo.schema_arrow.names
+    columnas = ["monto", "ubicacion", "hora"] + (["status"] if con_status else [])
+    conteo = Counter()
+    for lote in archivo.iter_batches(batch_size=filas_lote, row_groups=grupos, columns=columnas):
+        montos = pc.cast(lote.column("monto"), pa.float64())
+        ubicaciones = lote.column("ubicacion")
+        hora = lote.column("hora")
+        if pa.types.is_timestamp(hora.type):
+            horas = pc.hour(hora)
+        else:
+            horas = pc.cast(pc.utf8_slice_codeunits(pc.cast(hora, pa.string()), 11, 13), pa.int64())
+        estados = lote.column("status").to_pylist() if con_status else [""] * lote.num_rows
+        conteo.update(Counter(zip(
+            _mascara_arrow(pc, montos, ubicaciones, horas, actual),
+            _mascara_arrow(pc, montos, ubicaciones, horas, candidato),
+            estados,
+        )))
+    return conteo, 0
+
+
+# --- Planificación y agregación (proceso principal) ---
+
+def _tareas_csv(ruta: str, delimitador: str, bloque_bytes: int, actual, candidato, filas_lote):
+    with open(ruta, "rb") as f:
+        encabezado = f.readline()
+    nombres = next(csv.reader([encabezado.decode("utf-8-sig").strip()], delimiter=delimitador))
+    columnas = {nombre.strip(): i for i, nombre in enumerate(nombres)}
+    faltantes = {"monto", "ubicacion", "hora"} - set(columnas)
+    if faltantes:
+        raise ValueError(f"Faltan columnas en {ruta}: {sorted(faltantes)}")
+
+    tamano = os.path.getsize(ruta)
+    for inicio in range(len(encabezado), tamano, bloque_bytes):
+        fin = min(inicio + bloque_bytes, tamano)
+        yield _procesar_bloque_csv, (ruta, inicio, fin, delimitador, columnas, actual, candidato, filas_lote)
+
+
+def _tareas_parquet(ruta: str, grupos_por_tarea: int, actual, candidato, filas_lote):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Leer Parquet requiere pyarrow (pip install pyarrow)")
+    total = pq.ParquetFile(ruta).num_row_groups
+    for inicio in range(0, total, grupos_por_tarea):
+        grupos = list(range(inicio, min(inicio + grupos_por_tarea, total)))
+        yield _procesar_grupos_parquet, (ruta, grupos, actual, candidato, filas_lote)
+
+
+def ejecutar(tareas, procesos: int) -> tuple[Counter, int]:
+    """
+    Ejecuta las tareas en un pool con a lo sumo 2 x procesos en vuelo:
+    la memoria no depende del tamaño del archivo.
+    """
+    conteo = Counter()
+    invalidas = 0
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        en_vuelo = set()
+        for funcion, argumentos in tareas:
+            if len(en_vuelo) >= 2 * procesos:
+                listos, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    parcial, malas = futuro.result()
+                    conteo.update(parcial)
+                    invalidas += malas
+            en_vuelo.add(pool.submit(funcion, *argumentos))
+        for futuro in en_vuelo:
+            parcial, malas = futuro.result()
+            conteo.update(parcial)
+            invalidas += malas
+    return conteo, invalidas
+
+
+def resumir(conteo: Counter, invalidas: int, duracion: float) -> dict:
+    """Reporte a partir de las combinaciones (máscara actual, candidata, histórico)."""
+    filas = sum(conteo.values())
+    rechazadas_actual = rechazadas_candidato = 0
+    nuevos_rechazos = nuevas_aprobaciones = 0
+    con_historico = coincide_historico = 0
+    hits_actual = dict.fromkeys(REGLAS_EVALUADAS, 0)
+    hits_candidato = dict.fromkeys(REGLAS_EVALUADAS, 0)
+
+    for (actual, candidato, historico), n in conteo.items():
+        rechazadas_actual += n if actual else 0
+        rechazadas_candidato += n if candidato else 0
+        if candidato and not actual:
+            nuevos_rechazos += n
+        elif actual and not candidato:
+            nuevas_aprobaciones += n
+        if historico in ("APPROVED", "REJECTED"):
+            con_historico += n
+            if (historico == "REJECTED") == bool(actual):
+                coincide_historico += n
+        for regla in REGLAS_EVALUADAS:
+            bit = BITS_REGLAS[regla]
+            hits_actual[regla] += n if actual & bit else 0
+            hits_candidato[regla] += n if candidato & bit else 0
+
+    def tasa(x):
+        return round(x / filas, 6) if filas else 0.0
+
+    return {
+        "filas": filas,
+        "filas_invalidas": invalidas,
+        "segundos": round(duracion, 2),
+        "filas_por_segundo": round(filas / duracion) if duracion else 0,
+        "tasa_rechazo_actual": tasa(rechazadas_actual),
+        "tasa_rechazo_candidato": tasa(rechazadas_candidato),
+        "aprobadas_a_rechazadas": nuevos_rechazos,
+        "rechazadas_a_aprobadas": nuevas_aprobaciones,
+        "tasa_reglas_actual": {regla: tasa(n) for regla, n in hits_actual.items()},
+        "tasa_reglas_candidato": {regla: tasa(n) for regla, n in hits_candidato.items()},
+        # Cuánto reproduce el conjunto actual las decisiones guardadas
+        "coincidencia_historico": round(coincide_historico / con_historico, 6) if con_historico else None,
+    }
+
+
+def _imprimir(reporte: dict, actual: ConjuntoReglas, candidato: ConjuntoReglas):
+    print("=" * 60)
+    print(f"📚 {reporte['filas']:,} filas ({reporte['filas_invalidas']} inválidas) en "
+          f"{reporte['segundos']} s -> {reporte['filas_por_segundo']:,} filas/s")
+    print(f"⚖️  Rechazo: actual {reporte['tasa_rechazo_actual']:.4%} | "
+          f"candidato {reporte['tasa_rechazo_candidato']:.4%}")
+    print(f"🔀 Aprobadas -> rechazadas: {reporte['aprobadas_a_rechazadas']:,} | "
+          f"rechazadas -> aprobadas: {reporte['rechazadas_a_aprobadas']:,}")
+    for regla in REGLAS_EVALUADAS:
+        print(f"   {regla:<24} {reporte['tasa_reglas_actual'][regla]:.4%} -> "
+              f"{reporte['tasa_reglas_candidato'][regla]:.4%}")
+    if reporte["coincidencia_historico"] is not None:
+        print(f"📜 Coincidencia del conjunto actual con el historial: {reporte['coincidencia_historico']:.4%}")
+    if candidato == actual:
+        print("ℹ️  Sin --candidato: el candidato es igual al conjunto actual")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archivo", help="CSV, TSV o Parquet con el historial")
+    parser.add_argument("--formato", choices=["csv", "tsv", "parquet"], help="Por defecto, según la extensión")
+    parser.add_argument("--candidato", action="append", default=[], metavar="CLAVE=VALOR",
+                        help="Cambio de umbral del conjunto candidato (repetible)")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--bloque-mb", type=int, default=32, help="Bytes de CSV por tarea")
+    parser.add_argument("--grupos-por-tarea", type=int, default=1, help="Row groups de Parquet por tarea")
+    parser.add_argument("--filas-lote", type=int, default=50_000, help="Filas por lote evaluado")
+    parser.add_argument("--json", help="Guarda el reporte en este archivo")
+    args = parser.parse_args()
+
+    formato = args.formato or {".parquet": "parquet", ".tsv": "tsv"}.get(os.path.splitext(args.archivo)[1], "csv")
+    actual = ConjuntoReglas()
+    try:
+        candidato = actual.con_cambios(args.candidato)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if formato == "parquet":
+        tareas = _tareas_parquet(args.archivo, args.grupos_por_tarea, actual, candidato, args.filas_lote)
+    else:
+        delimitador = "\t" if formato == "tsv" else ","
+        tareas = _tareas_csv(
+            args.archivo, delimitador, args.bloque_mb * 1024 * 1024, actual, candidato, args.filas_lote
+        )
+
+    inicio = time.perf_counter()
+    conteo, invalidas = ejecutar(tareas, max(1, args.procesos))
+    reporte = resumir(conteo, invalidas, time.perf_counter() - inicio)
+    reporte["actual"] = {k: sorted(v) if isinstance(v, frozenset) else v for k, v in asdict(actual).items()}
+    reporte["candidato"] = {k: sorted(v) if isinstance(v, frozenset) else v for k, v in asdict(candidato).items()}
+
+    _imprimir(reporte, actual, candidato)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import asyncio
+
+# --- Estados del interruptor ---
+CERRADO = "closed"
+ABIERTO = "open"
+SEMI_ABIERTO = "half_open"
+
+
+class InterruptorCircuito:
+    """
+    Circuit breaker de la salud del servicio de transacciones.
+
+    - CERRADO: se consume normalmente; N fallos seguidos lo abren.
+    - ABIERTO: el worker deja de consumir y sondea el servicio.
+    - SEMI_ABIERTO: se consume con prefetch reducido que crece de forma
+      gradual; un solo fallo lo vuelve a abrir.
+
+    Solo se usa desde el bucle de asyncio, no necesita locks.
+    """
+
+    def __init__(self, umbral_fallos: int):
+        self.umbral_fallos = umbral_fallos
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.aperturas = 0
+        self._apertura = asyncio.Event()
+
+    @property
+    def abierto(self) -> bool:
+        return self.estado == ABIERTO
+
+    def registrar_exito(self):
+        self.fallos_consecutivos = 0
+
+    def registrar_fallo(self):
+        """Fallo del downstream (error de red o 5xx)."""
+        self.fallos_consecutivos += 1
+        if self.estado == SEMI_ABIERTO or (
+            self.estado == CERRADO and self.fallos_consecutivos >= self.umbral_fallos
+        ):
+            self._abrir()
+
+    def _abrir(self):
+        if self.estado != ABIERTO:
+            self.aperturas += 1
+            print(f" [⛔] Circuito ABIERTO tras {self.fallos_consecutivos} fallos del servicio de transacciones")
+        self.estado = ABIERTO
+        self._apertura.set()
+
+    def semi_abrir(self):
+        self.estado = SEMI_ABIERTO
+        self.fallos_consecutivos = 0
+        self._apertura.clear()
+
+    def cerrar(self):
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+
+    async def esperar_apertura(self):
+        await self._apertura.wait()
@@ -10,6 +10,93 @@ class Settings(BaseSettings):
 
     # URL del servicio de transacciones
     TRANSACTIONS_SERVICE_URL: str
+
+    # Cómo se entregan las decisiones: "http" (PATCH por mensaje) o
+    # "queue" (cola durable 'fraud_results' drenada por lotes)
+    FRAUD_RESULTS_MODE: str = "http"
+
+    # Número de colas shard del exchange de hash consistente.
+    # Debe coincidir con FRAUD_SHARD_COUNT del servicio de transacciones.
+    FRAUD_SHARD_COUNT: int = 8
+
+    # Shards que consume este worker ("0,1", "0-3"). Vacío = todos.
+    FRAUD_SHARDS: str = ""
+
+    # Supervisor: procesos consumidores (0 = número de CPUs)
+    FRAUD_WORKER_PROCESSES: int = 0
+
+    # Cada cuánto reporta cada proceso sus estadísticas al supervisor
+    FRAUD_REPORT_INTERVAL_SECONDS: int = 15
+
+    # Tiempo máximo para terminar los mensajes en vuelo al recibir SIGTERM
+    FRAUD_DRAIN_TIMEOUT_SECONDS: int = 30
+
+    # Niveles de espera de los reintentos (segundos, en orden)
+    FRAUD_RETRY_DELAYS_SECONDS: str = "5,30,120,600"
+
+    # Intentos totales antes de enviar el mensaje a la DLQ
+    FRAUD_MAX_ATTEMPTS: int = 5
+
+    # Mensajes sin confirmar por consumidor (shard). Con autoajuste es el
+    # punto de partida de la concurrencia.
+    FRAUD_PREFETCH_COUNT: int = 10
+
+    # Turnos del carril de alta prioridad (transferencias grandes) por
+    # cada turno del carril normal cuando ambos tienen mensajes esperando
+    FRAUD_HIGH_LANE_WEIGHT: int = 4
+
+    # Deduplicación de reentregas por ID de transacción: "bloom", "lru" u "off"
+    FRAUD_DEDUPE_MODE: str = "bloom"
+    FRAUD_DEDUPE_MEMORY_BYTES: int = 4 * 1024 * 1024   # presupuesto por proceso
+    FRAUD_DEDUPE_FALSE_POSITIVE_RATE: float = 0.001    # solo modo bloom
+    FRAUD_DEDUPE_PARTITIONS: int = 4                   # generaciones del filtro
+    FRAUD_DEDUPE_WINDOW_SECONDS: float = 3600.0        # vida aproximada de un ID
+
+    # Grafo de transferencias entre cuentas (regla de fan-in anormal)
+    FRAUD_GRAPH_ENABLED: bool = True
+    # Total entre procesos: cada uno reserva la parte de sus shards
+    FRAUD_GRAPH_MAX_ACCOUNTS: int = 500_000         # ~300 B por cuenta
+    FRAUD_GRAPH_RECENT_COUNTERPARTIES: int = 8      # K contrapartes recientes
+    FRAUD_GRAPH_HALF_LIFE_SECONDS: float = 3600.0   # vida media de los grados
+    FRAUD_FANIN_MIN_SENDERS: int = 6                # remitentes distintos (<= K)
+    FRAUD_FANIN_ZSCORE: float = 4.0                 # desviaciones sobre la media
+
+    # Perfil de montos por cuenta (reemplaza el límite fijo de Monto_Alto
+    # cuando la cuenta tiene historial suficiente)
+    FRAUD_PROFILE_ENABLED: bool = True
+    FRAUD_PROFILE_MAX_ACCOUNTS: int = 500_000       # ~250 B por cuenta (total)
+    FRAUD_PROFILE_MIN_SAMPLES: int = 20             # perfil maduro
+    FRAUD_AMOUNT_ZSCORE: float = 4.0
+    FRAUD_AMOUNT_PERCENTILE: float = 0.995
+    FRAUD_AMOUNT_MIN_FLAG: float = 500.0            # nunca marca montos menores
+    FRAUD_AMOUNT_MIN_RELATIVE_DEVIATION: float = 0.1  # piso de la desviación (x media)
+    FRAUD_PROFILE_SNAPSHOT_DIR: str = "/var/lib/fraud"
+    FRAUD_PROFILE_SNAPSHOT_SECONDS: float = 60.0
+
+    # Autoajuste de prefetch y concurrencia según latencia y tasa de acks
+    FRAUD_AUTOTUNE_ENABLED: bool = True
+    FRAUD_AUTOTUNE_INTERVAL_SECONDS: float = 5.0
+    FRAUD_AUTOTUNE_LATENCY_TOLERANCE: float = 0.5  # +50% sobre la mejor latencia
+    FRAUD_CONCURRENCY_MIN: int = 1
+    FRAUD_CONCURRENCY_MAX: int = 64  # límite fijo si el autoajuste está apagado
+    FRAUD_PREFETCH_MIN: int = 1
+    FRAUD_PREFETCH_MAX: int = 100
+    # Cambiar el prefetch recrea todos los consumidores (con colas de
+    # consumidor activo único, el shard puede pasar a otro worker): el
+    # autoajuste solo lo aplica si cambia al menos esta fracción y no
+    # más de una vez por intervalo. La concurrencia se ajusta siempre
+    FRAUD_PREFETCH_HYSTERESIS: float = 0.5
+    FRAUD_PREFETCH_MIN_INTERVAL_SECONDS: float = 60.0
+
+    # Circuit breaker del servicio de transacciones
+    FRAUD_BREAKER_FAILURE_THRESHOLD: int = 5   # fallos seguidos para abrir
+    FRAUD_BREAKER_PROBE_SECONDS: float = 10.0  # intervalo de sondeo a /health
+    FRAUD_BREAKER_RAMP_SECONDS: float = 5.0    # intervalo entre pasos de la rampa
+
+    # Listener HTTP de /metrics (Prometheus). Con el supervisor, el proceso
+    # i escucha en FRAUD_METRICS_PORT + i. 0 = desactivado.
+    FRAUD_METRICS_HOST: str = "0.0.0.0"
+    FRAUD_METRICS_PORT: int = 9100
     
     class Config:
         env_file = "../.env" # Le decimos que suba un nivel para encontrar el .env
@@ -0,0 +1,66 @@
+"""
+Índice acotado de cuentas -> ID entero para el estado por cuenta en arreglos.
+
+Las estructuras por cuenta (grafo, perfiles de monto) guardan sus datos en
+arreglos compactos indexados por este ID. Con el índice lleno se recicla
+un ID con el algoritmo del reloj (segunda oportunidad), que aproxima LRU
+sin listas enlazadas; el dueño del arreglo limpia su posición en el
+callback 'al_reciclar'. Cada ID lleva una generación para poder detectar
+referencias guardadas a un ID que ya se recicló.
+"""
+from array import array
+from typing import Callable
+
+
+class IndiceCuentas:
+    def __init__(self, max_cuentas: int, al_reciclar: Callable[[int], None] | None = None):
+        self.max_cuentas = max_cuentas
+        self.al_reciclar = al_reciclar
+        self.ids: dict[str, int] = {}
+        self.nombres: list = [None] * max_cuentas
+        self.generacion = array("I", bytes(4 * max_cuentas))
+        self._referenciado = bytearray(max_cuentas)
+        self._asignados = 0
+        self._manecilla = 0
+        self.reciclados = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def buscar(self, cuenta: str) -> int | None:
+        """ID de la cuenta sin asignarle uno nuevo."""
+        return self.ids.get(cuenta)
+
+    def obtener(self, cuenta: str, proteger: int = -1) -> int:
+        """
+        ID de la cuenta, asignando uno si es nueva.
+        proteger: ID que no debe reciclarse en esta asignación.
+        """
+        indice = self.ids.get(cuenta)
+        if indice is None:
+            indice = self._asignar(proteger)
+            self.ids[cuenta] = indice
+            self.nombres[indice] = cuenta
+        self._referenciado[indice] = 1
+        return indice
+
+    def _asignar(self, proteger: int) -> int:
+        if self._asignados < self.max_cuentas:
+            indice = self._asignados
+            self._asignados += 1
+        else:
+            # Reloj: avanza limpiando la marca de uso hasta hallar una sin marca
+            while True:
+                indice = self._manecilla
+                self._manecilla = (indice + 1) % self.max_cuentas
+                if self._referenciado[indice] and indice != proteger:
+                    self._referenciado[indice] = 0
+                elif indice != proteger:
+                    break
+            del self.ids[self.nombres[indice]]
+            self.nombres[indice] = None
+            if self.al_reciclar is not None:
+                self.al_reciclar(indice)
+            self.reciclados += 1
+        self.generacion[indice] += 1
+        return indice
@@ -0,0 +1,151 @@
+"""
+Deduplicación de entregas repetidas por ID de transacción.
+
+RabbitMQ vuelve a entregar un mensaje si el worker se cae o lo rechaza
+antes del ack; sin esto cada reentrega vuelve a aplicar las reglas y a
+enviar la decisión. El worker registra el ID *después* de registrar la
+decisión y solo consulta el filtro para mensajes reentregados o
+reintentados, así un falso positivo nunca afecta a una primera entrega.
+
+Como las cuentas se reparten por shard, todas las entregas de una
+transacción llegan al mismo proceso, así que el filtro es local. Es solo
+un atajo: vive en memoria y tras una caída o un reinicio empieza vacío,
+justo cuando llegan las reentregas de lo que quedó sin ack. Esas se
+evalúan de nuevo y la decisión se vuelve a enviar; el servicio de
+transacciones solo registra la primera decisión de cada transacción
+(las siguientes no escriben), así que el resultado no cambia.
+
+Dos implementaciones acotadas en memoria (FRAUD_DEDUPE_MODE):
+
+- ``bloom``: filtro de Bloom particionado por tiempo. Se escribe en la
+  partición más reciente; cuando se llena o vence su ventana se limpia la
+  más antigua y pasa a ser la actual, así los IDs expiran solos. La tasa
+  de falsos positivos y la memoria son configurables.
+- ``lru``: conjunto exacto con desalojo LRU. Sin falsos positivos pero
+  ~120 bytes por ID, bastante más memoria por entrada.
+"""
+import hashlib
+import math
+import time
+from collections import OrderedDict
+
+# Estimación del costo por entrada de un OrderedDict[int, None] en CPython
+BYTES_POR_ENTRADA_LRU = 120
+
+
+def _clave(id_trans) -> bytes:
+    return str(id_trans).encode()
+
+
+class FiltroBloomTemporal:
+    """
+    Filtro de Bloom con 'particiones' generaciones que rotan cada
+    ventana_segundos / particiones (o antes, si la actual se llena).
+
+    La memoria se reparte entre las particiones y la tasa de falsos
+    positivos objetivo se divide entre ellas (una consulta mira todas).
+    """
+
+    def __init__(
+        self,
+        memoria_bytes: int,
+        tasa_falsos_positivos: float,
+        particiones: int = 4,
+        ventana_segundos: float = 3600.0,
+    ):
+        if not 0 < tasa_falsos_positivos < 1:
+            raise ValueError(f"Tasa de falsos positivos inválida: {tasa_falsos_positivos}")
+        self.particiones = max(1, particiones)
+        self.bits = max(64, memoria_bytes * 8 // self.particiones)
+        tasa_particion = tasa_falsos_positivos / self.particiones
+
+        # Dimensionado clásico: n = -m ln²2 / ln p, k = -log2 p
+        self.capacidad_particion = max(1, int(-self.bits * math.log(2) ** 2 / math.log(tasa_particion)))
+        self.funciones_hash = max(1, round(-math.log2(tasa_particion)))
+        self.duracion_particion = ventana_segundos / self.particiones
+
+        self._filtros = [bytearray(self.bits // 8 + 1) for _ in range(self.particiones)]
+        self._actual = 0
+        self._insertados = 0
+        self._inicio_particion = time.monotonic()
+
+    @property
+    def capacidad(self) -> int:
+        """IDs que caben en la ventana completa sin superar la tasa objetivo."""
+        return self.capacidad_particion * self.particiones
+
+    @property
+    def memoria_bytes(self) -> int:
+        return sum(len(filtro) for filtro in self._filtros)
+
+    def _posiciones(self, id_trans):
+        # Doble hashing (Kirsch-Mitzenmacher): k posiciones con un solo digest
+        digest = hashlib.blake2b(_clave(id_trans), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.funciones_hash)]
+
+    def _rotar_si_corresponde(self):
+        ahora = time.monotonic()
+        if (
+            self._insertados < self.capacidad_particion
+            and ahora - self._inicio_particion < self.duracion_particion
+        ):
+            return
+        # La partición más antigua se vacía y pasa a ser la actual
+        self._actual = (self._actual + 1) % self.particiones
+        self._filtros[self._actual] = bytearray(self.bits // 8 + 1)
+        self._insertados = 0
+        self._inicio_particion = ahora
+
+    def agregar(self, id_trans):
+        self._rotar_si_corresponde()
+        filtro = self._filtros[self._actual]
+        for posicion in self._posiciones(id_trans):
+            filtro[posicion >> 3] |= 1 << (posicion & 7)
+        self._insertados += 1
+
+    def contiene(self, id_trans) -> bool:
+        posiciones = self._posiciones(id_trans)
+        return any(
+            all(filtro[p >> 3] & (1 << (p & 7)) for p in posiciones)
+            for filtro in self._filtros
+        )
+
+
+class ConjuntoLRU:
+    """Conjunto exacto de los últimos 'capacidad' IDs registrados."""
+
+    def __init__(self, capacidad: int):
+        self.capacidad = max(1, capacidad)
+        self._ids = OrderedDict()
+
+    @property
+    def memoria_bytes(self) -> int:
+        return len(self._ids) * BYTES_POR_ENTRADA_LRU
+
+    def agregar(self, id_trans):
+        self._ids[id_trans] = None
+        self._ids.move_to_end(id_trans)
+        if len(self._ids) > self.capacidad:
+            self._ids.popitem(last=False)
+
+    def contiene(self, id_trans) -> bool:
+        return id_trans in self._ids
+
+
+def crear_deduplicador(
+    modo: str,
+    memoria_bytes: int,
+    tasa_falsos_positivos: float,
+    particiones: int,
+    ventana_segundos: float,
+):
+    """Construye el deduplicador según FRAUD_DEDUPE_MODE ("bloom", "lru" u "off")."""
+    if modo == "bloom":
+        return FiltroBloomTemporal(memoria_bytes, tasa_falsos_positivos, particiones, ventana_segundos)
+    if modo == "lru":
+        return ConjuntoLRU(memoria_bytes // BYTES_POR_ENTRADA_LRU)
+    if modo == "off":
+        return None
+    raise ValueError(f"FRAUD_DEDUPE_MODE inválido: {modo!r}")
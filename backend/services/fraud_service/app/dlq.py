@@ -0,0 +1,107 @@
+"""
+Herramienta de línea de comandos para la dead-letter queue de fraude.
+
+    python -m app.dlq inspeccionar [--limite 20]
+    python -m app.dlq reprocesar [--limite 1000] [--cola fraud_detection_queue.shard.3]
+
+'inspeccionar' lee mensajes sin confirmarlos: al cerrar el canal vuelven
+a la DLQ. 'reprocesar' republica cada mensaje en su cola shard de origen
+(header x-original-queue) con el contador de reintentos a cero y solo
+entonces lo confirma, así un corte a mitad no pierde mensajes.
+"""
+import argparse
+import asyncio
+
+import aio_pika
+
+from .codec import ErrorDecodificacion, decodificar
+from .config import settings
+from .reintentos import HEADER_COLA_ORIGEN, HEADER_REINTENTOS, HEADER_ULTIMO_ERROR
+from .topologia import COLA_DLQ
+
+
+def _resumen(message: aio_pika.abc.AbstractIncomingMessage) -> str:
+    headers = message.headers or {}
+    try:
+        id_trans = decodificar(message.body, message.content_type).get("id")
+    except (ErrorDecodificacion, AttributeError):
+        id_trans = "?"
+    return (
+        f"id={id_trans} cola={headers.get(HEADER_COLA_ORIGEN, '?')} "
+        f"intentos={int(headers.get(HEADER_REINTENTOS, 0)) + 1} "
+        f"error={str(headers.get(HEADER_ULTIMO_ERROR, ''))[:100]}"
+    )
+
+
+async def inspeccionar(channel: aio_pika.abc.AbstractChannel, limite: int):
+    cola = await channel.declare_queue(COLA_DLQ, durable=True)
+    print(f"📦 {COLA_DLQ}: {cola.declaration_result.message_count} mensajes")
+
+    for _ in range(limite):
+        message = await cola.get(no_ack=False, fail=False)
+        if message is None:
+            break
+        # Sin ack: vuelven a la DLQ al cerrar el canal
+        print(f"  - {_resumen(message)}")
+
+
+async def reprocesar(channel: aio_pika.abc.AbstractChannel, limite: int, solo_cola: str | None):
+    cola = await channel.declare_queue(COLA_DLQ, durable=True)
+    reprocesados = 0
+    omitidos = 0
+
+    for _ in range(limite):
+        message = await cola.get(no_ack=False, fail=False)
+        if message is None:
+            break
+
+        headers = dict(message.headers or {})
+        destino = headers.get(HEADER_COLA_ORIGEN)
+        if not destino or (solo_cola and destino != solo_cola):
+            # Queda sin ack hasta el final y vuelve a la DLQ
+            omitidos += 1
+            continue
+
+        headers[HEADER_REINTENTOS] = 0
+        await channel.default_exchange.publish(
+            aio_pika.Message(
+                body=message.body,
+                headers=headers,
+                content_type=message.content_type,
+                message_id=message.message_id,
+                timestamp=message.timestamp,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            ),
+            routing_key=destino,
+        )
+        # El canal usa publisher confirms: el publish ya fue aceptado
+        await message.ack()
+        reprocesados += 1
+
+    print(f"✅ Reprocesados: {reprocesados} | omitidos: {omitidos}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Inspecciona y reprocesa la DLQ de fraude")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    parser_inspeccionar = subparsers.add_parser("inspeccionar", help="Lista mensajes sin consumirlos")
+    parser_inspeccionar.add_argument("--limite", type=int, default=20)
+
+    parser_reprocesar = subparsers.add_parser("reprocesar", help="Devuelve mensajes a su cola de origen")
+    parser_reprocesar.add_argument("--limite", type=int, default=1000)
+    parser_reprocesar.add_argument("--cola", default=None, help="Solo mensajes de esta cola shard")
+
+    args = parser.parse_args()
+
+    connection = await aio_pika.connect_robust(settings.RABBITMQ_URL, timeout=30)
+    async with connection:
+        channel = await connection.channel()
+        if args.comando == "inspeccionar":
+            await inspeccionar(channel, args.limite)
+        else:
+            await reprocesar(channel, args.limite, args.cola)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+import bisect
+import time
+
+# Límites superiores (ms) de los buckets del tiempo hasta la decisión;
+# el último bucket (sin límite) acumula lo que supere 60 s
+LIMITES_DECISION_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class HistogramaLatencia:
+    """Histograma de buckets fijos: barato de actualizar y de sumar entre procesos."""
+
+    def __init__(self, limites=LIMITES_DECISION_MS):
+        self.limites = limites
+        self.conteos = [0] * (len(limites) + 1)
+
+    def registrar(self, valor_ms: float):
+        self.conteos[bisect.bisect_left(self.limites, valor_ms)] += 1
+
+    def reiniciar(self):
+        self.conteos = [0] * (len(self.limites) + 1)
+
+
+def percentil_histograma(conteos: list, p: float, limites=LIMITES_DECISION_MS) -> float | None:
+    """
+    Percentil aproximado (límite superior del bucket que lo contiene).
+    Para el último bucket retorna infinito. None si no hay muestras.
+    """
+    total = sum(conteos)
+    if total == 0:
+        return None
+    objetivo = p / 100 * total
+    acumulado = 0
+    for indice, conteo in enumerate(conteos):
+        acumulado += conteo
+        if acumulado >= objetivo:
+            return float(limites[indice]) if indice < len(limites) else float("inf")
+    return float("inf")
+
+
+class EstadisticasWorker:
+    """
+    Contadores del proceso worker.
+    Se actualizan desde el bucle de asyncio (un solo hilo), por eso no
+    necesitan locks. El supervisor recibe instantáneas periódicas.
+    """
+
+    def __init__(self):
+        self.inicio = time.monotonic()
+        self.procesados = 0
+        self.errores = 0
+        self.en_vuelo = 0
+        # Mensajes reprogramados en colas de espera y enviados a la DLQ
+        self.reintentos = 0
+        self.dlq = 0
+        # Lag = tiempo entre la publicación y el inicio del procesamiento
+        self.lag_ultimo_ms = 0.0
+        self.lag_max_ms = 0.0
+        # Mensajes pendientes en las colas reclamadas (último sondeo)
+        self.pendientes_cola = 0
+        # Estado del circuit breaker y prefetch vigente
+        self.circuito = "closed"
+        self.aperturas_circuito = 0
+        self.prefetch = 0
+        # Autoajuste: concurrencia vigente, latencia medida y último motivo
+        self.concurrencia = 0
+        self.latencia_ms = 0.0
+        self.ajustes = 0
+        self.motivo_ajuste = ""
+        # Deduplicación: reentregas consultadas, omitidas por estar ya
+        # decididas y memoria del filtro
+        self.dedupe_consultas = 0
+        self.dedupe_aciertos = 0
+        self.dedupe_memoria_bytes = 0
+        # Tiempo desde la publicación hasta la decisión, por carril
+        self.tiempo_decision: dict[str, HistogramaLatencia] = {}
+
+    def registrar_lag(self, publicado_en: float | None):
+        """Registra el lag a partir del header 'x-published-at' (epoch s)."""
+        if publicado_en is None:
+            return
+        lag_ms = max(0.0, (time.time() - publicado_en) * 1000.0)
+        self.lag_ultimo_ms = lag_ms
+        if lag_ms > self.lag_max_ms:
+            self.lag_max_ms = lag_ms
+
+    def registrar_decision(self, carril: str, publicado_en: float | None):
+        """Registra el tiempo hasta la decisión de un mensaje del carril."""
+        if publicado_en is None:
+            return
+        histograma = self.tiempo_decision.get(carril)
+        if histograma is None:
+            histograma = self.tiempo_decision[carril] = HistogramaLatencia()
+        histograma.registrar(max(0.0, (time.time() - publicado_en) * 1000.0))
+
+    def snapshot(self) -> dict:
+        """Instantánea serializable (se envía por multiprocessing.Queue)."""
+        datos = {
+            "uptime_s": round(time.monotonic() - self.inicio, 1),
+            "procesados": self.procesados,
+            "errores": self.errores,
+            "reintentos": self.reintentos,
+            "dlq": self.dlq,
+            "en_vuelo": self.en_vuelo,
+            "lag_ultimo_ms": round(self.lag_ultimo_ms, 1),
+            "lag_max_ms": round(self.lag_max_ms, 1),
+            "pendientes_cola": self.pendientes_cola,
+            "circuito": self.circuito,
+            "aperturas_circuito": self.aperturas_circuito,
+            "prefetch": self.prefetch,
+            "concurrencia": self.concurrencia,
+            "latencia_ms": round(self.latencia_ms, 1),
+            "ajustes": self.ajustes,
+            "motivo_ajuste": self.motivo_ajuste,
+            "dedupe_consultas": self.dedupe_consultas,
+            "dedupe_aciertos": self.dedupe_aciertos,
+            "dedupe_memoria_bytes": self.dedupe_memoria_bytes,
+            "tiempo_decision": {
+                carril: list(histograma.conteos)
+                for carril, histograma in self.tiempo_decision.items()
+            },
+        }
+        # El máximo y los histogramas son por intervalo de reporte
+        self.lag_max_ms = 0.0
+        for histograma in self.tiempo_decision.values():
+            histograma.reiniciar()
+        return datos
+
+
+# Instancia única del proceso
+estadisticas = EstadisticasWorker()
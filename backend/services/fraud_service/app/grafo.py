@@ -0,0 +1,184 @@
+"""
+Grafo dirigido de transferencias entre cuentas, en memoria y acotado.
+
+Las redes de "mulas" aparecen como patrones de fan-in (muchas cuentas que
+envían a una) y fan-out (una cuenta que reparte a muchas). El grafo guarda
+por cuenta, en arreglos compactos indexados por un ID entero:
+
+- grado de entrada y de salida con decaimiento exponencial (vida media
+  configurable), actualizados y consultados en O(1);
+- un buffer circular con las últimas K contrapartes en cada sentido
+  (remitentes y destinatarios recientes), consulta en O(K).
+
+Acotado: como máximo ``max_cuentas`` cuentas (ver IndiceCuentas). Las
+referencias a un ID reciclado en los buffers de otras cuentas se
+descartan al leerlas comparando la generación.
+
+Alcance: el worker solo ve los mensajes de sus shards, que se reparten
+por cuenta de origen. El fan-out de una cuenta es completo; el fan-in de
+una cuenta destino es la parte que llega desde los shards del proceso.
+"""
+import math
+import time
+from array import array
+
+from .cuentas import IndiceCuentas
+
+
+class GrafoTransferencias:
+    def __init__(
+        self,
+        max_cuentas: int,
+        contrapartes_recientes: int = 8,
+        vida_media_segundos: float = 3600.0,
+        minimo_remitentes_fan_in: int = 6,
+        puntaje_z_fan_in: float = 4.0,
+        alfa_media: float = 0.001,
+    ):
+        if not 0 < contrapartes_recientes < 256:
+            raise ValueError("contrapartes_recientes debe estar entre 1 y 255")
+        if minimo_remitentes_fan_in > contrapartes_recientes:
+            raise ValueError("minimo_remitentes_fan_in no puede superar contrapartes_recientes")
+        self.minimo_remitentes_fan_in = minimo_remitentes_fan_in
+        self.puntaje_z_fan_in = puntaje_z_fan_in
+        self.max_cuentas = max_cuentas
+        self.k = contrapartes_recientes
+        self._decaimiento = math.log(2) / vida_media_segundos
+        self._alfa = alfa_media
+
+        # Cuenta <-> ID entero
+        self._indice = IndiceCuentas(max_cuentas, al_reciclar=self._reciclar)
+
+        # Grados con decaimiento y momento de la última actualización
+        self._grado_entrada = array("d", bytes(8 * max_cuentas))
+        self._grado_salida = array("d", bytes(8 * max_cuentas))
+        self._actualizado = array("d", bytes(8 * max_cuentas))
+
+        # Buffers circulares de contrapartes: (id << 32) | generación; 0 = vacío
+        self._remitentes = array("Q", bytes(8 * max_cuentas * self.k))
+        self._destinatarios = array("Q", bytes(8 * max_cuentas * self.k))
+        self._pos_remitentes = bytearray(max_cuentas)
+        self._pos_destinatarios = bytearray(max_cuentas)
+
+        # Media y varianza móviles (EWMA) del grado de entrada observado
+        self.media_grado_entrada = 0.0
+        self.varianza_grado_entrada = 0.0
+
+        self.transferencias = 0
+
+    # --- IDs ---
+
+    def _reciclar(self, indice: int):
+        self._grado_entrada[indice] = 0.0
+        self._grado_salida[indice] = 0.0
+        inicio = indice * self.k
+        for i in range(inicio, inicio + self.k):
+            self._remitentes[i] = 0
+            self._destinatarios[i] = 0
+
+    def _ref(self, indice: int) -> int:
+        return (indice << 32) | self._indice.generacion[indice]
+
+    # --- Actualización ---
+
+    def _decaer(self, indice: int, ahora: float):
+        transcurrido = ahora - self._actualizado[indice]
+        if transcurrido > 0:
+            factor = math.exp(-self._decaimiento * transcurrido)
+            self._grado_entrada[indice] *= factor
+            self._grado_salida[indice] *= factor
+            self._actualizado[indice] = ahora
+
+    def registrar(self, origen: str, destino: str, ahora: float | None = None):
+        """Registra una transferencia origen -> destino. O(1)."""
+        if ahora is None:
+            ahora = time.time()
+        o = self._indice.obtener(origen)
+        d = self._indice.obtener(destino, proteger=o)
+
+        self._decaer(o, ahora)
+        self._decaer(d, ahora)
+        self._grado_salida[o] += 1.0
+        self._grado_entrada[d] += 1.0
+
+        pos = self._pos_destinatarios[o]
+        self._destinatarios[o * self.k + pos] = self._ref(d)
+        self._pos_destinatarios[o] = (pos + 1) % self.k
+
+        pos = self._pos_remitentes[d]
+        self._remitentes[d * self.k + pos] = self._ref(o)
+        self._pos_remitentes[d] = (pos + 1) % self.k
+
+        # Distribución del grado de entrada de los destinos observados
+        grado = self._grado_entrada[d]
+        diferencia = grado - self.media_grado_entrada
+        self.media_grado_entrada += self._alfa * diferencia
+        self.varianza_grado_entrada = (1 - self._alfa) * (
+            self.varianza_grado_entrada + self._alfa * diferencia * diferencia
+        )
+        self.transferencias += 1
+
+    # --- Consultas ---
+
+    def _grado(self, grados: array, cuenta: str, ahora: float | None) -> float:
+        indice = self._indice.buscar(cuenta)
+        if indice is None:
+            return 0.0
+        if ahora is None:
+            ahora = time.time()
+        transcurrido = max(0.0, ahora - self._actualizado[indice])
+        return grados[indice] * math.exp(-self._decaimiento * transcurrido)
+
+    def grado_entrada(self, cuenta: str, ahora: float | None = None) -> float:
+        """Transferencias recibidas, con decaimiento. O(1)."""
+        return self._grado(self._grado_entrada, cuenta, ahora)
+
+    def grado_salida(self, cuenta: str, ahora: float | None = None) -> float:
+        """Transferencias enviadas, con decaimiento. O(1)."""
+        return self._grado(self._grado_salida, cuenta, ahora)
+
+    def _recientes(self, buffer: array, cuenta: str) -> list[str]:
+        indice = self._indice.buscar(cuenta)
+        if indice is None:
+            return []
+        generacion = self._indice.generacion
+        nombres = self._indice.nombres
+        cuentas = []
+        for i in range(indice * self.k, (indice + 1) * self.k):
+            ref = buffer[i]
+            if not ref:
+                continue
+            otro = ref >> 32
+            # Si el ID se recicló, la referencia es de otra cuenta: se descarta
+            if generacion[otro] == ref & 0xFFFFFFFF and nombres[otro] is not None:
+                cuentas.append(nombres[otro])
+        return cuentas
+
+    def remitentes_recientes(self, cuenta: str) -> list[str]:
+        """Últimas K cuentas que enviaron a 'cuenta' (con repeticiones)."""
+        return self._recientes(self._remitentes, cuenta)
+
+    def destinatarios_recientes(self, cuenta: str) -> list[str]:
+        """Últimas K cuentas a las que 'cuenta' envió (con repeticiones)."""
+        return self._recientes(self._destinatarios, cuenta)
+
+    def fan_in_anormal(self, cuenta: str, ahora: float | None = None) -> bool:
+        """
+        Fan-in anormal: al menos 'minimo_remitentes_fan_in' remitentes
+        distintos entre los recientes y un grado de entrada
+        'puntaje_z_fan_in' desviaciones por encima de la media móvil de
+        los destinos.
+        """
+        if len(set(self.remitentes_recientes(cuenta))) < self.minimo_remitentes_fan_in:
+            return False
+        desviacion = math.sqrt(self.varianza_grado_entrada)
+        umbral = self.media_grado_entrada + self.puntaje_z_fan_in * desviacion
+        return self.grado_entrada(cuenta, ahora) > umbral
+
+    @property
+    def cuentas(self) -> int:
+        return len(self._indice)
+
+    @property
+    def reciclados(self) -> int:
+        return self._indice.reciclados
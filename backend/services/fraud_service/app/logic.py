@@ -4,21 +4,44 @@ from datetime import datetime
 ESTADO_APROBADO = "APPROVED"
 ESTADO_RECHAZADO = "REJECTED"
 
+# --- Registro de Reglas ---
+# Bit de cada regla en la máscara 'reglas_activadas' que se guarda con la
+# decisión. Los bits no se reutilizan ni se reordenan: el historial
+# guardado depende de ellos. Debe coincidir con
+# transacciones/app/services/rules_registry.py.
+BITS_REGLAS = {
+    "Monto_Alto": 1 << 0,
+    "Ubicacion_Riesgosa": 1 << 1,
+    "Hora_Nocturna_Riesgosa": 1 << 2,
+    "Fan_In_Anormal": 1 << 3,
+}
+
+# --- Umbrales de las reglas ---
+# El backtest (python -m app.backtest) parte de estos valores como
+# conjunto de reglas actual.
+LIMITE_MONTO_ALTO = 5000.00
+UBICACIONES_DE_RIESGO = frozenset({"Panamá", "Islas Caimán", "Suiza"})
+HORA_NOCTURNA_INICIO = 2   # incluida
+HORA_NOCTURNA_FIN = 4      # excluida
+
 # --- Definición de Reglas de Fraude ---
 
-def regla_monto_alto(monto: float) -> bool:
+def regla_monto_alto(monto: float, puntaje=None) -> bool:
     """
-    Regla 1: Verifica si el monto supera el límite.
+    Regla 1: Verifica si el monto es alto para la cuenta.
+    Con un perfil maduro (PuntajeMonto) deciden el z-score y el percentil frente
+    al historial de la cuenta; sin perfil, el límite fijo.
     """
-    return monto > 5000.00
+    if puntaje is not None:
+        return puntaje.atipico
+    return monto > LIMITE_MONTO_ALTO
 
 def regla_ubicacion_riesgosa(ubicacion: str) -> bool:
     """
     Regla 2: Verifica si la transacción ocurre en una ubicación
     conocida por fraude.
     """
-    ubicaciones_de_riesgo = {"Panamá", "Islas Caimán", "Suiza"}
-    return ubicacion in ubicaciones_de_riesgo
+    return ubicacion in UBICACIONES_DE_RIESGO
 
 def regla_hora_nocturna_riesgosa(hora_transaccion_str: str) -> bool:
     """
@@ -28,38 +51,79 @@ def regla_hora_nocturna_riesgosa(hora_transaccion_str: str) -> bool:
     try:
         hora_transaccion = datetime.fromisoformat(hora_transaccion_str)
         hora = hora_transaccion.hour
-        return 2 <= hora < 4
+        return HORA_NOCTURNA_INICIO <= hora < HORA_NOCTURNA_FIN
     except (ValueError, TypeError):
         return False
 
+def regla_hora_nocturna_riesgosa_ts(hora_ts: float) -> bool:
+    """
+    Regla 3 para mensajes binarios: la hora llega como epoch UTC
+    (segundos), así que la hora del día sale de una división entera
+    sin parsear texto.
+    """
+    hora = int(hora_ts // 3600) % 24
+    return HORA_NOCTURNA_INICIO <= hora < HORA_NOCTURNA_FIN
+
+def regla_fan_in_anormal(grafo, cuenta_destino: str) -> bool:
+    """
+    Regla 4: Verifica si la cuenta destino recibe de muchas cuentas
+    distintas, muy por encima de lo normal (patrón de cuenta "mula").
+
+    Vista parcial: los shards se reparten por cuenta de origen, así que el
+    grafo de cada proceso solo cuenta los remitentes de sus propios
+    shards. Con varios procesos, una mula cuyos remitentes caen en shards
+    de procesos distintos puede no alcanzar el umbral en ninguno.
+    """
+    return grafo.fan_in_anormal(cuenta_destino)
+
 # --- Motor de Reglas Principal ---
 
-def aplicar_reglas_fraude(datos_transaccion: dict) -> str:
+def aplicar_reglas_fraude(datos_transaccion: dict, grafo=None, puntaje_monto=None) -> str:
     """
     Aplica todas las reglas y retorna APPROVED o REJECTED.
     """
+    return evaluar_reglas(datos_transaccion, grafo, puntaje_monto)[0]
+
+def evaluar_reglas(datos_transaccion: dict, grafo=None, puntaje_monto=None) -> tuple[str, int]:
+    """
+    Aplica todas las reglas y retorna (estado, máscara de reglas activadas).
+    grafo: GrafoTransferencias con la transferencia ya registrada; sin él
+    no se evalúan las reglas de red.
+    puntaje_monto: PuntajeMonto de la cuenta de origen (None = regla fija).
+    """
     
     reglas_activadas = []
     
     # Datos de entrada
     monto = datos_transaccion.get("monto", 0.0)
     ubicacion = datos_transaccion.get("ubicacion", "")
-    hora_str = datos_transaccion.get("hora", "")
+    hora_ts = datos_transaccion.get("hora_ts")
 
     # --- Aplicar Reglas ---
-    if regla_monto_alto(monto):
+    if regla_monto_alto(monto, puntaje_monto):
         reglas_activadas.append("Monto_Alto")
         
     if regla_ubicacion_riesgosa(ubicacion):
         reglas_activadas.append("Ubicacion_Riesgosa")
         
-    if regla_hora_nocturna_riesgosa(hora_str):
+    if hora_ts is not None:
+        hora_nocturna = regla_hora_nocturna_riesgosa_ts(hora_ts)
+    else:
+        hora_nocturna = regla_hora_nocturna_riesgosa(datos_transaccion.get("hora", ""))
+    if hora_nocturna:
         reglas_activadas.append("Hora_Nocturna_Riesgosa")
 
+    if grafo is not None and regla_fan_in_anormal(grafo, datos_transaccion.get("cuenta_destino", "")):
+        reglas_activadas.append("Fan_In_Anormal")
+
+    mascara = 0
+    for regla in reglas_activadas:
+        mascara |= BITS_REGLAS[regla]
+
     # --- Clasificación Final --- 
     if len(reglas_activadas) > 0:
         print(f" [!] ⚠️  Fraude detectado: {', '.join(reglas_activadas)}")
-        return ESTADO_RECHAZADO
+        return ESTADO_RECHAZADO, mascara
     else:
         print(f" [✓] ✅ Transacción aprobada")
-        return ESTADO_APROBADO
\ No newline at end of file
+        return ESTADO_APROBADO, mascara
\ No newline at end of file
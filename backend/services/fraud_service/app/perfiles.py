@@ -0,0 +1,253 @@
+"""
+Perfil de montos por cuenta de origen, en línea y en arreglos compactos.
+
+Por cuenta se guarda:
+
+- cantidad, media y M2 (algoritmo de Welford) para la desviación típica;
+- un histograma de ``BUCKETS`` buckets log2 (contadores de 16 bits) como
+  esbozo de cuantiles: el percentil de un monto se estima sumando los
+  buckets inferiores e interpolando (en escala log) dentro del suyo. Si
+  un contador se satura se dividen a la mitad todos los de la cuenta, lo
+  que además da más peso a lo reciente.
+
+Cada transacción se puntúa *antes* de sumarla al perfil (z-score y
+percentil frente a su propio historial). Con menos de ``min_muestras``
+el perfil no está maduro y manda la regla fija de monto alto.
+
+Un monto es atípico solo si ambas señales lo marcan. El percentil solo
+no basta: cualquier monto apenas mayor que todo lo visto queda en 1.0.
+La desviación usada para el z-score tiene un piso relativo a la media:
+una cuenta de montos casi constantes no marca un monto un 0.5% mayor.
+
+Las cuentas se reparten por shard según la cuenta de origen, así que el
+perfil de una cuenta vive en un solo proceso. Cada posición recuerda su
+shard y la instantánea se escribe en un archivo por shard: un proceso
+que reclame otros shards tras un reinicio carga solo los suyos.
+"""
+import math
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+
+from .cuentas import IndiceCuentas
+
+BUCKETS = 20          # bucket i: montos en [2^(i-1), 2^i); 0: < 1; último: >= 2^18
+CONTADOR_MAXIMO = 0xFFFF
+
+_MAGIA = b"TSPF"
+_VERSION = 1
+_CABECERA = struct.Struct("<4sBHI")   # magia, versión, buckets, cuentas
+
+
+@dataclass
+class PuntajeMonto:
+    muestras: int
+    media: float
+    z: float
+    percentil: float
+    atipico: bool
+
+
+def _bucket(monto: float) -> int:
+    if monto < 1.0:
+        return 0
+    return min(BUCKETS - 1, int(math.log2(monto)) + 1)
+
+
+def _fraccion_en_bucket(monto: float, bucket: int) -> float:
+    """Posición del monto dentro de su bucket (0 a 1), lineal en log2."""
+    if bucket == 0:
+        return max(0.0, monto)
+    if bucket == BUCKETS - 1:
+        # Último bucket sin límite superior: se toma la mitad
+        return 0.5
+    return math.log2(monto) - (bucket - 1)
+
+
+class PerfilesMonto:
+    def __init__(
+        self,
+        max_cuentas: int,
+        min_muestras: int = 20,
+        puntaje_z: float = 4.0,
+        percentil: float = 0.995,
+        monto_minimo: float = 500.0,
+        desviacion_relativa_minima: float = 0.1,
+    ):
+        """
+        Un monto es atípico para un perfil maduro si supera 'puntaje_z'
+        desviaciones y el percentil dado, y además 'monto_minimo' (evita
+        marcar 80 en una cuenta que siempre mueve 10). La desviación nunca
+        es menor que 'desviacion_relativa_minima' veces la media.
+        """
+        self.min_muestras = min_muestras
+        self.puntaje_z = puntaje_z
+        self.percentil = percentil
+        self.monto_minimo = monto_minimo
+        self.desviacion_relativa_minima = desviacion_relativa_minima
+        self.max_cuentas = max_cuentas
+
+        self._indice = IndiceCuentas(max_cuentas, al_reciclar=self._reciclar)
+        self._muestras = array("I", bytes(4 * max_cuentas))
+        self._media = array("d", bytes(8 * max_cuentas))
+        self._m2 = array("d", bytes(8 * max_cuentas))
+        self._histograma = array("H", bytes(2 * max_cuentas * BUCKETS))
+        self._shard = array("H", bytes(2 * max_cuentas))
+
+    def _reciclar(self, indice: int):
+        self._muestras[indice] = 0
+        self._media[indice] = 0.0
+        self._m2[indice] = 0.0
+        inicio = indice * BUCKETS
+        self._histograma[inicio:inicio + BUCKETS] = array("H", bytes(2 * BUCKETS))
+
+    @property
+    def cuentas(self) -> int:
+        return len(self._indice)
+
+    def puntuar(self, cuenta: str, monto: float) -> PuntajeMonto | None:
+        """Puntaje del monto frente al perfil; None si el perfil no está maduro."""
+        indice = self._indice.buscar(cuenta)
+        if indice is None:
+            return None
+        muestras = self._muestras[indice]
+        if muestras < self.min_muestras:
+            return None
+
+        media = self._media[indice]
+        desviacion = max(
+            math.sqrt(self._m2[indice] / (muestras - 1)),
+            abs(media) * self.desviacion_relativa_minima,
+            # Media ~0 (montos nulos): evita dividir por cero
+            1e-9,
+        )
+        z = (monto - media) / desviacion
+
+        inicio = indice * BUCKETS
+        bucket = _bucket(monto)
+        conteos = self._histograma[inicio:inicio + BUCKETS]
+        total = sum(conteos)
+        percentil = (
+            (sum(conteos[:bucket]) + conteos[bucket] * _fraccion_en_bucket(monto, bucket)) / total
+            if total else 0.0
+        )
+
+        atipico = monto > self.monto_minimo and z > self.puntaje_z and percentil >= self.percentil
+        return PuntajeMonto(muestras, media, z, percentil, atipico)
+
+    def registrar(self, cuenta: str, monto: float, shard: int = 0):
+        """Suma el monto al perfil de la cuenta (Welford + histograma). O(1)."""
+        indice = self._indice.obtener(cuenta)
+        self._shard[indice] = shard
+
+        muestras = self._muestras[indice] + 1
+        delta = monto - self._media[indice]
+        self._media[indice] += delta / muestras
+        self._m2[indice] += delta * (monto - self._media[indice])
+        self._muestras[indice] = min(muestras, 0xFFFFFFFF)
+
+        posicion = indice * BUCKETS + _bucket(monto)
+        if self._histograma[posicion] == CONTADOR_MAXIMO:
+            inicio = indice * BUCKETS
+            for i in range(inicio, inicio + BUCKETS):
+                self._histograma[i] >>= 1
+        self._histograma[posicion] += 1
+
+    # --- Instantáneas ---
+
+    def copiar(self) -> dict:
+        """
+        Copia del estado para escribirla fuera del bucle de asyncio
+        (copiar los arreglos es un memcpy; serializar no).
+        """
+        return {
+            "ids": dict(self._indice.ids),
+            "muestras": array("I", self._muestras),
+            "media": array("d", self._media),
+            "m2": array("d", self._m2),
+            "histograma": array("H", self._histograma),
+            "shard": array("H", self._shard),
+        }
+
+    @staticmethod
+    def guardar(copia: dict, directorio: str, shards: list[int]) -> int:
+        """
+        Escribe un archivo por shard (perfiles.shard-<i>.bin). Escritura
+        atómica: archivo temporal + os.replace. Retorna cuentas guardadas.
+        """
+        ruta = Path(directorio)
+        ruta.mkdir(parents=True, exist_ok=True)
+        por_shard = {shard: [] for shard in shards}
+        for cuenta, indice in copia["ids"].items():
+            lista = por_shard.get(copia["shard"][indice])
+            if lista is not None:
+                lista.append((cuenta, indice))
+
+        total = 0
+        for shard, entradas in por_shard.items():
+            indices = [indice for _, indice in entradas]
+            nombres = "\0".join(cuenta for cuenta, _ in entradas).encode()
+            histograma = array("H")
+            for indice in indices:
+                histograma.extend(copia["histograma"][indice * BUCKETS:(indice + 1) * BUCKETS])
+            partes = [
+                array("I", (copia["muestras"][i] for i in indices)),
+                array("d", (copia["media"][i] for i in indices)),
+                array("d", (copia["m2"][i] for i in indices)),
+                histograma,
+            ]
+            if sys.byteorder != "little":
+                for parte in partes:
+                    parte.byteswap()
+
+            destino = ruta / f"perfiles.shard-{shard}.bin"
+            temporal = destino.with_suffix(".tmp")
+            with open(temporal, "wb") as f:
+                f.write(_CABECERA.pack(_MAGIA, _VERSION, BUCKETS, len(entradas)))
+                f.write(struct.pack("<I", len(nombres)))
+                f.write(nombres)
+                for parte in partes:
+                    f.write(parte.tobytes())
+            os.replace(temporal, destino)
+            total += len(entradas)
+        return total
+
+    def cargar(self, directorio: str, shards: list[int]) -> int:
+        """Restaura los perfiles de los shards dados. Retorna cuentas cargadas."""
+        total = 0
+        for shard in shards:
+            archivo = Path(directorio) / f"perfiles.shard-{shard}.bin"
+            if not archivo.exists():
+                continue
+            datos = archivo.read_bytes()
+            magia, version, buckets, cuentas = _CABECERA.unpack_from(datos, 0)
+            if magia != _MAGIA or version != _VERSION or buckets != BUCKETS:
+                raise ValueError(f"Instantánea incompatible: {archivo}")
+            posicion = _CABECERA.size
+            (largo,) = struct.unpack_from("<I", datos, posicion)
+            posicion += 4
+            nombres = datos[posicion:posicion + largo].decode().split("\0") if cuentas else []
+            posicion += largo
+
+            partes = []
+            for tipo, cantidad in (("I", cuentas), ("d", cuentas), ("d", cuentas), ("H", cuentas * BUCKETS)):
+                parte = array(tipo)
+                parte.frombytes(datos[posicion:posicion + parte.itemsize * cantidad])
+                if sys.byteorder != "little":
+                    parte.byteswap()
+                posicion += parte.itemsize * cantidad
+                partes.append(parte)
+            muestras, media, m2, histograma = partes
+
+            for i, cuenta in enumerate(nombres):
+                indice = self._indice.obtener(cuenta)
+                self._shard[indice] = shard
+                self._muestras[indice] = muestras[i]
+                self._media[indice] = media[i]
+                self._m2[indice] = m2[i]
+                self._histograma[indice * BUCKETS:(indice + 1) * BUCKETS] = histograma[i * BUCKETS:(i + 1) * BUCKETS]
+            total += cuentas
+        return total
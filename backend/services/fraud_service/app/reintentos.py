@@ -0,0 +1,69 @@
+import aio_pika
+
+from .estadisticas import estadisticas
+from .topologia import COLA_DLQ, nombre_exchange_reintento
+
+# --- Headers de la política de reintentos ---
+HEADER_REINTENTOS = "x-retry-count"
+HEADER_COLA_ORIGEN = "x-original-queue"
+HEADER_ULTIMO_ERROR = "x-last-error"
+
+
+def _copiar(message: aio_pika.abc.AbstractIncomingMessage, headers: dict) -> aio_pika.Message:
+    """Copia persistente del mensaje recibido con los headers dados."""
+    return aio_pika.Message(
+        body=message.body,
+        headers=headers,
+        content_type=message.content_type,
+        message_id=message.message_id,
+        timestamp=message.timestamp,
+        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+    )
+
+
+class PoliticaReintentos:
+    """
+    Reprograma los mensajes fallidos en colas de espera con TTL creciente
+    y los envía a la DLQ al agotar los intentos.
+    El mensaje original se confirma (ack) después de publicar la copia.
+    """
+
+    def __init__(self, channel: aio_pika.abc.AbstractChannel, retrasos: list[int], max_intentos: int):
+        self.channel = channel
+        self.retrasos = retrasos
+        self.max_intentos = max_intentos
+
+    async def programar(self, message: aio_pika.abc.AbstractIncomingMessage, cola_origen: str, error: str):
+        """
+        Publica el mensaje en el siguiente nivel de espera o en la DLQ.
+        Si esto falla la excepción se propaga, el mensaje se rechaza y la
+        cola shard lo deriva a la DLQ (nunca vuelve en bucle).
+        """
+        headers = dict(message.headers or {})
+        reintentos = int(headers.get(HEADER_REINTENTOS, 0))
+        intentos = reintentos + 1
+
+        headers[HEADER_COLA_ORIGEN] = headers.get(HEADER_COLA_ORIGEN, cola_origen)
+        headers[HEADER_ULTIMO_ERROR] = error[:500]
+
+        if intentos >= self.max_intentos:
+            await self.enviar_a_dlq(message, cola_origen, error, headers)
+            return
+
+        segundos = self.retrasos[min(reintentos, len(self.retrasos) - 1)]
+        headers[HEADER_REINTENTOS] = intentos
+        exchange = await self.channel.get_exchange(nombre_exchange_reintento(segundos), ensure=False)
+        # La routing key es la cola shard: al expirar el TTL vuelve allí
+        await exchange.publish(_copiar(message, headers), routing_key=cola_origen)
+        estadisticas.reintentos += 1
+        print(f" [↻] Reintento {intentos}/{self.max_intentos - 1} en {segundos}s")
+
+    async def enviar_a_dlq(self, message: aio_pika.abc.AbstractIncomingMessage, cola_origen: str, error: str, headers: dict | None = None):
+        """Envía el mensaje a la DLQ conservando su cola de origen y el error."""
+        if headers is None:
+            headers = dict(message.headers or {})
+            headers[HEADER_COLA_ORIGEN] = headers.get(HEADER_COLA_ORIGEN, cola_origen)
+            headers[HEADER_ULTIMO_ERROR] = error[:500]
+        await self.channel.default_exchange.publish(_copiar(message, headers), routing_key=COLA_DLQ)
+        estadisticas.dlq += 1
+        print(f" [☠] Mensaje enviado a {COLA_DLQ}: {error[:120]}")
@@ -0,0 +1,227 @@
+"""
+Supervisor multiproceso del worker de fraude.
+
+Arranca K procesos consumidores (por defecto uno por CPU), cada uno con
+su propia conexión AMQP, prefetch y un subconjunto disjunto de shards,
+de modo que el estado por cuenta sigue viviendo en un solo proceso.
+
+- Reinicia los hijos que mueren, con backoff exponencial.
+- Con SIGTERM/SIGINT reenvía la señal a los hijos, que dejan de consumir
+  y drenan sus mensajes en vuelo antes de salir.
+- Agrega el throughput y el lag de todos los procesos en un solo reporte.
+
+Uso: python -m app.supervisor
+"""
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import time
+
+from .config import settings
+from .estadisticas import percentil_histograma
+from .topologia import parsear_shards
+
+# Backoff de reinicio de hijos caídos
+BACKOFF_INICIAL = 1.0
+BACKOFF_MAXIMO = 60.0
+# Un hijo que vivió más que esto se considera estable y resetea el backoff
+VIDA_ESTABLE = 60.0
+
+
+def _ejecutar_hijo(indice: int, shards: list, cola_reporte):
+    """Punto de entrada de cada proceso hijo."""
+    # Import diferido: el hijo (spawn) carga el worker en su propio proceso
+    from .worker import main
+
+    try:
+        asyncio.run(main(
+            shards=shards, cola_reporte=cola_reporte, etiqueta=f"worker-{indice}",
+            puerto_metricas=_puerto_metricas(indice),
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+def _puerto_metricas(indice: int) -> int:
+    """Cada proceso expone sus propias métricas en un puerto consecutivo."""
+    return settings.FRAUD_METRICS_PORT + indice if settings.FRAUD_METRICS_PORT else 0
+
+
+def repartir_shards(shards: list, procesos: int) -> list[list]:
+    """Reparte los shards en 'procesos' grupos disjuntos (round-robin)."""
+    return [shards[i::procesos] for i in range(procesos)]
+
+
+class Hijo:
+    """Estado de un proceso consumidor supervisado."""
+
+    def __init__(self, indice: int, shards: list):
+        self.indice = indice
+        self.shards = shards
+        self.proceso = None
+        self.iniciado_en = 0.0
+        self.fallos = 0
+        self.reiniciar_en = 0.0
+        # Último reporte recibido y procesados del reporte anterior
+        self.reporte = {}
+        self.procesados_previos = 0
+
+
+class Supervisor:
+
+    def __init__(self, procesos: int, shards: list):
+        self.contexto = multiprocessing.get_context("spawn")
+        self.cola_reporte = self.contexto.Queue()
+        self.hijos = [
+            Hijo(indice, grupo)
+            for indice, grupo in enumerate(repartir_shards(shards, procesos))
+        ]
+        self.parando = False
+        # Histogramas del tiempo hasta la decisión por carril, sumados
+        # entre procesos desde el último reporte impreso
+        self.tiempo_decision: dict[str, list] = {}
+
+    def _arrancar(self, hijo: Hijo):
+        hijo.proceso = self.contexto.Process(
+            target=_ejecutar_hijo,
+            args=(hijo.indice, hijo.shards, self.cola_reporte),
+            name=f"fraud-worker-{hijo.indice}",
+        )
+        hijo.proceso.start()
+        hijo.iniciado_en = time.monotonic()
+        puerto = _puerto_metricas(hijo.indice)
+        metricas = f", métricas :{puerto}" if puerto else ""
+        print(f"🚀 worker-{hijo.indice} iniciado (pid {hijo.proceso.pid}, shards {hijo.shards}{metricas})")
+
+    def _vigilar(self):
+        """Detecta hijos caídos y los reinicia respetando el backoff."""
+        ahora = time.monotonic()
+        for hijo in self.hijos:
+            if hijo.proceso is None:
+                if ahora >= hijo.reiniciar_en:
+                    self._arrancar(hijo)
+                continue
+
+            if hijo.proceso.is_alive():
+                continue
+
+            codigo = hijo.proceso.exitcode
+            vida = ahora - hijo.iniciado_en
+            hijo.proceso = None
+            hijo.fallos = 0 if vida >= VIDA_ESTABLE else hijo.fallos + 1
+            espera = min(BACKOFF_INICIAL * (2 ** hijo.fallos), BACKOFF_MAXIMO)
+            hijo.reiniciar_en = ahora + espera
+            print(f"💥 worker-{hijo.indice} terminó (código {codigo}); reinicio en {espera:.0f}s")
+
+    def _recoger_reportes(self):
+        while True:
+            try:
+                datos = self.cola_reporte.get_nowait()
+            except queue.Empty:
+                return
+            indice = int(datos["etiqueta"].rsplit("-", 1)[1])
+            self.hijos[indice].reporte = datos
+            # Cada reporte trae solo lo de su intervalo: se suma al acumulado
+            for carril, conteos in datos.get("tiempo_decision", {}).items():
+                acumulado = self.tiempo_decision.setdefault(carril, [0] * len(conteos))
+                for bucket, conteo in enumerate(conteos):
+                    acumulado[bucket] += conteo
+
+    def _imprimir_reporte(self, intervalo: float):
+        """Reporte agregado: throughput por proceso y total, lag y backlog."""
+        total_tps = 0.0
+        total_pendientes = 0
+        lag_max = 0.0
+        lineas = []
+        for hijo in self.hijos:
+            datos = hijo.reporte
+            if not datos:
+                lineas.append(f"  worker-{hijo.indice}: sin datos")
+                continue
+            # Un reinicio pone los contadores del hijo a cero
+            delta = datos["procesados"] - hijo.procesados_previos
+            if delta < 0:
+                delta = datos["procesados"]
+            hijo.procesados_previos = datos["procesados"]
+            tps = delta / intervalo
+            total_tps += tps
+            total_pendientes += datos["pendientes_cola"]
+            lag_max = max(lag_max, datos["lag_max_ms"])
+            lineas.append(
+                f"  worker-{hijo.indice}: {tps:8.1f} msg/s | en vuelo {datos['en_vuelo']:3d} | "
+                f"errores {datos['errores']} | reintentos {datos['reintentos']} | "
+                f"dlq {datos['dlq']} | lag máx {datos['lag_max_ms']:.0f} ms | "
+                f"pendientes {datos['pendientes_cola']} | circuito {datos['circuito']} | "
+                f"prefetch {datos['prefetch']} / concurrencia {datos['concurrencia']} "
+                f"({datos['latencia_ms']:.0f} ms, {datos['ajustes']} ajustes: {datos['motivo_ajuste']}) | "
+                f"dedupe {datos['dedupe_aciertos']}/{datos['dedupe_consultas']} "
+                f"({datos['dedupe_memoria_bytes'] // 1024} KiB)"
+            )
+
+        print("=" * 60)
+        print(f"📊 {total_tps:.1f} msg/s | lag máx {lag_max:.0f} ms | pendientes {total_pendientes}")
+        for carril, conteos in sorted(self.tiempo_decision.items()):
+            if not sum(conteos):
+                continue
+            p50, p95, p99 = (percentil_histograma(conteos, p) for p in (50, 95, 99))
+            print(
+                f"  ⏱ carril {carril}: {sum(conteos)} decisiones | tiempo hasta la decisión "
+                f"p50 ≤{p50:.0f} ms | p95 ≤{p95:.0f} ms | p99 ≤{p99:.0f} ms"
+            )
+        self.tiempo_decision = {}
+        for linea in lineas:
+            print(linea)
+        print("=" * 60)
+
+    def _detener(self, *_):
+        self.parando = True
+
+    def _drenar_hijos(self):
+        """Reenvía SIGTERM y espera a que los hijos drenen sus mensajes."""
+        vivos = [h.proceso for h in self.hijos if h.proceso is not None and h.proceso.is_alive()]
+        for proceso in vivos:
+            proceso.terminate()  # SIGTERM: el worker drena antes de salir
+
+        limite = time.monotonic() + settings.FRAUD_DRAIN_TIMEOUT_SECONDS + 5
+        for proceso in vivos:
+            proceso.join(max(0.0, limite - time.monotonic()))
+            if proceso.is_alive():
+                print(f"⚠️ {proceso.name} no terminó a tiempo, forzando salida")
+                proceso.kill()
+                proceso.join()
+
+    def ejecutar(self):
+        signal.signal(signal.SIGTERM, self._detener)
+        signal.signal(signal.SIGINT, self._detener)
+
+        intervalo = settings.FRAUD_REPORT_INTERVAL_SECONDS
+        proximo_reporte = time.monotonic() + intervalo
+        while not self.parando:
+            self._vigilar()
+            self._recoger_reportes()
+            if time.monotonic() >= proximo_reporte:
+                self._imprimir_reporte(intervalo)
+                proximo_reporte += intervalo
+            time.sleep(0.5)
+
+        print("🛑 Supervisor deteniéndose, drenando workers...")
+        self._drenar_hijos()
+        print("👋 Supervisor detenido")
+
+
+def main():
+    shards = parsear_shards(settings.FRAUD_SHARDS, settings.FRAUD_SHARD_COUNT)
+    procesos = settings.FRAUD_WORKER_PROCESSES or os.cpu_count() or 1
+    if procesos > len(shards):
+        # Cada shard solo puede tener un consumidor activo
+        print(f"ℹ️ {procesos} procesos para {len(shards)} shards: se usarán {len(shards)}")
+        procesos = len(shards)
+
+    print(f"🧭 Supervisor de fraude: {procesos} procesos, shards {shards}")
+    Supervisor(procesos, shards).ejecutar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Topología de colas del pipeline de fraude.
+
+Los mensajes se publican en un exchange de tipo ``x-consistent-hash``
+(plugin ``rabbitmq_consistent_hash_exchange``) usando ``cuenta_origen``
+como routing key. El exchange reparte las cuentas entre N colas
+"shard" (``fraud_detection_queue.shard.<i>``), de modo que todas las
+transacciones de una misma cuenta caen siempre en la misma cola y se
+consumen en orden. Cada worker reclama un subconjunto de shards
+(``FRAUD_SHARDS``), así el estado por cuenta vive en un solo proceso.
+
+Las colas shard se declaran con ``x-single-active-consumer``: si dos
+workers reclaman el mismo shard por error, RabbitMQ entrega a uno solo
+y el otro queda en espera, sin romper el orden por cuenta.
+
+Rebalanceo (cambio de N)
+------------------------
+El hash consistente solo reasigna ~1/N de las cuentas al cambiar N,
+pero los mensajes que ya estén encolados en su shard anterior podrían
+procesarse después de los nuevos. Para cambiar N sin perder el orden:
+
+1. Detener la publicación (escalar ``transactions_service`` a 0 o
+   cortar el tráfico en el gateway).
+2. Esperar a que todas las colas ``fraud_detection_queue.shard.*``
+   queden vacías (panel de administración o ``rabbitmqctl list_queues``).
+3. Cambiar ``FRAUD_SHARD_COUNT`` en *ambos* servicios (transacciones y
+   fraude) y, si se usan, los ``FRAUD_SHARDS`` de cada worker.
+4. Reiniciar los servicios: al arrancar declaran y enlazan las colas
+   nuevas. Al reducir N, las colas sobrantes siguen enlazadas al
+   exchange; hay que eliminarlas a mano (``rabbitmqctl delete_queue``)
+   una vez vacías para que dejen de recibir cuentas.
+
+El estado por cuenta que guarde cada worker debe considerarse perdido
+para las cuentas que cambian de shard.
+
+Reintentos y dead-letter
+------------------------
+Un mensaje que falla no se reencola de inmediato. El worker lo vuelve a
+publicar en el exchange de su nivel de espera
+(``fraud_transactions.retry.<s>s``), cuya cola tiene ``x-message-ttl``
+y dead-letter hacia el exchange por defecto: al expirar, el mensaje
+vuelve a su cola shard original (su routing key es el nombre de la
+cola). Tras ``FRAUD_MAX_ATTEMPTS`` intentos, o si el mensaje es
+inválido, termina en ``fraud_detection_queue.dlq``. Las colas shard
+también hacen dead-letter a la DLQ, así un rechazo inesperado nunca
+provoca un bucle de reentregas. Ver ``python -m app.dlq``.
+
+Carriles de prioridad
+---------------------
+Las transferencias grandes (monto sobre ``FRAUD_HIGH_PRIORITY_AMOUNT``
+del publicador) se publican en un segundo exchange de hash consistente,
+``fraud_transactions.high``, con sus propias colas shard
+(``fraud_detection_queue.high.shard.<i>``). Así no esperan detrás de
+miles de transacciones chicas. El worker consume ambos carriles de sus
+shards y los atiende con reparto ponderado (``FRAUD_HIGH_LANE_WEIGHT``
+turnos del carril alto por cada uno del normal): el carril normal nunca
+se queda sin servicio. El orden por cuenta se mantiene dentro de cada
+carril, no entre carriles.
+"""
+import aio_pika
+
+# --- Nombres de la topología ---
+# Deben coincidir con transacciones/app/services/messaging.py
+EXCHANGE_FRAUDE = "fraud_transactions"
+PREFIJO_COLA_SHARD = "fraud_detection_queue.shard"
+EXCHANGE_FRAUDE_ALTA = "fraud_transactions.high"
+PREFIJO_COLA_SHARD_ALTA = "fraud_detection_queue.high.shard"
+COLA_DLQ = "fraud_detection_queue.dlq"
+PREFIJO_EXCHANGE_REINTENTO = "fraud_transactions.retry"
+PREFIJO_COLA_REINTENTO = "fraud_detection_queue.retry"
+# Decisiones del worker hacia el servicio de transacciones (modo "queue")
+COLA_RESULTADOS = "fraud_results"
+
+# --- Carriles de prioridad ---
+CARRIL_ALTO = "high"
+CARRIL_NORMAL = "normal"
+CARRILES = (CARRIL_ALTO, CARRIL_NORMAL)
+_EXCHANGE_CARRIL = {CARRIL_ALTO: EXCHANGE_FRAUDE_ALTA, CARRIL_NORMAL: EXCHANGE_FRAUDE}
+_PREFIJO_CARRIL = {CARRIL_ALTO: PREFIJO_COLA_SHARD_ALTA, CARRIL_NORMAL: PREFIJO_COLA_SHARD}
+
+
+def nombre_cola_shard(indice: int, carril: str = CARRIL_NORMAL) -> str:
+    """Nombre de la cola del shard ``indice`` en el carril dado."""
+    return f"{_PREFIJO_CARRIL[carril]}.{indice}"
+
+
+def shard_de_cola(nombre_cola: str) -> int:
+    """Número de shard a partir del nombre de una cola shard (de cualquier carril)."""
+    return int(nombre_cola.rsplit(".", 1)[1])
+
+
+def argumentos_cola_shard() -> dict:
+    """
+    Argumentos de declaración de las colas shard.
+    Deben ser idénticos en el publicador o RabbitMQ rechaza la declaración.
+    """
+    return {
+        "x-single-active-consumer": True,
+        # Los rechazos van a la DLQ en lugar de perderse o volver en bucle
+        "x-dead-letter-exchange": "",
+        "x-dead-letter-routing-key": COLA_DLQ,
+    }
+
+
+def nombre_exchange_reintento(segundos: int) -> str:
+    """Exchange del nivel de reintento de 'segundos' de espera."""
+    return f"{PREFIJO_EXCHANGE_REINTENTO}.{segundos}s"
+
+
+def nombre_cola_reintento(segundos: int) -> str:
+    """Cola de espera del nivel de reintento de 'segundos'."""
+    return f"{PREFIJO_COLA_REINTENTO}.{segundos}s"
+
+
+def parsear_retrasos(valor: str) -> list[int]:
+    """Convierte FRAUD_RETRY_DELAYS_SECONDS ("5,30,120") en la lista de niveles."""
+    retrasos = [int(parte) for parte in valor.split(",") if parte.strip()]
+    if not retrasos or any(r <= 0 for r in retrasos):
+        raise ValueError(f"FRAUD_RETRY_DELAYS_SECONDS inválido: {valor!r}")
+    return retrasos
+
+
+def parsear_shards(valor: str, total: int) -> list[int]:
+    """
+    Convierte ``FRAUD_SHARDS`` ("0,2,5" o "0-3") en la lista de shards
+    reclamados. Vacío significa todos.
+    """
+    if not valor or not valor.strip():
+        return list(range(total))
+
+    shards = set()
+    for parte in valor.split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        if "-" in parte:
+            inicio, fin = parte.split("-", 1)
+            shards.update(range(int(inicio), int(fin) + 1))
+        else:
+            shards.add(int(parte))
+
+    fuera_de_rango = [s for s in shards if s < 0 or s >= total]
+    if fuera_de_rango:
+        raise ValueError(
+            f"Shards fuera de rango {fuera_de_rango} (FRAUD_SHARD_COUNT={total})"
+        )
+    return sorted(shards)
+
+
+async def declarar_topologia(
+    channel: aio_pika.abc.AbstractChannel,
+    total_shards: int,
+    retrasos: list[int] = (),
+) -> dict[str, dict[int, aio_pika.abc.AbstractQueue]]:
+    """
+    Declara los exchanges de hash consistente de cada carril y enlaza sus
+    N colas shard, además de la DLQ, la cola de resultados y las colas de
+    espera de cada nivel de reintento.
+    Es idempotente; el publicador declara las mismas colas shard.
+    Retorna las colas shard por carril, indexadas por número de shard.
+    """
+    await channel.declare_queue(COLA_DLQ, durable=True)
+    await channel.declare_queue(COLA_RESULTADOS, durable=True)
+
+    for segundos in retrasos:
+        exchange_reintento = await channel.declare_exchange(
+            nombre_exchange_reintento(segundos),
+            type=aio_pika.ExchangeType.FANOUT,
+            durable=True,
+        )
+        cola_espera = await channel.declare_queue(
+            nombre_cola_reintento(segundos),
+            durable=True,
+            arguments={
+                "x-message-ttl": segundos * 1000,
+                # Sin routing key propia: conserva la del mensaje, que es
+                # el nombre de la cola shard de origen
+                "x-dead-letter-exchange": "",
+            },
+        )
+        await cola_espera.bind(exchange_reintento)
+
+    colas = {}
+    for carril in CARRILES:
+        exchange = await channel.declare_exchange(
+            _EXCHANGE_CARRIL[carril],
+            type="x-consistent-hash",
+            durable=True,
+        )
+        colas[carril] = {}
+        for indice in range(total_shards):
+            cola = await channel.declare_queue(
+                nombre_cola_shard(indice, carril),
+                durable=True,
+                arguments=argumentos_cola_shard(),
+            )
+            # En x-consistent-hash la routing key del binding es el peso
+            await cola.bind(exchange, routing_key="1")
+            colas[carril][indice] = cola
+
+    return colas
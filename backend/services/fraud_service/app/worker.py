@@ -1,62 +1,598 @@
 import aio_pika
 import asyncio
+import functools
 import json
+import math
+import signal
+import time
 import httpx
+from .autoajuste import AutoAjuste, LimiteConcurrencia
+from .circuito import CERRADO, InterruptorCircuito
+from .codec import ErrorDecodificacion, decodificar
 from .config import settings
-from .logic import aplicar_reglas_fraude
+from .deduplicacion import crear_deduplicador
+from .grafo import GrafoTransferencias
+from .perfiles import PerfilesMonto
+from .estadisticas import estadisticas
+from .logic import ESTADO_APROBADO, ESTADO_RECHAZADO, evaluar_reglas
+from .metrics import CONTENT_TYPE, registro
+from .reintentos import HEADER_REINTENTOS, PoliticaReintentos
+from .topologia import (
+    CARRIL_ALTO, CARRIL_NORMAL, CARRILES, COLA_RESULTADOS,
+    declarar_topologia, nombre_cola_shard, parsear_shards, parsear_retrasos, shard_de_cola
+)
 
-async def procesar_mensaje(message: aio_pika.IncomingMessage):
+# Se inicializan en main() una vez declarada la topología
+politica_reintentos: PoliticaReintentos | None = None
+canal_resultados: aio_pika.abc.AbstractChannel | None = None
+
+# Cliente HTTP compartido: reutiliza conexiones en lugar de abrir una por mensaje
+cliente_http: httpx.AsyncClient | None = None
+
+# Salud del servicio de transacciones (pausa el consumo si está caído)
+interruptor = InterruptorCircuito(settings.FRAUD_BREAKER_FAILURE_THRESHOLD)
+
+# Mensajes procesados a la vez; con autoajuste el límite cambia en caliente.
+# Los cupos se reparten entre carriles por peso (el normal nunca se queda sin turno)
+limite = LimiteConcurrencia(
+    settings.FRAUD_CONCURRENCY_MAX,
+    pesos={CARRIL_ALTO: settings.FRAUD_HIGH_LANE_WEIGHT, CARRIL_NORMAL: 1},
+)
+autoajuste: AutoAjuste | None = None
+
+# IDs con decisión ya registrada (None si FRAUD_DEDUPE_MODE=off)
+deduplicador = crear_deduplicador(
+    settings.FRAUD_DEDUPE_MODE,
+    settings.FRAUD_DEDUPE_MEMORY_BYTES,
+    settings.FRAUD_DEDUPE_FALSE_POSITIVE_RATE,
+    settings.FRAUD_DEDUPE_PARTITIONS,
+    settings.FRAUD_DEDUPE_WINDOW_SECONDS,
+)
+
+# Grafo de transferencias y perfil de montos de las cuentas de los shards
+# de este proceso. Se crean en main(), cuando se conocen los shards
+grafo: GrafoTransferencias | None = None
+perfiles: PerfilesMonto | None = None
+
+
+def cuentas_por_proceso(total: int, shards_propios: int, shards_totales: int) -> int:
+    """
+    Parte de 'total' cuentas que le toca a un proceso con 'shards_propios'
+    de 'shards_totales' shards (las cuentas se reparten por hash entre los
+    shards). Así los K procesos del supervisor reservan en conjunto lo
+    configurado, no K veces.
+    """
+    return max(1, math.ceil(total * shards_propios / max(1, shards_totales)))
+
+
+def preparar_estado_por_cuenta(shards: list):
+    """Crea el grafo y los perfiles del proceso, dimensionados para 'shards'."""
+    global grafo, perfiles
+    if settings.FRAUD_GRAPH_ENABLED:
+        grafo = GrafoTransferencias(
+            cuentas_por_proceso(settings.FRAUD_GRAPH_MAX_ACCOUNTS, len(shards), settings.FRAUD_SHARD_COUNT),
+            contrapartes_recientes=settings.FRAUD_GRAPH_RECENT_COUNTERPARTIES,
+            vida_media_segundos=settings.FRAUD_GRAPH_HALF_LIFE_SECONDS,
+            minimo_remitentes_fan_in=settings.FRAUD_FANIN_MIN_SENDERS,
+            puntaje_z_fan_in=settings.FRAUD_FANIN_ZSCORE,
+        )
+    # El perfil de montos por cuenta de origen se restaura de disco al arrancar
+    if settings.FRAUD_PROFILE_ENABLED:
+        perfiles = PerfilesMonto(
+            cuentas_por_proceso(settings.FRAUD_PROFILE_MAX_ACCOUNTS, len(shards), settings.FRAUD_SHARD_COUNT),
+            min_muestras=settings.FRAUD_PROFILE_MIN_SAMPLES,
+            puntaje_z=settings.FRAUD_AMOUNT_ZSCORE,
+            percentil=settings.FRAUD_AMOUNT_PERCENTILE,
+            monto_minimo=settings.FRAUD_AMOUNT_MIN_FLAG,
+            desviacion_relativa_minima=settings.FRAUD_AMOUNT_MIN_RELATIVE_DEVIATION,
+        )
+
+# --- Métricas (/metrics en FRAUD_METRICS_PORT) ---
+# Las series se crean aquí una vez; el camino caliente solo suma
+LAG_COLA = registro.histograma(
+    "fraud_queue_lag_seconds", "Tiempo desde la publicación hasta que el worker recibe el mensaje", ("lane",),
+)
+PROCESAMIENTO = registro.histograma(
+    "fraud_processing_seconds", "Duración del procesamiento de un mensaje (reglas y registro de la decisión)",
+    ("lane",),
+)
+MENSAJES = registro.contador("fraud_messages_total", "Mensajes procesados por carril y resultado", ("lane", "result"))
+DECISIONES = registro.contador("fraud_decisions_total", "Decisiones de fraude por estado", ("status",))
+# Las reglas corren en microsegundos: buckets propios
+EVALUACION_REGLAS = registro.histograma(
+    "fraud_rule_evaluation_seconds", "Duración de la evaluación de las reglas de fraude",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01),
+)
+LATENCIA_UPSTREAM = registro.histograma(
+    "upstream_request_duration_seconds", "Duración de las llamadas al servicio de transacciones",
+    ("service", "status"),
+)
+PUBLICACION_RESULTADO = registro.histograma(
+    "fraud_result_publish_duration_seconds", "Duración de la publicación de una decisión en la cola de resultados",
+)
+registro.gauge("fraud_messages_in_flight", "Mensajes en proceso", funcion=lambda: estadisticas.en_vuelo)
+registro.gauge("fraud_concurrency_limit", "Límite de mensajes procesados a la vez", funcion=lambda: limite.limite)
+registro.gauge("fraud_prefetch", "Prefetch aplicado a los consumidores (0 con el consumo pausado)",
+               funcion=lambda: estadisticas.prefetch)
+registro.gauge("fraud_circuit_open", "1 si el circuito hacia transacciones no está cerrado",
+               funcion=lambda: interruptor.estado != CERRADO)
+
+_LAG_COLA = {carril: LAG_COLA.labels(carril) for carril in CARRILES}
+_PROCESAMIENTO = {carril: PROCESAMIENTO.labels(carril) for carril in CARRILES}
+_MENSAJES = {(carril, resultado): MENSAJES.labels(carril, resultado)
+             for carril in CARRILES for resultado in ("ok", "error")}
+_DECISIONES = {estado: DECISIONES.labels(estado) for estado in (ESTADO_APROBADO, ESTADO_RECHAZADO)}
+_SERVICIO_TRANSACCIONES = httpx.URL(settings.TRANSACTIONS_SERVICE_URL).host
+
+async def procesar_mensaje(
+    message: aio_pika.IncomingMessage, cola_origen: str, carril: str = CARRIL_NORMAL
+):
     """
     Callback que procesa cada mensaje de la cola.
+    cola_origen: cola shard de la que proviene (destino de los reintentos y
+    shard al que se atribuye el perfil de la cuenta en las instantáneas).
+    carril: carril de prioridad de la cola; decide el turno de procesamiento.
+    """
+    publicado_en = (message.headers or {}).get("x-published-at")
+    estadisticas.en_vuelo += 1
+    estadisticas.registrar_lag(publicado_en)
+    if publicado_en is not None:
+        _LAG_COLA[carril].observe(max(0.0, time.time() - publicado_en))
+    try:
+        async with limite.carril(carril):
+            inicio = time.perf_counter()
+            ok = await _procesar(message, cola_origen)
+            duracion = time.perf_counter() - inicio
+            if ok and autoajuste is not None:
+                autoajuste.registrar(duracion)
+        _PROCESAMIENTO[carril].observe(duracion)
+        if ok:
+            estadisticas.procesados += 1
+            estadisticas.registrar_decision(carril, publicado_en)
+        else:
+            estadisticas.errores += 1
+        _MENSAJES[carril, "ok" if ok else "error"].inc()
+    except Exception:
+        estadisticas.errores += 1
+        _MENSAJES[carril, "error"].inc()
+        raise
+    finally:
+        estadisticas.en_vuelo -= 1
+
+async def _procesar(message: aio_pika.IncomingMessage, cola_origen: str) -> bool:
+    """
+    Aplica las reglas y actualiza el estado de la transacción.
+    Retorna False si el mensaje falló y fue reprogramado o enviado a la DLQ.
     """
     async with message.process():
         try:
-            datos = json.loads(message.body.decode())
+            # Binario o JSON según el content_type del publicador
+            datos = decodificar(message.body, message.content_type)
             # El mensaje publicado tiene "id", no "id_transaccion"
             id_trans = datos.get("id")
             
             if not id_trans:
                 print(f" [!] Mensaje inválido, sin ID: {datos}")
-                return
+                return False
 
             print(f" [o] 📨 Recibido mensaje para transacción {id_trans}")
 
-            # 1. Aplicar reglas de fraude
-            estado_final = aplicar_reglas_fraude(datos)
+            if _ya_decidida(message, id_trans):
+                # Reentrega de una transacción ya decidida: solo se confirma
+                print(f" [=] ♻️  Transacción {id_trans} ya decidida, reentrega omitida")
+                return True
+
+            # 1. Aplicar reglas de fraude. La transferencia entra al grafo y
+            #    al perfil una sola vez, no en cada reentrega; el monto se
+            #    puntúa antes de sumarlo a su propio perfil.
+            origen = str(datos.get("cuenta_origen", ""))
+            monto = float(datos.get("monto", 0.0))
+            primera_entrega = not _es_reentrega(message)
+            if grafo is not None and primera_entrega:
+                grafo.registrar(origen, str(datos.get("cuenta_destino", "")))
+            puntaje = perfiles.puntuar(origen, monto) if perfiles is not None else None
+            if perfiles is not None and primera_entrega:
+                perfiles.registrar(origen, monto, shard_de_cola(cola_origen))
+            inicio = time.perf_counter()
+            estado_final, reglas = evaluar_reglas(datos, grafo, puntaje)
+            EVALUACION_REGLAS.observe(time.perf_counter() - inicio)
             print(f" [>] 🔍 Transacción {id_trans} clasificada como: {estado_final}")
 
-            # 2. Actualizar estado en el servicio de transacciones
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                # Verifica que esta URL coincida con tu endpoint
-                url = f"{settings.TRANSACTIONS_SERVICE_URL}/transactions/{id_trans}/status"
-                payload = {"status": estado_final}
-                
-                print(f" [→] Actualizando transacción en: {url}")
-                response = await client.patch(url, json=payload)
-                
-                if response.status_code != 200:
-                    error_msg = f"Error al actualizar. Status: {response.status_code}, Body: {response.text}"
-                    print(f" [!] ❌ {error_msg}")
-                    raise Exception(error_msg)
-                
-                print(f" [✓] ✅ Transacción {id_trans} actualizada correctamente: {estado_final}")
+            # 2. Registrar la decisión (PATCH HTTP o cola de resultados)
+            await _registrar_decision(id_trans, estado_final, reglas)
+            _DECISIONES[estado_final].inc()
+            if deduplicador is not None:
+                deduplicador.agregar(id_trans)
+            return True
         
-        except json.JSONDecodeError as e:
-            print(f" [!] ❌ Error decodificando JSON: {e}")
+        except ErrorDecodificacion as e:
+            print(f" [!] ❌ Error decodificando mensaje: {e}")
+            # Mensaje corrupto o de una versión desconocida: reintentarlo
+            # no sirve, va directo a la DLQ
+            await politica_reintentos.enviar_a_dlq(message, cola_origen, str(e))
+            return False
         except Exception as e:
             print(f" [!] ❌ Error procesando mensaje: {e}")
-            raise  # Re-lanza para NACK y reintento
+            # Reprograma con espera en lugar de reencolar de inmediato.
+            # Si esto falla, la excepción rechaza el mensaje hacia la DLQ.
+            await politica_reintentos.programar(message, cola_origen, str(e))
+            return False
+
+def _es_reentrega(message: aio_pika.IncomingMessage) -> bool:
+    """Reentrega de RabbitMQ (redelivered) o reintento de la política."""
+    return bool(message.redelivered or int((message.headers or {}).get(HEADER_REINTENTOS, 0)))
+
+def _ya_decidida(message: aio_pika.IncomingMessage, id_trans) -> bool:
+    """
+    Consulta el deduplicador solo para reentregas (redelivered) y
+    reintentos: una primera entrega nunca se omite por un falso positivo.
+    """
+    if deduplicador is None or not _es_reentrega(message):
+        return False
+    estadisticas.dedupe_consultas += 1
+    if deduplicador.contiene(id_trans):
+        estadisticas.dedupe_aciertos += 1
+        return True
+    return False
+
+async def _registrar_decision(id_trans, estado_final: str, reglas: int = 0):
+    """
+    Entrega la decisión al servicio de transacciones según FRAUD_RESULTS_MODE:
+    - "http": PATCH síncrono al endpoint de estado.
+    - "queue": publica en la cola durable de resultados; el servicio de
+      transacciones la drena por lotes. El ack del mensaje original llega
+      después de la confirmación del broker (publisher confirms).
+    """
+    # 'reglas_activadas': máscara de bits de las reglas (logic.BITS_REGLAS)
+    payload = {"status": estado_final, "reglas_activadas": reglas}
+
+    if settings.FRAUD_RESULTS_MODE == "queue":
+        payload["id"] = id_trans
+        inicio = time.perf_counter()
+        await canal_resultados.default_exchange.publish(
+            aio_pika.Message(
+                body=json.dumps(payload).encode(),
+                content_type="application/json",
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            ),
+            routing_key=COLA_RESULTADOS,
+        )
+        # Incluye la confirmación del broker (publisher confirms)
+        PUBLICACION_RESULTADO.observe(time.perf_counter() - inicio)
+        print(f" [✓] ✅ Decisión de {id_trans} publicada en {COLA_RESULTADOS}: {estado_final}")
+        return
+
+    # Verifica que esta URL coincida con tu endpoint
+    url = f"{settings.TRANSACTIONS_SERVICE_URL}/transactions/{id_trans}/status"
+    print(f" [→] Actualizando transacción en: {url}")
+    inicio = time.perf_counter()
+    try:
+        response = await cliente_http.patch(url, json=payload)
+    except httpx.RequestError:
+        LATENCIA_UPSTREAM.labels(_SERVICIO_TRANSACCIONES, "error").observe(time.perf_counter() - inicio)
+        interruptor.registrar_fallo()
+        raise
+    LATENCIA_UPSTREAM.labels(_SERVICIO_TRANSACCIONES, response.status_code).observe(time.perf_counter() - inicio)
+
+    # Solo los 5xx indican que el servicio no está sano
+    if response.status_code >= 500:
+        interruptor.registrar_fallo()
+    else:
+        interruptor.registrar_exito()
+    
+    # 409: ya estaba decidida con otro resultado (una reentrega tras un
+    # reinicio). Vale la primera decisión; el mensaje se confirma igual
+    if response.status_code == 409:
+        print(f" [=] ℹ️  Transacción {id_trans} ya decidida, se conserva su estado: {response.text}")
+        return
+    
+    if response.status_code != 200:
+        error_msg = f"Error al actualizar. Status: {response.status_code}, Body: {response.text}"
+        print(f" [!] ❌ {error_msg}")
+        raise Exception(error_msg)
+    
+    print(f" [✓] ✅ Transacción {id_trans} actualizada correctamente: {estado_final}")
+
+class Consumidor:
+    """
+    Consumidores de los shards reclamados, en todos los carriles, sobre un
+    mismo canal. Permite pausar (cancelar) y reanudar el consumo y ajustar
+    el prefetch.
+    """
+
+    def __init__(self, channel, colas: dict, shards: list):
+        self.channel = channel
+        self.colas = colas
+        self.shards = shards
+        # (cola, consumer_tag, prefetch con el que se creó el consumidor)
+        self.consumidores = []
+        # Prefetch pedido con basic.qos (lo usan los próximos consumidores)
+        self.prefetch = 0
+        # Última vez que se crearon los consumidores (time.monotonic)
+        self.creados_en = 0.0
+
+    @property
+    def activo(self) -> bool:
+        return bool(self.consumidores)
+
+    @property
+    def prefetch_aplicado(self) -> int:
+        """Prefetch que RabbitMQ aplica a los consumidores vivos (0 si no hay)."""
+        return min((prefetch for _, _, prefetch in self.consumidores), default=0)
+
+    async def ajustar_prefetch(self, prefetch: int):
+        """
+        RabbitMQ aplica el prefetch por consumidor (global=False) y solo a
+        los consumidores creados después de basic.qos: si hay consumidores
+        activos, se cancelan y se vuelven a crear con el nuevo valor. Los
+        mensajes ya entregados siguen en el canal y se confirman igual.
+        """
+        activo = self.activo
+        if activo:
+            if prefetch == self.prefetch:
+                return
+            await self.pausar()
+        await self.channel.set_qos(prefetch_count=prefetch)
+        self.prefetch = prefetch
+        if activo:
+            await self._consumir()
+
+    async def reanudar(self, prefetch: int):
+        await self.ajustar_prefetch(prefetch)
+        if not self.activo:
+            await self._consumir()
+
+    async def _consumir(self):
+        for carril in CARRILES:
+            for shard in self.shards:
+                cola = self.colas[carril][shard]
+                callback = functools.partial(procesar_mensaje, cola_origen=cola.name, carril=carril)
+                consumer_tag = await cola.consume(callback)
+                self.consumidores.append((cola, consumer_tag, self.prefetch))
+        self.creados_en = time.monotonic()
+        # Se reporta solo una vez que los consumidores lo usan
+        estadisticas.prefetch = self.prefetch_aplicado
 
-async def main():
+    async def pausar(self):
+        """
+        Cancela los consumidores: RabbitMQ deja de entregar mensajes.
+        (Un prefetch de 0 significa "sin límite" en AMQP, no sirve para pausar.)
+        """
+        for cola, consumer_tag, _ in self.consumidores:
+            await cola.cancel(consumer_tag)
+        self.consumidores = []
+        estadisticas.prefetch = 0
+
+async def _sondear_downstream() -> bool:
+    """Comprueba si el servicio de transacciones responde a /health."""
+    try:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.get(f"{settings.TRANSACTIONS_SERVICE_URL}/health")
+            return response.status_code == 200
+    except httpx.RequestError:
+        return False
+
+def _prefetch_objetivo() -> int:
+    """Prefetch vigente: el del autoajuste o el fijo de la configuración."""
+    return autoajuste.prefetch if autoajuste is not None else settings.FRAUD_PREFETCH_COUNT
+
+async def _controlar_consumo(consumidor: Consumidor):
+    """
+    Pausa el consumo cuando el circuito se abre, sondea el servicio de
+    transacciones y, cuando vuelve, reanuda con prefetch 1 que se duplica
+    en cada paso hasta el prefetch objetivo si no hay nuevos fallos.
+    """
+    while True:
+        await interruptor.esperar_apertura()
+        print(" [⏸] Consumo pausado: servicio de transacciones no disponible")
+        await consumidor.pausar()
+
+        while True:
+            await asyncio.sleep(settings.FRAUD_BREAKER_PROBE_SECONDS)
+            if await _sondear_downstream():
+                break
+
+        print(" [▶] Servicio de transacciones disponible, reanudando de forma gradual")
+        interruptor.semi_abrir()
+        prefetch = 1
+        objetivo = _prefetch_objetivo()
+        await consumidor.reanudar(prefetch)
+        while prefetch < objetivo and not interruptor.abierto:
+            await asyncio.sleep(settings.FRAUD_BREAKER_RAMP_SECONDS)
+            if interruptor.abierto:
+                break
+            prefetch = min(prefetch * 2, objetivo)
+            await consumidor.ajustar_prefetch(prefetch)
+
+        if not interruptor.abierto:
+            interruptor.cerrar()
+            print(f" [✓] Circuito cerrado, prefetch {prefetch}")
+
+def _conviene_recrear(consumidor: Consumidor, prefetch: int) -> bool:
+    """
+    Si vale la pena recrear los consumidores para aplicar 'prefetch': el
+    cambio supera FRAUD_PREFETCH_HYSTERESIS del prefetch aplicado y pasó
+    FRAUD_PREFETCH_MIN_INTERVAL_SECONDS desde la última vez que se crearon.
+    """
+    aplicado = consumidor.prefetch_aplicado
+    if not aplicado or abs(prefetch - aplicado) < settings.FRAUD_PREFETCH_HYSTERESIS * aplicado:
+        return False
+    return time.monotonic() - consumidor.creados_en >= settings.FRAUD_PREFETCH_MIN_INTERVAL_SECONDS
+
+async def _autoajustar(consumidor: Consumidor):
+    """
+    Cada FRAUD_AUTOTUNE_INTERVAL_SECONDS evalúa la ventana medida y aplica
+    la nueva concurrencia (un semáforo local, sin costo). El prefetch
+    recrea los consumidores, así que solo se aplica con cambios grandes y
+    espaciados (_conviene_recrear); mientras tanto la concurrencia acota el
+    trabajo en curso. Con el circuito no cerrado la rampa del breaker manda
+    y la ventana se descarta.
+    """
+    while True:
+        await asyncio.sleep(settings.FRAUD_AUTOTUNE_INTERVAL_SECONDS)
+        esperas = limite.esperas
+        limite.esperas = 0
+        if interruptor.estado != CERRADO:
+            autoajuste.descartar_ventana()
+            continue
+
+        motivo = autoajuste.evaluar(esperas)
+        if motivo is None:
+            continue
+
+        await limite.ajustar(autoajuste.concurrencia)
+        if consumidor.activo and _conviene_recrear(consumidor, autoajuste.prefetch):
+            await consumidor.ajustar_prefetch(autoajuste.prefetch)
+        print(
+            f" [⚙] Autoajuste: concurrencia {autoajuste.concurrencia}, prefetch {autoajuste.prefetch} "
+            f"(aplicado {consumidor.prefetch_aplicado}) ({motivo})"
+        )
+
+async def _guardar_perfiles(shards: list):
+    """Escribe la instantánea de perfiles en un hilo (no bloquea el consumo)."""
+    copia = perfiles.copiar()
+    try:
+        guardadas = await asyncio.get_running_loop().run_in_executor(
+            None, PerfilesMonto.guardar, copia, settings.FRAUD_PROFILE_SNAPSHOT_DIR, shards
+        )
+        print(f" [💾] Perfiles guardados: {guardadas} cuentas en {settings.FRAUD_PROFILE_SNAPSHOT_DIR}")
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar la instantánea de perfiles: {e}")
+
+async def _instantaneas_perfiles(shards: list):
+    while True:
+        await asyncio.sleep(settings.FRAUD_PROFILE_SNAPSHOT_SECONDS)
+        await _guardar_perfiles(shards)
+
+async def _drenar(consumidor: Consumidor, timeout: float):
+    """
+    Cancela los consumidores (RabbitMQ deja de entregar) y espera a que
+    terminen los mensajes en vuelo antes de cerrar la conexión.
+    """
+    await consumidor.pausar()
+
+    limite = asyncio.get_running_loop().time() + timeout
+    while estadisticas.en_vuelo > 0 and asyncio.get_running_loop().time() < limite:
+        await asyncio.sleep(0.1)
+
+    if estadisticas.en_vuelo > 0:
+        print(f"⚠️ Drenado incompleto: {estadisticas.en_vuelo} mensajes en vuelo (serán reentregados)")
+    else:
+        print("✅ Mensajes en vuelo drenados")
+
+async def _reportar(consumidor: Consumidor, cola_reporte, etiqueta: str):
+    """
+    Envía periódicamente una instantánea de las estadísticas al supervisor,
+    incluyendo los mensajes pendientes en los shards reclamados.
+    """
+    while True:
+        await asyncio.sleep(settings.FRAUD_REPORT_INTERVAL_SECONDS)
+        pendientes = 0
+        for carril in CARRILES:
+            for shard in consumidor.shards:
+                cola = await consumidor.channel.declare_queue(nombre_cola_shard(shard, carril), passive=True)
+                pendientes += cola.declaration_result.message_count or 0
+        estadisticas.pendientes_cola = pendientes
+        estadisticas.circuito = interruptor.estado
+        estadisticas.aperturas_circuito = interruptor.aperturas
+        estadisticas.concurrencia = limite.limite
+        if deduplicador is not None:
+            estadisticas.dedupe_memoria_bytes = deduplicador.memoria_bytes
+        if autoajuste is not None:
+            estadisticas.latencia_ms = autoajuste.latencia_ms
+            estadisticas.ajustes = autoajuste.ajustes
+            estadisticas.motivo_ajuste = autoajuste.motivo
+
+        datos = estadisticas.snapshot()
+        datos["etiqueta"] = etiqueta
+        datos["shards"] = consumidor.shards
+        cola_reporte.put_nowait(datos)
+
+async def _atender_metricas(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """
+    HTTP/1.1 mínimo para el scrape de Prometheus: GET /metrics responde
+    las métricas, cualquier otra ruta 404. Una petición por conexión.
+    """
+    try:
+        linea = await asyncio.wait_for(reader.readline(), timeout=5.0)
+        # Las cabeceras no se usan: se leen hasta la línea vacía
+        while (await asyncio.wait_for(reader.readline(), timeout=5.0)).strip():
+            pass
+        partes = linea.decode("latin-1").split()
+        if len(partes) >= 2 and partes[0] == "GET" and partes[1].split("?", 1)[0] == "/metrics":
+            estado, tipo, cuerpo = "200 OK", CONTENT_TYPE, registro.exponer().encode()
+        else:
+            estado, tipo, cuerpo = "404 Not Found", "text/plain; charset=utf-8", b"Not Found\n"
+        writer.write(
+            f"HTTP/1.1 {estado}\r\nContent-Type: {tipo}\r\n"
+            f"Content-Length: {len(cuerpo)}\r\nConnection: close\r\n\r\n".encode() + cuerpo
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def main(
+    shards: list | None = None, cola_reporte=None, etiqueta: str = "worker", puerto_metricas: int | None = None
+):
     """
     Función principal con lógica de reconexión.
+
+    shards: shards a consumir (por defecto los de FRAUD_SHARDS).
+    cola_reporte: multiprocessing.Queue del supervisor para las estadísticas.
+    puerto_metricas: puerto de /metrics (por defecto FRAUD_METRICS_PORT; 0 lo desactiva).
     """
+    global politica_reintentos, autoajuste, canal_resultados, cliente_http
     max_retries = 10
     retry_delay = 5
+
+    if shards is None:
+        shards = parsear_shards(settings.FRAUD_SHARDS, settings.FRAUD_SHARD_COUNT)
+
+    preparar_estado_por_cuenta(shards)
+
+    if settings.FRAUD_AUTOTUNE_ENABLED:
+        autoajuste = AutoAjuste(
+            # Un consumidor por shard y carril
+            shards=len(shards) * len(CARRILES),
+            concurrencia_min=settings.FRAUD_CONCURRENCY_MIN,
+            concurrencia_max=settings.FRAUD_CONCURRENCY_MAX,
+            prefetch_min=settings.FRAUD_PREFETCH_MIN,
+            prefetch_max=settings.FRAUD_PREFETCH_MAX,
+            tolerancia_latencia=settings.FRAUD_AUTOTUNE_LATENCY_TOLERANCE,
+            concurrencia_inicial=settings.FRAUD_PREFETCH_COUNT,
+        )
+        await limite.ajustar(autoajuste.concurrencia)
+
+    if perfiles is not None:
+        try:
+            cargadas = perfiles.cargar(settings.FRAUD_PROFILE_SNAPSHOT_DIR, shards)
+            print(f"💾 Perfiles restaurados: {cargadas} cuentas de los shards {shards}")
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudieron restaurar los perfiles: {e}")
+
+    if settings.FRAUD_RESULTS_MODE not in ("http", "queue"):
+        raise ValueError(f"FRAUD_RESULTS_MODE inválido: {settings.FRAUD_RESULTS_MODE!r}")
+    cliente_http = httpx.AsyncClient(timeout=10.0)
+
+    # /metrics responde también mientras se conecta a RabbitMQ
+    if puerto_metricas is None:
+        puerto_metricas = settings.FRAUD_METRICS_PORT
+    servidor_metricas = None
+    if puerto_metricas:
+        servidor_metricas = await asyncio.start_server(_atender_metricas, settings.FRAUD_METRICS_HOST, puerto_metricas)
+        print(f"📈 [{etiqueta}] Métricas en http://{settings.FRAUD_METRICS_HOST}:{puerto_metricas}/metrics")
+
+    # SIGTERM/SIGINT: dejar de consumir y drenar en lugar de morir a mitad
+    parada = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, parada.set)
     
     for attempt in range(max_retries):
         try:
-            print(f"🔄 Intento {attempt + 1}/{max_retries} - Conectando a RabbitMQ ({settings.RABBITMQ_URL})...")
+            print(f"🔄 [{etiqueta}] Intento {attempt + 1}/{max_retries} - Conectando a RabbitMQ ({settings.RABBITMQ_URL})...")
             
             connection = await aio_pika.connect_robust(
                 settings.RABBITMQ_URL,
@@ -65,28 +601,59 @@ async def main():
             
             async with connection:
                 channel = await connection.channel()
-                await channel.set_qos(prefetch_count=10)
                 
-                queue = await channel.declare_queue(
-                    'fraud_detection_queue', 
-                    durable=True
-                )
+                # Exchange de hash consistente + colas shard, DLQ y reintentos
+                retrasos = parsear_retrasos(settings.FRAUD_RETRY_DELAYS_SECONDS)
+                colas = await declarar_topologia(channel, settings.FRAUD_SHARD_COUNT, retrasos)
+                politica_reintentos = PoliticaReintentos(channel, retrasos, settings.FRAUD_MAX_ATTEMPTS)
+                canal_resultados = channel
                 
                 print("=" * 60)
-                print("✅ WORKER DE FRAUDE INICIADO CORRECTAMENTE")
+                print(f"✅ WORKER DE FRAUDE INICIADO CORRECTAMENTE [{etiqueta}]")
                 print(f"📡 Conectado a: {settings.RABBITMQ_URL}")
-                print(f"📥 Escuchando cola: fraud_detection_queue")
-                print(f"🎯 URL de transacciones: {settings.TRANSACTIONS_SERVICE_URL}")
+                print(f"📥 Shards reclamados: {shards} de {settings.FRAUD_SHARD_COUNT}")
+                print(f"🎯 URL de transacciones: {settings.TRANSACTIONS_SERVICE_URL} (modo {settings.FRAUD_RESULTS_MODE})")
                 print("=" * 60)
                 
-                await queue.consume(procesar_mensaje)
+                consumidor = Consumidor(channel, colas, shards)
+                await consumidor.reanudar(_prefetch_objetivo())
+                control = asyncio.create_task(_controlar_consumo(consumidor))
+                ajuste = None
+                if autoajuste is not None:
+                    ajuste = asyncio.create_task(_autoajustar(consumidor))
+
+                instantaneas = None
+                if perfiles is not None:
+                    instantaneas = asyncio.create_task(_instantaneas_perfiles(shards))
+
+                reporte = None
+                if cola_reporte is not None:
+                    reporte = asyncio.create_task(_reportar(consumidor, cola_reporte, etiqueta))
                 
-                # Mantiene el worker corriendo indefinidamente
-                await asyncio.Future()
+                try:
+                    # Mantiene el worker corriendo hasta recibir la señal de parada
+                    await parada.wait()
+                finally:
+                    control.cancel()
+                    if ajuste is not None:
+                        ajuste.cancel()
+                    if reporte is not None:
+                        reporte.cancel()
+                    if instantaneas is not None:
+                        instantaneas.cancel()
+
+                print(f"🛑 [{etiqueta}] Señal de parada recibida, drenando...")
+                await _drenar(consumidor, settings.FRAUD_DRAIN_TIMEOUT_SECONDS)
+                if perfiles is not None:
+                    await _guardar_perfiles(shards)
+                await cliente_http.aclose()
+                if servidor_metricas is not None:
+                    servidor_metricas.close()
+                return
                 
         except aio_pika.exceptions.AMQPConnectionError as e:
             print(f"❌ Error de conexión a RabbitMQ: {e}")
-            if attempt < max_retries - 1:
+            if attempt < max_retries - 1 and not parada.is_set():
                 print(f"⏳ Reintentando en {retry_delay} segundos...")
                 await asyncio.sleep(retry_delay)
             else:
@@ -94,7 +661,7 @@ async def main():
                 raise
         except Exception as e:
             print(f"❌ Error inesperado: {e}")
-            if attempt < max_retries - 1:
+            if attempt < max_retries - 1 and not parada.is_set():
                 print(f"⏳ Reintentando en {retry_delay} segundos...")
                 await asyncio.sleep(retry_delay)
             else:
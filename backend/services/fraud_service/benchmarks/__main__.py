@@ -0,0 +1,150 @@
+"""
+Suite de microbenchmarks del motor de fraude (casos en benchmarks/suite.py).
+
+Se ejecuta desde fraud_service/:
+
+    python -m benchmarks [-n 20000] [--repeticiones 5] [--filtro regla.]
+    python -m benchmarks --base a1b2c3d --umbral 0.15
+
+Cada corrida se guarda en benchmarks/resultados/<commit>.json (con
+sufijo -dirty si hay cambios sin commitear) y se compara con una base:
+la indicada en --base o, por defecto, la corrida guardada más reciente
+de otro commit. Un caso es regresión si su mejor tiempo por operación
+empeora más que --umbral; en ese caso el código de salida es 1.
+
+Los mensajes de las reglas y del worker (print) se envían a /dev/null:
+su costo de formateo sigue dentro de la medición, el de la terminal no.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from .suite import CASOS, CasoOmitido
+
+RESULTADOS = Path(__file__).parent / "resultados"
+
+
+def _revision() -> str:
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        sucio = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "sin-git"
+    return f"{rev}-dirty" if sucio else rev
+
+
+def medir(preparar, n: int, repeticiones: int) -> dict:
+    funcion = preparar(n)
+    funcion()  # calentamiento: caches, imports perezosos
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {
+        "ns_op": round(min(tiempos) / n * 1e9, 1),
+        "ns_op_mediana": round(statistics.median(tiempos) / n * 1e9, 1),
+    }
+
+
+def _cargar_base(revision_actual: str, base: str | None) -> dict | None:
+    if base:
+        ruta = RESULTADOS / f"{base}.json"
+        if not ruta.exists():
+            raise SystemExit(f"No hay resultados guardados para {base} en {RESULTADOS}")
+        return json.loads(ruta.read_text())
+    anteriores = sorted(
+        (r for r in RESULTADOS.glob("*.json") if r.stem != revision_actual),
+        key=lambda r: r.stat().st_mtime,
+    )
+    return json.loads(anteriores[-1].read_text()) if anteriores else None
+
+
+def comparar(actual: dict, base: dict, umbral: float) -> list[str]:
+    """Imprime la comparación caso por caso; retorna los casos con regresión."""
+    regresiones = []
+    print(f"\n📊 Comparación con {base['revision']} ({base['fecha']}), umbral {umbral:.0%}")
+    for nombre, medida in actual["casos"].items():
+        anterior = base["casos"].get(nombre)
+        if anterior is None:
+            print(f"   {nombre:<28} {medida['ns_op']:>10.1f} ns/op  (nuevo)")
+            continue
+        cambio = medida["ns_op"] / anterior["ns_op"] - 1
+        marca = "  "
+        if cambio > umbral:
+            marca = "❌"
+            regresiones.append(nombre)
+        elif cambio < -umbral:
+            marca = "🚀"
+        print(f" {marca} {nombre:<28} {anterior['ns_op']:>10.1f} -> {medida['ns_op']:>10.1f} ns/op  ({cambio:+.1%})")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=20_000, help="Operaciones por repetición")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--filtro", default="", help="Solo casos cuyo nombre contiene este texto")
+    parser.add_argument("--base", help="Commit de referencia (archivo en benchmarks/resultados)")
+    parser.add_argument("--umbral", type=float, default=0.10, help="Empeoramiento tolerado (0.10 = 10%%)")
+    parser.add_argument("--no-guardar", action="store_true", help="No guarda la corrida")
+    parser.add_argument("--listar", action="store_true", help="Lista los casos y termina")
+    args = parser.parse_args()
+
+    if args.listar:
+        print("\n".join(CASOS))
+        return
+
+    revision = _revision()
+    resultado = {
+        "revision": revision,
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "n": args.n,
+        "repeticiones": args.repeticiones,
+        "casos": {},
+    }
+
+    print(f"⏱️  Benchmarks del motor de fraude @ {revision} (n={args.n}, {args.repeticiones} repeticiones)")
+    with open(os.devnull, "w") as nulo:
+        for nombre, preparar in CASOS.items():
+            if args.filtro not in nombre:
+                continue
+            try:
+                with contextlib.redirect_stdout(nulo):
+                    medida = medir(preparar, args.n, args.repeticiones)
+            except CasoOmitido as e:
+                print(f"   {nombre:<28} omitido: {e}")
+                continue
+            resultado["casos"][nombre] = medida
+            print(f"   {nombre:<28} {medida['ns_op']:>10.1f} ns/op  (mediana {medida['ns_op_mediana']:.1f})")
+
+    base = _cargar_base(revision, args.base)
+    regresiones = comparar(resultado, base, args.umbral) if base else []
+    if base is None:
+        print("\nℹ️  Sin corridas anteriores para comparar")
+
+    if not args.no_guardar:
+        RESULTADOS.mkdir(parents=True, exist_ok=True)
+        ruta = RESULTADOS / f"{revision}.json"
+        ruta.write_text(json.dumps(resultado, indent=2, ensure_ascii=False) + "\n")
+        print(f"\n💾 Guardado en {ruta}")
+
+    if regresiones:
+        print(f"\n❌ Regresiones por encima del {args.umbral:.0%}: {', '.join(regresiones)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark de la codificación de los mensajes de fraude: JSON vs binario.
+
+Mide sobre transacciones sintéticas realistas:
+- codificación en el publicador (json.dumps(default=str) vs struct),
+- decodificación en el worker más la regla de hora nocturna, que en JSON
+  exige datetime.fromisoformat y en binario es aritmética sobre el epoch,
+- tamaño de los mensajes en bytes.
+
+Se ejecuta desde fraud_service/ (solo usa la librería estándar):
+
+    python -m benchmarks.bench_codec [-n 100000] [--repeticiones 5]
+
+Cada corrida se añade a benchmarks/resultados/codec.jsonl.
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from app.codec import CONTENT_TYPE_BINARIO, CONTENT_TYPE_JSON, codificar, decodificar
+from app.logic import regla_hora_nocturna_riesgosa, regla_hora_nocturna_riesgosa_ts
+
+from .datos import generar_transacciones
+
+RESULTADOS = Path(__file__).parent / "resultados" / "codec.jsonl"
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    """Mejor tiempo (s) de varias repeticiones: descarta ruido del sistema."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def _consumir_json(cuerpos: list[bytes]):
+    for cuerpo in cuerpos:
+        datos = decodificar(cuerpo, CONTENT_TYPE_JSON)
+        regla_hora_nocturna_riesgosa(datos["hora"])
+
+
+def _consumir_binario(cuerpos: list[bytes]):
+    for cuerpo in cuerpos:
+        datos = decodificar(cuerpo, CONTENT_TYPE_BINARIO)
+        regla_hora_nocturna_riesgosa_ts(datos["hora_ts"])
+
+
+def ejecutar(n: int, repeticiones: int) -> dict:
+    transacciones = generar_transacciones(n)
+    resultado = {"n": n}
+
+    for formato in ("json", "binary"):
+        cuerpos = [codificar(t, formato)[0] for t in transacciones]
+        codificacion = _medir(lambda: [codificar(t, formato) for t in transacciones], repeticiones)
+        consumo = _medir(
+            lambda: (_consumir_json if formato == "json" else _consumir_binario)(cuerpos),
+            repeticiones,
+        )
+        tamanos = [len(c) for c in cuerpos]
+        resultado[formato] = {
+            "codificar_us": round(codificacion / n * 1e6, 3),
+            "decodificar_y_regla_us": round(consumo / n * 1e6, 3),
+            "bytes_promedio": round(statistics.fmean(tamanos), 1),
+            "bytes_max": max(tamanos),
+        }
+
+    # Ambos formatos deben dar la misma decisión de la regla de hora
+    for t in transacciones[:10_000]:
+        cuerpo_json, _ = codificar(t, "json")
+        cuerpo_bin, _ = codificar(t, "binary")
+        assert regla_hora_nocturna_riesgosa(decodificar(cuerpo_json, CONTENT_TYPE_JSON)["hora"]) == \
+            regla_hora_nocturna_riesgosa_ts(decodificar(cuerpo_bin, CONTENT_TYPE_BINARIO)["hora_ts"])
+
+    j, b = resultado["json"], resultado["binary"]
+    resultado["aceleracion_codificar"] = round(j["codificar_us"] / b["codificar_us"], 2)
+    resultado["aceleracion_consumir"] = round(j["decodificar_y_regla_us"] / b["decodificar_y_regla_us"], 2)
+    resultado["reduccion_bytes"] = round(1 - b["bytes_promedio"] / j["bytes_promedio"], 3)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=100_000, help="Mensajes por corrida")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    resultado = ejecutar(args.n, args.repeticiones)
+    resultado["fecha"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+    RESULTADOS.parent.mkdir(parents=True, exist_ok=True)
+    with RESULTADOS.open("a") as f:
+        f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
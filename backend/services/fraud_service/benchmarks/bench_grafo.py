@@ -0,0 +1,133 @@
+"""
+Benchmark del grafo de transferencias sobre un flujo sintético.
+
+Genera un flujo de transferencias entre --cuentas cuentas (1M por
+defecto) en el que una pequeña fracción va a cuentas "mula" que reciben
+de muchos remitentes. Mide:
+
+- throughput de actualización (transferencias/s) de GrafoTransferencias,
+- memoria del grafo lleno (tracemalloc, incluye los nombres de cuenta),
+- consultas O(1) de grado y contrapartes recientes,
+- detección de las mulas y marcas falsas de la regla de fan-in.
+
+Se ejecuta desde fraud_service/ (solo usa la librería estándar):
+
+    python -m benchmarks.bench_grafo [--cuentas 1000000] [-n 3000000]
+
+Cada corrida se añade a benchmarks/resultados/grafo.jsonl.
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.grafo import GrafoTransferencias
+
+RESULTADOS = Path(__file__).parent / "resultados" / "grafo.jsonl"
+
+
+def flujo(n: int, cuentas: int, mulas: int, fraccion_mula: float, semilla: int = 7):
+    """Pares (origen, destino) como índices de cuenta; las mulas son las últimas."""
+    rnd = random.Random(semilla)
+    normales = cuentas - mulas
+    for _ in range(n):
+        origen = rnd.randrange(normales)
+        if rnd.random() < fraccion_mula:
+            destino = normales + rnd.randrange(mulas)
+        else:
+            destino = rnd.randrange(normales)
+        yield origen, destino
+
+
+def nombre(indice: int) -> str:
+    return f"ACC-{indice:08d}"
+
+
+def _nuevo_grafo(args) -> GrafoTransferencias:
+    return GrafoTransferencias(args.max_cuentas or args.cuentas, contrapartes_recientes=args.k)
+
+
+def medir_throughput(args) -> dict:
+    nombres = [nombre(i) for i in range(args.cuentas)]
+    pares = list(flujo(args.n, args.cuentas, args.mulas, args.fraccion_mula))
+    grafo = _nuevo_grafo(args)
+
+    # Tiempo sintético: un segundo de flujo cada 'tps' transferencias
+    paso = 1.0 / args.tps
+    ahora = 0.0
+    inicio = time.perf_counter()
+    for origen, destino in pares:
+        ahora += paso
+        grafo.registrar(nombres[origen], nombres[destino], ahora)
+    duracion = time.perf_counter() - inicio
+
+    # Consultas sobre cuentas al azar y detección de mulas
+    rnd = random.Random(1)
+    muestra = [nombres[rnd.randrange(args.cuentas - args.mulas)] for _ in range(100_000)]
+    inicio = time.perf_counter()
+    for cuenta in muestra:
+        grafo.grado_entrada(cuenta, ahora)
+        grafo.remitentes_recientes(cuenta)
+    consulta_us = (time.perf_counter() - inicio) / len(muestra) * 1e6
+
+    mulas = [nombres[args.cuentas - args.mulas + i] for i in range(args.mulas)]
+    detectadas = sum(grafo.fan_in_anormal(c, ahora) for c in mulas)
+    falsas = sum(grafo.fan_in_anormal(c, ahora) for c in muestra)
+
+    return {
+        "actualizaciones_por_s": round(args.n / duracion),
+        "actualizacion_us": round(duracion / args.n * 1e6, 3),
+        "consulta_grado_y_recientes_us": round(consulta_us, 3),
+        "cuentas_en_grafo": grafo.cuentas,
+        "reciclados": grafo.reciclados,
+        "mulas_detectadas": f"{detectadas}/{args.mulas}",
+        "marcas_falsas": f"{falsas}/{len(muestra)}",
+    }
+
+
+def medir_memoria(args) -> dict:
+    tracemalloc.start()
+    grafo = _nuevo_grafo(args)
+    base, _ = tracemalloc.get_traced_memory()
+    ahora = 0.0
+    for origen, destino in flujo(args.n, args.cuentas, args.mulas, args.fraccion_mula):
+        ahora += 1.0 / args.tps
+        # Nombres nuevos en cada mensaje, como al decodificarlos en el worker
+        grafo.registrar(nombre(origen), nombre(destino), ahora)
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "memoria_arreglos_mb": round(base / 2**20, 1),
+        "memoria_total_mb": round(actual / 2**20, 1),
+        "bytes_por_cuenta": round(actual / max(1, grafo.cuentas)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cuentas", type=int, default=1_000_000)
+    parser.add_argument("-n", type=int, default=3_000_000, help="Transferencias del flujo")
+    parser.add_argument("--max-cuentas", type=int, default=0, help="Capacidad del grafo (0 = --cuentas)")
+    parser.add_argument("-k", type=int, default=8, help="Contrapartes recientes por cuenta")
+    parser.add_argument("--mulas", type=int, default=50)
+    parser.add_argument("--fraccion-mula", type=float, default=0.002)
+    parser.add_argument("--tps", type=float, default=500.0, help="Transferencias por segundo simuladas")
+    parser.add_argument("--sin-memoria", action="store_true", help="Omite la medición con tracemalloc (lenta)")
+    args = parser.parse_args()
+
+    resultado = {"cuentas": args.cuentas, "n": args.n, "k": args.k, "max_cuentas": args.max_cuentas or args.cuentas}
+    resultado.update(medir_throughput(args))
+    if not args.sin_memoria:
+        resultado.update(medir_memoria(args))
+    resultado["fecha"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+    RESULTADOS.parent.mkdir(parents=True, exist_ok=True)
+    with RESULTADOS.open("a") as f:
+        f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
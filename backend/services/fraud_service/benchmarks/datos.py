@@ -0,0 +1,30 @@
+"""
+Generador de transacciones sintéticas con la forma de los mensajes reales
+(TransactionInDBBase): cuentas con formato de la app, montos con cola
+larga, ubicaciones con algunas de riesgo y horas repartidas en el día.
+"""
+import random
+from datetime import datetime, timedelta
+
+UBICACIONES = [
+    "La Paz", "Santa Cruz", "Cochabamba", "Sucre", "Tarija", "Oruro",
+    "Potosí", "Buenos Aires", "São Paulo", "Panamá", "Suiza", "Islas Caimán",
+]
+
+
+def generar_transacciones(n: int, cuentas: int = 100_000, semilla: int = 42) -> list[dict]:
+    rnd = random.Random(semilla)
+    base = datetime(2025, 1, 1)
+    return [
+        {
+            "cuenta_origen": f"ACC-{rnd.randrange(cuentas):08d}",
+            "cuenta_destino": f"ACC-{rnd.randrange(cuentas):08d}",
+            # La mayoría son montos chicos, con algunos muy altos
+            "monto": round(min(rnd.lognormvariate(5, 1.5), 50_000), 2),
+            "ubicacion": rnd.choice(UBICACIONES),
+            "id": 1_000_000 + i,
+            "hora": base + timedelta(seconds=rnd.randrange(365 * 86400), microseconds=rnd.randrange(1_000_000)),
+            "status": "PENDING",
+        }
+        for i in range(n)
+    ]
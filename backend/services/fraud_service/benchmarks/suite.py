@@ -0,0 +1,211 @@
+"""
+Casos de la suite de microbenchmarks del motor de fraude.
+
+Cada caso se registra con @caso(nombre): recibe n y devuelve una función
+sin argumentos que ejecuta n operaciones. La preparación (generar
+transacciones, codificar, llenar el grafo) queda fuera de la medición.
+
+Grupos:
+- regla.*    costo de cada regla por separado;
+- motor.*    aplicar_reglas_fraude / evaluar_reglas completos;
+- decodificar.*  JSON vs binario (app.codec);
+- mensaje.*  procesar_mensaje de punta a punta con el broker y el HTTP
+             reemplazados por dobles dentro del benchmark.
+"""
+import asyncio
+import contextlib
+import time
+from typing import Callable
+
+from app.codec import CONTENT_TYPE_BINARIO, CONTENT_TYPE_JSON, codificar, decodificar
+from app.grafo import GrafoTransferencias
+from app.logic import (
+    aplicar_reglas_fraude, evaluar_reglas, regla_fan_in_anormal, regla_hora_nocturna_riesgosa,
+    regla_hora_nocturna_riesgosa_ts, regla_monto_alto, regla_ubicacion_riesgosa,
+)
+from app.perfiles import PerfilesMonto
+
+from .datos import generar_transacciones
+
+CASOS: dict[str, Callable[[int], Callable[[], None]]] = {}
+
+
+def caso(nombre: str):
+    def registrar(funcion):
+        CASOS[nombre] = funcion
+        return funcion
+    return registrar
+
+
+class CasoOmitido(Exception):
+    """El caso no puede correr en este entorno (p. ej. falta aio_pika)."""
+
+
+def _decodificadas(n: int, formato: str) -> list[dict]:
+    """Transacciones tal como las ve el worker tras decodificar el mensaje."""
+    return [decodificar(*codificar(t, formato)) for t in generar_transacciones(n)]
+
+
+def _grafo_lleno(transacciones: list[dict]) -> GrafoTransferencias:
+    grafo = GrafoTransferencias(max(1024, 2 * len(transacciones)))
+    ahora = time.time()
+    for t in transacciones:
+        grafo.registrar(t["cuenta_origen"], t["cuenta_destino"], ahora)
+    return grafo
+
+
+def _perfiles_maduros(transacciones: list[dict]) -> PerfilesMonto:
+    # Pocas cuentas con muchas muestras: todos los perfiles quedan maduros
+    perfiles = PerfilesMonto(1024, min_muestras=5)
+    for i, t in enumerate(transacciones):
+        perfiles.registrar(f"ACC-{i % 500:08d}", t["monto"])
+    return perfiles
+
+
+# --- Reglas ---
+
+@caso("regla.monto_alto")
+def _(n):
+    montos = [t["monto"] for t in generar_transacciones(n)]
+    return lambda: [regla_monto_alto(m) for m in montos]
+
+
+@caso("regla.monto_alto_perfil")
+def _(n):
+    transacciones = generar_transacciones(n)
+    perfiles = _perfiles_maduros(transacciones)
+    pares = [(f"ACC-{i % 500:08d}", t["monto"]) for i, t in enumerate(transacciones)]
+    return lambda: [regla_monto_alto(m, perfiles.puntuar(c, m)) for c, m in pares]
+
+
+@caso("regla.ubicacion_riesgosa")
+def _(n):
+    ubicaciones = [t["ubicacion"] for t in generar_transacciones(n)]
+    return lambda: [regla_ubicacion_riesgosa(u) for u in ubicaciones]
+
+
+@caso("regla.hora_nocturna_texto")
+def _(n):
+    horas = [t["hora"] for t in _decodificadas(n, "json")]
+    return lambda: [regla_hora_nocturna_riesgosa(h) for h in horas]
+
+
+@caso("regla.hora_nocturna_epoch")
+def _(n):
+    horas = [t["hora_ts"] for t in _decodificadas(n, "binary")]
+    return lambda: [regla_hora_nocturna_riesgosa_ts(h) for h in horas]
+
+
+@caso("regla.fan_in_anormal")
+def _(n):
+    transacciones = generar_transacciones(n)
+    grafo = _grafo_lleno(transacciones)
+    destinos = [t["cuenta_destino"] for t in transacciones]
+    return lambda: [regla_fan_in_anormal(grafo, d) for d in destinos]
+
+
+# --- Motor completo ---
+
+@caso("motor.json_reglas_fijas")
+def _(n):
+    datos = _decodificadas(n, "json")
+    return lambda: [aplicar_reglas_fraude(d) for d in datos]
+
+
+@caso("motor.binario_grafo_perfil")
+def _(n):
+    datos = _decodificadas(n, "binary")
+    grafo = _grafo_lleno(datos)
+    perfiles = _perfiles_maduros(datos)
+    entradas = [(d, perfiles.puntuar(f"ACC-{i % 500:08d}", d["monto"])) for i, d in enumerate(datos)]
+    return lambda: [evaluar_reglas(d, grafo, p) for d, p in entradas]
+
+
+# --- Decodificación ---
+
+@caso("decodificar.json")
+def _(n):
+    cuerpos = [codificar(t, "json")[0] for t in generar_transacciones(n)]
+    return lambda: [decodificar(c, CONTENT_TYPE_JSON) for c in cuerpos]
+
+
+@caso("decodificar.binario")
+def _(n):
+    cuerpos = [codificar(t, "binary")[0] for t in generar_transacciones(n)]
+    return lambda: [decodificar(c, CONTENT_TYPE_BINARIO) for c in cuerpos]
+
+
+# --- Mensaje de punta a punta ---
+
+class _MensajeFalso:
+    """Lo que procesar_mensaje usa de aio_pika.IncomingMessage."""
+
+    __slots__ = ("body", "content_type", "headers", "redelivered")
+
+    def __init__(self, body: bytes, content_type: str):
+        self.body = body
+        self.content_type = content_type
+        self.headers = {"x-published-at": time.time()}
+        self.redelivered = False
+
+    @contextlib.asynccontextmanager
+    async def process(self):
+        yield
+
+
+class _RespuestaFalsa:
+    status_code = 200
+    text = ""
+
+
+class _ClienteHttpFalso:
+    async def patch(self, url, json=None):
+        return _RespuestaFalsa()
+
+
+class _ExchangeFalso:
+    async def publish(self, mensaje, routing_key):
+        return None
+
+
+class _CanalFalso:
+    default_exchange = _ExchangeFalso()
+
+
+def _caso_mensaje(n: int, modo: str):
+    try:
+        from app import worker
+    except ImportError as e:
+        raise CasoOmitido(f"no se pudo importar app.worker ({e})")
+
+    mensajes = [codificar(t, "binary") for t in generar_transacciones(n)]
+    # Como un worker con todos los shards (main() crea el estado por cuenta)
+    worker.preparar_estado_por_cuenta(list(range(worker.settings.FRAUD_SHARD_COUNT)))
+
+    async def procesar_todos():
+        for cuerpo, content_type in mensajes:
+            await worker.procesar_mensaje(_MensajeFalso(cuerpo, content_type), "fraud_detection_queue.shard.0")
+
+    def ejecutar():
+        # Dobles del broker y del servicio de transacciones; se restauran
+        # al terminar para no afectar a otros casos
+        anteriores = (worker.cliente_http, worker.canal_resultados, worker.settings.FRAUD_RESULTS_MODE)
+        worker.cliente_http = _ClienteHttpFalso()
+        worker.canal_resultados = _CanalFalso()
+        worker.settings.FRAUD_RESULTS_MODE = modo
+        try:
+            asyncio.run(procesar_todos())
+        finally:
+            worker.cliente_http, worker.canal_resultados, worker.settings.FRAUD_RESULTS_MODE = anteriores
+
+    return ejecutar
+
+
+@caso("mensaje.http")
+def _(n):
+    return _caso_mensaje(n, "http")
+
+
+@caso("mensaje.cola")
+def _(n):
+    return _caso_mensaje(n, "queue")
@@ -0,0 +1,7 @@
+import os
+import sys
+from pathlib import Path
+
+# Los tests importan el paquete 'app' desde fraud_service/, sin .env
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("TRANSACTIONS_SERVICE_URL", "http://transactions_service:8001")
@@ -0,0 +1,38 @@
+"""Reparto del CSV por bloques en el backtest (app/backtest.py)."""
+import pytest
+
+from app.backtest import ConjuntoReglas, _tareas_csv
+
+
+@pytest.fixture
+def historial(tmp_path):
+    ruta = tmp_path / "historial.csv"
+    filas = ["monto,ubicacion,hora,status"]
+    for i in range(100):
+        # Largos distintos para que los cortes caigan en cualquier posición
+        filas.append(f"{i * 137 % 9000}.5,Ciudad {'x' * (i % 7)},2025-01-01 {i % 24:02d}:00:00,APPROVED")
+    ruta.write_text("\n".join(filas) + "\n", encoding="utf-8")
+    return str(ruta)
+
+
+def _filas(ruta: str, bloque_bytes: int) -> tuple[int, int]:
+    reglas = ConjuntoReglas()
+    total = invalidas = 0
+    for funcion, argumentos in _tareas_csv(ruta, ",", bloque_bytes, reglas, reglas, 16):
+        conteo, malas = funcion(*argumentos)
+        total += sum(conteo.values())
+        invalidas += malas
+    return total, invalidas
+
+
+@pytest.mark.parametrize("bloque_bytes", [1, 7, 41, 52, 123, 1000, 1 << 20])
+def test_cada_fila_se_cuenta_una_vez_sin_importar_el_bloque(historial, bloque_bytes):
+    assert _filas(historial, bloque_bytes) == (100, 0)
+
+
+def test_ultima_linea_sin_salto_final(tmp_path):
+    ruta = tmp_path / "historial.csv"
+    ruta.write_text("monto,ubicacion,hora\n10,Bolivia,2025-01-01 10:00:00\n20,Chile,2025-01-01 11:00:00",
+                    encoding="utf-8")
+    for bloque_bytes in (1, 5, 30, 100):
+        assert _filas(str(ruta), bloque_bytes) == (2, 0)
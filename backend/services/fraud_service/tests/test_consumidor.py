@@ -0,0 +1,185 @@
+"""
+Prefetch efectivo de los consumidores. Los dobles imitan a RabbitMQ:
+con global=False, basic.qos solo aplica a los consumidores creados
+después, así que cada consumidor recuerda el prefetch del canal en el
+momento de basic.consume.
+"""
+import asyncio
+import itertools
+
+from app import worker
+from app.autoajuste import LimiteConcurrencia
+from app.circuito import CERRADO, InterruptorCircuito
+from app.estadisticas import estadisticas
+from app.topologia import CARRILES
+
+SHARDS = [0, 1]
+_tags = itertools.count()
+
+
+class CanalFalso:
+    def __init__(self):
+        self.prefetch = 0
+
+    async def set_qos(self, prefetch_count: int):
+        self.prefetch = prefetch_count
+
+
+class ColaFalsa:
+    def __init__(self, canal: CanalFalso, name: str):
+        self.canal = canal
+        self.name = name
+        # consumer_tag -> prefetch con el que RabbitMQ creó el consumidor
+        self.consumidores: dict[str, int] = {}
+
+    async def consume(self, callback) -> str:
+        tag = f"ctag-{next(_tags)}"
+        self.consumidores[tag] = self.canal.prefetch
+        return tag
+
+    async def cancel(self, consumer_tag: str):
+        del self.consumidores[consumer_tag]
+
+
+def _consumidor() -> tuple[worker.Consumidor, list[ColaFalsa]]:
+    canal = CanalFalso()
+    colas = {carril: {shard: ColaFalsa(canal, f"{carril}.{shard}") for shard in SHARDS} for carril in CARRILES}
+    todas = [cola for por_shard in colas.values() for cola in por_shard.values()]
+    return worker.Consumidor(canal, colas, SHARDS), todas
+
+
+def _prefetch_efectivo(colas: list[ColaFalsa]) -> list[int]:
+    return [prefetch for cola in colas for prefetch in cola.consumidores.values()]
+
+
+def test_ajustar_prefetch_recrea_los_consumidores_activos():
+    async def escenario():
+        consumidor, colas = _consumidor()
+        await consumidor.reanudar(1)
+        await consumidor.ajustar_prefetch(16)
+        return consumidor, colas
+
+    consumidor, colas = asyncio.run(escenario())
+    assert _prefetch_efectivo(colas) == [16] * len(colas)
+    assert len(consumidor.consumidores) == len(colas)
+
+
+def test_rampa_del_breaker_aplica_el_prefetch_a_los_consumidores(monkeypatch):
+    monkeypatch.setattr(worker.settings, "FRAUD_BREAKER_PROBE_SECONDS", 0)
+    monkeypatch.setattr(worker.settings, "FRAUD_BREAKER_RAMP_SECONDS", 0)
+    monkeypatch.setattr(worker.settings, "FRAUD_PREFETCH_COUNT", 8)
+    monkeypatch.setattr(worker, "autoajuste", None)
+    monkeypatch.setattr(worker, "interruptor", InterruptorCircuito(1))
+
+    async def sano() -> bool:
+        return True
+
+    monkeypatch.setattr(worker, "_sondear_downstream", sano)
+
+    async def escenario():
+        consumidor, colas = _consumidor()
+        await consumidor.reanudar(8)
+        worker.interruptor.registrar_fallo()
+        control = asyncio.create_task(worker._controlar_consumo(consumidor))
+        try:
+            # La rampa cierra el circuito después de su último paso
+            async with asyncio.timeout(5):
+                while worker.interruptor.estado != CERRADO:
+                    await asyncio.sleep(0)
+        finally:
+            control.cancel()
+        return consumidor, colas
+
+    consumidor, colas = asyncio.run(escenario())
+    assert consumidor.prefetch == 8
+    assert _prefetch_efectivo(colas) == [8] * len(colas)
+
+
+class AutoAjusteFijo:
+    """Propone una sola vez concurrencia 4 y el prefetch dado."""
+
+    def __init__(self, prefetch: int = 12):
+        self.concurrencia = 4
+        self.prefetch = prefetch
+        self.evaluado = False
+
+    def evaluar(self, esperas: int):
+        if self.evaluado:
+            return None
+        self.evaluado = True
+        return "prueba"
+
+    def descartar_ventana(self):
+        pass
+
+
+def test_autoajuste_aplica_y_reporta_el_prefetch_de_los_consumidores(monkeypatch):
+    monkeypatch.setattr(worker.settings, "FRAUD_AUTOTUNE_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(worker.settings, "FRAUD_PREFETCH_MIN_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(worker, "autoajuste", AutoAjusteFijo())
+    monkeypatch.setattr(worker, "limite", LimiteConcurrencia(8))
+    monkeypatch.setattr(worker, "interruptor", InterruptorCircuito(1))
+
+    async def escenario():
+        consumidor, colas = _consumidor()
+        await consumidor.reanudar(2)
+        assert estadisticas.prefetch == 2
+        ajuste = asyncio.create_task(worker._autoajustar(consumidor))
+        try:
+            async with asyncio.timeout(5):
+                while consumidor.prefetch_aplicado != 12:
+                    await asyncio.sleep(0)
+        finally:
+            ajuste.cancel()
+        efectivo, reportado = _prefetch_efectivo(colas), estadisticas.prefetch
+        await consumidor.pausar()
+        return colas, efectivo, reportado
+
+    colas, efectivo, reportado = asyncio.run(escenario())
+    assert efectivo == [12] * len(colas)
+    assert reportado == 12
+    assert worker.limite.limite == 4
+    # Con el consumo pausado no hay prefetch aplicado
+    assert estadisticas.prefetch == 0
+
+
+def _autoajustar_una_vez(monkeypatch, prefetch_inicial: int, prefetch_propuesto: int, intervalo: float):
+    """Corre un paso de _autoajustar y retorna los consumidores y el prefetch efectivo."""
+    monkeypatch.setattr(worker.settings, "FRAUD_AUTOTUNE_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(worker.settings, "FRAUD_PREFETCH_HYSTERESIS", 0.5)
+    monkeypatch.setattr(worker.settings, "FRAUD_PREFETCH_MIN_INTERVAL_SECONDS", intervalo)
+    autoajuste = AutoAjusteFijo(prefetch_propuesto)
+    monkeypatch.setattr(worker, "autoajuste", autoajuste)
+    monkeypatch.setattr(worker, "limite", LimiteConcurrencia(8))
+    monkeypatch.setattr(worker, "interruptor", InterruptorCircuito(1))
+
+    async def escenario():
+        consumidor, colas = _consumidor()
+        await consumidor.reanudar(prefetch_inicial)
+        tags = [tag for _, tag, _ in consumidor.consumidores]
+        ajuste = asyncio.create_task(worker._autoajustar(consumidor))
+        try:
+            async with asyncio.timeout(5):
+                while not autoajuste.evaluado or worker.limite.limite != 4:
+                    await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        finally:
+            ajuste.cancel()
+        return tags, [tag for _, tag, _ in consumidor.consumidores], _prefetch_efectivo(colas)
+
+    return asyncio.run(escenario())
+
+
+def test_autoajuste_no_recrea_consumidores_por_cambios_chicos(monkeypatch):
+    antes, despues, efectivo = _autoajustar_una_vez(monkeypatch, 12, 16, intervalo=0)
+    assert despues == antes
+    assert efectivo == [12] * len(efectivo)
+    # La concurrencia sí cambia: es un semáforo local
+    assert worker.limite.limite == 4
+
+
+def test_autoajuste_espacia_las_recreaciones(monkeypatch):
+    antes, despues, efectivo = _autoajustar_una_vez(monkeypatch, 2, 12, intervalo=60)
+    assert despues == antes
+    assert efectivo == [2] * len(efectivo)
+    assert worker.limite.limite == 4
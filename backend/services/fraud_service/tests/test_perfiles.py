@@ -0,0 +1,53 @@
+"""Puntaje de montos frente al perfil de la cuenta (app/perfiles.py)."""
+import math
+import random
+
+from app.perfiles import PerfilesMonto
+
+
+def _perfil(montos) -> PerfilesMonto:
+    perfiles = PerfilesMonto(16)
+    for monto in montos:
+        perfiles.registrar("ACC-1", monto)
+    return perfiles
+
+
+def test_monto_apenas_mayor_que_el_historial_no_es_atipico():
+    perfiles = _perfil(600 + 400 * i / 199 for i in range(200))
+    puntaje = perfiles.puntuar("ACC-1", 1030)
+    # Queda sobre todo lo visto (percentil 1.0) pero a ~2 desviaciones
+    assert puntaje.percentil == 1.0
+    assert not puntaje.atipico
+
+
+def test_cuenta_de_montos_grandes_y_estables_no_marca_variaciones_chicas():
+    rng = random.Random(7)
+    perfiles = _perfil(20000 + rng.uniform(-50, 50) for _ in range(200))
+    assert not perfiles.puntuar("ACC-1", 20100).atipico
+
+
+def test_varianza_cero_usa_el_piso_y_no_infinito():
+    perfiles = _perfil([1000.0] * 50)
+    puntaje = perfiles.puntuar("ACC-1", 1001)
+    assert math.isfinite(puntaje.z)
+    assert not puntaje.atipico
+    # Un salto grande sobre un monto constante sí es atípico
+    assert perfiles.puntuar("ACC-1", 5000).atipico
+
+
+def test_monto_muy_por_encima_del_perfil_es_atipico():
+    perfiles = _perfil(600 + 400 * i / 199 for i in range(200))
+    assert perfiles.puntuar("ACC-1", 10000).atipico
+
+
+def test_percentil_interpolado_dentro_del_bucket():
+    # 600..1000 cae en un solo bucket log2 [512, 1024)
+    perfiles = _perfil(600 + 400 * i / 199 for i in range(200))
+    bajo, medio, alto = (perfiles.puntuar("ACC-1", monto).percentil for monto in (600, 800, 1000))
+    assert bajo < medio < alto
+    assert 0.4 < medio < 0.8
+
+
+def test_monto_minimo_nunca_se_marca():
+    perfiles = _perfil([10.0] * 50)
+    assert not perfiles.puntuar("ACC-1", 400).atipico
@@ -0,0 +1,27 @@
+"""Dimensionado del estado por cuenta de cada proceso (app/worker.py)."""
+from app import worker
+from app.worker import cuentas_por_proceso
+
+
+def test_los_procesos_reservan_en_conjunto_lo_configurado():
+    # 16 shards entre 6 procesos: grupos de 3 y 2 shards
+    grupos = [len(range(16)[i::6]) for i in range(6)]
+    reservas = [cuentas_por_proceso(500_000, propios, 16) for propios in grupos]
+    assert reservas == [93_750] * 4 + [62_500] * 2
+    assert sum(reservas) == 500_000
+
+
+def test_un_worker_con_todos_los_shards_reserva_el_total():
+    assert cuentas_por_proceso(500_000, 16, 16) == 500_000
+    assert cuentas_por_proceso(10, 1, 16) == 1
+
+
+def test_el_estado_se_crea_para_los_shards_del_proceso(monkeypatch):
+    monkeypatch.setattr(worker.settings, "FRAUD_SHARD_COUNT", 16)
+    monkeypatch.setattr(worker.settings, "FRAUD_GRAPH_MAX_ACCOUNTS", 1600)
+    monkeypatch.setattr(worker.settings, "FRAUD_PROFILE_MAX_ACCOUNTS", 3200)
+    monkeypatch.setattr(worker, "grafo", None)
+    monkeypatch.setattr(worker, "perfiles", None)
+    worker.preparar_estado_por_cuenta([0, 8])
+    assert worker.grafo.max_cuentas == 200
+    assert worker.perfiles.max_cuentas == 400
@@ -1,10 +1,11 @@
 # gateway/main.py
 import httpx
 import os
-from fastapi import FastAPI, Request, HTTPException, Depends
+from fastapi import FastAPI, Request, HTTPException, Depends, Response
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from security import get_current_user, AUTH_SERVICE_URL
+from security import get_current_user, crear_cliente, AUTH_SERVICE_URL
+from metrics import CONTENT_TYPE, MetricsMiddleware, registro
 
 app = FastAPI(title="API Gateway")
 
@@ -20,6 +21,9 @@ app.add_middleware(
     allow_headers=["*"],  # Authorization, Content-Type, etc.
 )
 
+# Latencia por ruta para /metrics (el último en agregarse envuelve a todos)
+app.add_middleware(MetricsMiddleware)
+
 # URLs de tus microservicios
 TRANSACCION_SERVICE_URL = "http://transactions_service:8001"
 
@@ -54,6 +58,13 @@ async def proxy_request(client: httpx.AsyncClient, service_url: str, request: Re
         if not forward_auth:
             headers.pop("authorization", None)
         
+        # IP del cliente para el servicio (p. ej. el limitador de login de auth).
+        # Se reemplaza la cabecera del cliente: si se le agregara, un cliente
+        # podría anteponer IPs inventadas
+        headers.pop("x-forwarded-for", None)
+        if request.client:
+            headers["x-forwarded-for"] = request.client.host
+        
         # Prepara el body de la petición
         body = None
         if request.method not in ("GET", "HEAD", "OPTIONS"):
@@ -90,9 +101,12 @@ async def proxy_request(client: httpx.AsyncClient, service_url: str, request: Re
             pass
         
         print(f"❌ Error {e.response.status_code} de {service_url}: {error_detail}")
+        # Retry-After (429/503 de auth) le indica al cliente cuándo reintentar
+        retry_after = e.response.headers.get("retry-after")
         raise HTTPException(
             status_code=e.response.status_code, 
-            detail=error_detail
+            detail=error_detail,
+            headers={"Retry-After": retry_after} if retry_after else None
         )
     except httpx.RequestError as req_err:
         # El servicio no está disponible
@@ -121,27 +135,32 @@ async def health_check():
         "cors_origins": cors_origins
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato Prometheus (latencia por ruta y de los servicios)"""
+    return Response(registro.exponer(), media_type=CONTENT_TYPE)
+
 # --- RUTAS PÚBLICAS (Sin autenticación) ---
 
 @app.post("/api/auth/register")
 async def register(request: Request):
     """Registro de nuevo usuario"""
     print("🔐 Gateway: Redirigiendo registro a auth service")
-    async with httpx.AsyncClient() as client:
+    async with crear_cliente() as client:
         return await proxy_request(client, AUTH_SERVICE_URL, request)
 
 @app.post("/api/auth/login")
 async def login(request: Request):
     """Login de usuario"""
     print("🔐 Gateway: Redirigiendo login a auth service")
-    async with httpx.AsyncClient() as client:
+    async with crear_cliente() as client:
         return await proxy_request(client, AUTH_SERVICE_URL, request)
 
 @app.post("/api/auth/refresh")
 async def refresh(request: Request):
     """Refresh de token"""
     print("🔄 Gateway: Redirigiendo refresh a auth service")
-    async with httpx.AsyncClient() as client:
+    async with crear_cliente() as client:
         return await proxy_request(client, AUTH_SERVICE_URL, request)
 
 # --- RUTAS PROTEGIDAS (Requieren autenticación) ---
@@ -159,7 +178,7 @@ async def update_me(
 ):
     """Actualiza información del usuario actual"""
     print(f"✏️ Gateway: Actualizando usuario {current_user.get('id')}")
-    async with httpx.AsyncClient() as client:
+    async with crear_cliente() as client:
         return await proxy_request(client, AUTH_SERVICE_URL, request, forward_auth=True)
 
 @app.post("/api/auth/logout")
@@ -169,7 +188,7 @@ async def logout(
 ):
     """Cierra sesión del usuario"""
     print(f"👋 Gateway: Cerrando sesión de usuario {current_user.get('id')}")
-    async with httpx.AsyncClient() as client:
+    async with crear_cliente() as client:
         return await proxy_request(client, AUTH_SERVICE_URL, request, forward_auth=True)
 
 @app.post("/api/auth/logout-all")
@@ -179,7 +198,7 @@ async def logout_all(
 ):
     """Cierra todas las sesiones del usuario"""
     print(f"👋👋 Gateway: Cerrando todas las sesiones de usuario {current_user.get('id')}")
-    async with httpx.AsyncClient() as client:
+    async with crear_cliente() as client:
         return await proxy_request(client, AUTH_SERVICE_URL, request, forward_auth=True)
 
 @app.get("/api/auth/verify")
@@ -196,7 +215,7 @@ async def create_transaction(
 ):
     """Crea una nueva transacción"""
     print(f"💰 Gateway: Creando transacción para usuario {current_user.get('id')}")
-    async with httpx.AsyncClient() as client:
+    async with crear_cliente() as client:
         # Agregar user_id al body
         body = await request.json()
         body['user_id'] = current_user.get('id')
@@ -214,7 +233,17 @@ async def get_transactions(
 ):
     """Obtiene todas las transacciones del usuario"""
     print(f"📋 Gateway: Obteniendo transacciones de usuario {current_user.get('id')}")
-    async with httpx.AsyncClient() as client:
+    async with crear_cliente() as client:
+        return await proxy_request(client, TRANSACCION_SERVICE_URL, request, forward_auth=True)
+
+@app.get("/transactions/analytics/rules")
+async def get_rule_analytics(
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """Activaciones de reglas de fraude por período (debe ir antes de /{transaction_id})"""
+    print(f"📈 Gateway: Analítica de reglas para usuario {current_user.get('id')}")
+    async with crear_cliente() as client:
         return await proxy_request(client, TRANSACCION_SERVICE_URL, request, forward_auth=True)
 
 @app.get("/transactions/{transaction_id}")
@@ -225,7 +254,7 @@ async def get_transaction(
 ):
     """Obtiene una transacción específica"""
     print(f"🔍 Gateway: Obteniendo transacción {transaction_id} para usuario {current_user.get('id')}")
-    async with httpx.AsyncClient() as client:
+    async with crear_cliente() as client:
         return await proxy_request(client, TRANSACCION_SERVICE_URL, request, forward_auth=True)
 
 @app.put("/transactions/{transaction_id}")
@@ -236,7 +265,7 @@ async def update_transaction(
 ):
     """Actualiza una transacción"""
     print(f"✏️ Gateway: Actualizando transacción {transaction_id}")
-    async with httpx.AsyncClient() as client:
+    async with crear_cliente() as client:
         return await proxy_request(client, TRANSACCION_SERVICE_URL, request, forward_auth=True)
 
 @app.delete("/transactions/{transaction_id}")
@@ -247,7 +276,7 @@ async def delete_transaction(
 ):
     """Elimina una transacción"""
     print(f"🗑️ Gateway: Eliminando transacción {transaction_id}")
-    async with httpx.AsyncClient() as client:
+    async with crear_cliente() as client:
         return await proxy_request(client, TRANSACCION_SERVICE_URL, request, forward_auth=True)
 
 # --- MANEJO DE ERRORES GLOBAL ---
@@ -258,7 +287,8 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     print(f"❌ Error HTTP {exc.status_code}: {exc.detail}")
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=exc.headers
     )
 
 @app.exception_handler(Exception)
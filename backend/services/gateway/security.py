@@ -1,8 +1,12 @@
 # gateway/security.py
+import time
+
 import httpx
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
+from metrics import registro
+
 # 1. URLs de tus servicios
 AUTH_SERVICE_URL = "http://auth_service:8000"
 
@@ -10,6 +14,45 @@ AUTH_SERVICE_URL = "http://auth_service:8000"
 #    Esta es la ruta que el cliente (Swagger) usará para obtener el token.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Transporte de los clientes hacia los microservicios. None = red real;
+# los benchmarks (backend/benchmarks) lo reemplazan por transportes ASGI
+# para llamar a los servicios en el mismo proceso.
+transporte_servicios: httpx.AsyncBaseTransport | None = None
+
+LATENCIA_UPSTREAM = registro.histograma(
+    "upstream_request_duration_seconds", "Duración de las llamadas a los microservicios",
+    ("service", "status"),
+)
+
+
+class TransporteMedido(httpx.AsyncBaseTransport):
+    """
+    Mide cada llamada a un microservicio hasta recibir las cabeceras de la
+    respuesta, por host destino y código de estado ("error" si no hubo
+    respuesta: conexión rechazada, timeout...).
+    """
+
+    def __init__(self, transporte: httpx.AsyncBaseTransport):
+        self.transporte = transporte
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        inicio = time.perf_counter()
+        estado = "error"
+        try:
+            respuesta = await self.transporte.handle_async_request(request)
+            estado = respuesta.status_code
+            return respuesta
+        finally:
+            LATENCIA_UPSTREAM.labels(request.url.host, estado).observe(time.perf_counter() - inicio)
+
+    async def aclose(self):
+        await self.transporte.aclose()
+
+
+def crear_cliente() -> httpx.AsyncClient:
+    """Cliente HTTP hacia un microservicio (auth o transacciones)."""
+    return httpx.AsyncClient(transport=TransporteMedido(transporte_servicios or httpx.AsyncHTTPTransport()))
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
     Esta dependencia se usa en las rutas protegidas del Gateway.
@@ -19,7 +62,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     3. Si es válido (200 OK), devuelve los datos del usuario.
     4. Si es inválido (401) o el servicio falla, lanza un error 401.
     """
-    async with httpx.AsyncClient() as client:
+    async with crear_cliente() as client:
         try:
             headers = {"Authorization": f"Bearer {token}"}
             
@@ -0,0 +1,32 @@
+"""Agregar reglas_activadas (máscara de reglas de fraude) a transactions
+
+Revision ID: 5c1f9a7d2b3e
+Revises: abe4985bdd08
+Create Date: 2026-10-19 18:05:12.311842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1f9a7d2b3e'
+down_revision: Union[str, Sequence[str], None] = 'abe4985bdd08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las filas existentes quedan en 0 (sin reglas registradas)
+    op.add_column('transactions', sa.Column('reglas_activadas', sa.Integer(), server_default='0', nullable=False))
+    # Índice compuesto para la analítica de reglas por rango de fechas
+    op.create_index('ix_transactions_hora_reglas', 'transactions', ['hora', 'reglas_activadas'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_hora_reglas', table_name='transactions')
+    op.drop_column('transactions', 'reglas_activadas')
@@ -4,6 +4,7 @@ from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 import logging
+import threading
 
 from .database import SessionLocal
 from app.services.messaging import RabbitMQPublisher # 1. Importar el publicador
@@ -25,31 +26,50 @@ def get_db():
 
 # --- Dependencia de Mensajería (RabbitMQ) ---
 
-# --- CAMBIO CLAVE ---
-# 2. Inicializar el publicador UNA SOLA VEZ.
-#    El 'host' debe ser 'rabbitmq' (el nombre del servicio en docker-compose).
-#    La lógica de reintentos está AHORA DENTRO de RabbitMQPublisher.
-try:
-    logger.info("Intentando conectar a RabbitMQ al inicio...")
-    publisher_instance = RabbitMQPublisher(host='rabbitmq')
-except ConnectionError as e:
-    logger.critical(f"CRÍTICO: No se pudo conectar a RabbitMQ al inicio. El servicio no funcionará. {e}")
-    publisher_instance = None # El servicio cargará, pero fallará en las peticiones
+# El publicador se crea UNA SOLA VEZ, al arrancar la app (lifespan en
+# main.py) o, si no, en la primera petición que lo pida. No se conecta al
+# importar el módulo: así los scripts y el harness de carga
+# (backend/benchmarks) pueden importar la app sin un RabbitMQ y reemplazar
+# el publicador con app.dependency_overrides[get_publisher].
+# El 'host' debe ser 'rabbitmq' (el nombre del servicio en docker-compose).
+# La lógica de reintentos está DENTRO de RabbitMQPublisher.
+publisher_instance: RabbitMQPublisher | None = None
+_publisher_attempted = False
+_publisher_lock = threading.Lock()
+
+def init_publisher() -> RabbitMQPublisher | None:
+    """
+    Conecta el publicador (una sola vez). Si RabbitMQ no responde tras los
+    reintentos, queda en None y get_publisher responde 503.
+    """
+    global publisher_instance, _publisher_attempted
+    with _publisher_lock:
+        if not _publisher_attempted:
+            _publisher_attempted = True
+            try:
+                logger.info("Intentando conectar a RabbitMQ...")
+                publisher_instance = RabbitMQPublisher(host='rabbitmq')
+            except ConnectionError as e:
+                logger.critical(f"CRÍTICO: No se pudo conectar a RabbitMQ. El servicio no funcionará. {e}")
+                publisher_instance = None # El servicio carga, pero falla en las peticiones
+    return publisher_instance
 
 def get_publisher() -> RabbitMQPublisher:
     """
     Inyección de dependencia para el publicador de RabbitMQ.
-    Simplemente devuelve la instancia global.
+    Devuelve la instancia global (creándola si aún no se intentó).
     """
+    if not _publisher_attempted:
+        init_publisher()
     if publisher_instance is None:
-        # Esto pasará si RabbitMQ falló al inicio
+        # Esto pasará si RabbitMQ falló al conectar
         logger.error("get_publisher: publisher_instance es None. La conexión inicial falló.")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE, 
             detail="Servicio de mensajería (RabbitMQ) no disponible."
         )
     
-    # Devuelve la instancia única que creamos al inicio
+    # Devuelve la instancia única
     return publisher_instance
 
 # --- Modelos Pydantic para el Usuario ---
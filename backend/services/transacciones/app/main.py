@@ -1,19 +1,46 @@
 # app/main.py
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 # --- CORRECCIONES DE IMPORTACIÓN ---
 # Usa '.' para importar módulos en el mismo directorio (paquete 'app')
 from app.models import transaccion_model as  models 
+from . import database
 from .database import engine
 from .routes.transaccion_routes import router as transaction_router
+from .config import settings
+from .dependencies import init_publisher
+from .services.results_consumer import ResultsConsumer
+from .services.db_metrics import DbMetricsMiddleware, db_metrics
+from .services.db_pool import pool_stats, registrar_metricas
+from .metrics import CONTENT_TYPE, MetricsMiddleware, registro
 # -----------------------------------
 
 
+# 1. Ciclo de vida: conexión del publicador y consumidor de la cola de
+#    decisiones de fraude
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # La conexión (con reintentos) es bloqueante: fuera del event loop
+    await asyncio.to_thread(init_publisher)
+    consumer = None
+    if settings.RESULTS_CONSUMER_ENABLED:
+        consumer = ResultsConsumer()
+        consumer.start()
+    app.state.results_consumer = consumer
+    yield
+    if consumer is not None:
+        consumer.stop()
+
+
 # 2. Instancia de la Aplicación FastAPI
 app = FastAPI(
     title="Servicio de Transacciones",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 3. Configuración de CORS
@@ -30,6 +57,14 @@ app.add_middleware(
     allow_headers=["*"],         
 )
 
+# Sentencias, tiempo de BD y espera por conexión de cada petición
+if db_metrics is not None:
+    app.add_middleware(DbMetricsMiddleware, metrics=db_metrics, headers=settings.DEBUG)
+
+# Latencia por ruta para /metrics (el último en agregarse envuelve a todos)
+app.add_middleware(MetricsMiddleware)
+registrar_metricas(lambda: database.engine)
+
 # 4. Inclusión de las Rutas de Transacciones
 app.include_router(transaction_router)
 
@@ -41,4 +76,31 @@ def health_check():
     Endpoint simple para verificar que el servicio está
     corriendo y saludable.
     """
-    return {"status": "ok", "service": "transactions_service"}
\ No newline at end of file
+    return {"status": "ok", "service": "transactions_service"}
+
+
+# 6. Métricas de BD y del pool (interno: el gateway no lo expone)
+@app.get("/admin/db-metrics", tags=["Health Check"])
+def db_metrics_stats():
+    """
+    Sentencias SQL, tiempo de BD y espera por conexión agregados por
+    ruta, y las últimas sentencias lentas.
+    """
+    if db_metrics is None:
+        return {"enabled": False}
+    return db_metrics.stats()
+
+
+@app.get("/admin/db-pool", tags=["Health Check"])
+def db_pool_stats():
+    """
+    Conexiones en uso y en overflow, histograma de espera por conexión y
+    timeouts del pool (pool agotado).
+    """
+    return pool_stats(database.engine)
+
+
+# 7. Métricas en formato Prometheus (interno: el gateway no lo expone)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(registro.exponer(), media_type=CONTENT_TYPE)
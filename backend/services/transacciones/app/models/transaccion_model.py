@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum as SQLAlchemyEnum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, Enum as SQLAlchemyEnum
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 from app.schemas.transaccion_schema import TransactionStatus # Importamos el Enum de Pydantic
@@ -19,4 +19,13 @@ class Transaction(Base):
         SQLAlchemyEnum(TransactionStatus), 
         nullable=False, 
         default=TransactionStatus.PENDING
+    )
+
+    # Máscara de bits de las reglas de fraude activadas (rules_registry).
+    # El índice (hora, reglas_activadas) cubre las consultas de analítica:
+    # se resuelven recorriendo solo el índice en el rango de fechas.
+    reglas_activadas = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_transactions_hora_reglas", "hora", "reglas_activadas"),
     )
\ No newline at end of file
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
-from app.schemas.transaccion_schema import TransactionBase, TransactionCreate, TransactionInDBBase, TransactionStatus, StatusUpdate
+from app.schemas.transaccion_schema import (
+    AnalyticsPeriod, RuleHitsBucket, TransactionBase, TransactionCreate,
+    TransactionInDBBase, TransactionStatus, StatusUpdate
+)
 from app.services import transaccion_service
 from app.dependencies import get_db, get_publisher
 from app.dependencies import User # Importamos el Pydantic model 'User'
@@ -86,6 +91,11 @@ def update_transaction_status_endpoint(
     Endpoint interno para que el fraud_service actualice el estado
     de una transacción después de analizarla.
     
+    Solo se modifican transacciones PENDING. Repetir la decisión vigente
+    (una reentrega del worker) responde 200 sin cambios; pedir otro estado
+    para una transacción ya decidida responde **409 Conflict** con el
+    estado vigente, en vez de un 200 que no cambia nada.
+    
     **Nota de Seguridad:** En producción, este endpoint debería estar
     protegido (solo accesible desde la red interna o con autenticación
     de servicio a servicio).
@@ -95,7 +105,8 @@ def update_transaction_status_endpoint(
     updated_transaction = transaccion_service.update_transaction_status(
         db=db,
         transaction_id=transaction_id,
-        new_status=status_update.status  # ← CAMBIO: accede al campo status
+        new_status=status_update.status,  # ← CAMBIO: accede al campo status
+        rules_mask=status_update.reglas_activadas
     )
     
     if not updated_transaction:
@@ -104,4 +115,46 @@ def update_transaction_status_endpoint(
             detail=f"Transacción {transaction_id} no encontrada"
         )
     
-    return updated_transaction
\ No newline at end of file
+    # Ya estaba decidida con otro resultado: el cambio no se aplicó
+    if (updated_transaction.status != status_update.status
+            or updated_transaction.reglas_activadas != status_update.reglas_activadas):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Transacción {transaction_id} ya decidida ({updated_transaction.status.value}); no se modifica"
+        )
+    
+    return updated_transaction
+
+
+# Rango máximo por consulta de analítica (acota el recorrido del índice)
+MAX_ANALYTICS_RANGE = timedelta(days=366)
+
+
+@router.get(
+    "/analytics/rules",
+    response_model=list[RuleHitsBucket],
+    summary="Activaciones de reglas de fraude por período"
+)
+def rule_hits_endpoint(
+    desde: datetime = Query(..., description="Inicio del rango (incluido)"),
+    hasta: datetime = Query(..., description="Fin del rango (excluido)"),
+    periodo: AnalyticsPeriod = Query(AnalyticsPeriod.DAY, description="Agrupación: hour o day"),
+    db: Session = Depends(get_db)
+):
+    """
+    Cuenta cuántas transacciones activó cada regla en cada período.
+    Responde "¿qué regla rechaza más?" sin volver a ejecutar las reglas:
+    usa la máscara 'reglas_activadas' guardada con cada decisión.
+    """
+    if hasta <= desde:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'hasta' debe ser posterior a 'desde'"
+        )
+    if hasta - desde > MAX_ANALYTICS_RANGE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El rango máximo es de {MAX_ANALYTICS_RANGE.days} días"
+        )
+
+    return transaccion_service.rule_hit_counts(db, desde, hasta, periodo)
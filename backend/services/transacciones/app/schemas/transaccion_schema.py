@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
 
@@ -24,10 +24,23 @@ class TransactionInDBBase(TransactionBase):
     id: int
     hora: datetime
     status: TransactionStatus = TransactionStatus.PENDING # Estado inicial
+    # Máscara de bits de las reglas de fraude activadas (ver rules_registry)
+    reglas_activadas: int = 0
 
     class Config:
         from_attributes = True # Permite a Pydantic leer datos desde modelos SQLAlchemy
 
 class StatusUpdate(BaseModel):
     """Schema para actualizar solo el estado de una transacción"""
-    status: TransactionStatus
\ No newline at end of file
+    status: TransactionStatus
+    reglas_activadas: int = Field(0, ge=0, description="Máscara de bits de las reglas activadas")
+
+class AnalyticsPeriod(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+
+class RuleHitsBucket(BaseModel):
+    """Activaciones de cada regla en un período"""
+    periodo: str
+    total_con_reglas: int          # transacciones con al menos una regla
+    reglas: dict[str, int]         # activaciones por nombre de regla
\ No newline at end of file
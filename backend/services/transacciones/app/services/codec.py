@@ -0,0 +1,125 @@
+"""
+Codificación de los mensajes de transacción entre el publicador y el worker.
+
+El tipo de contenido (propiedad AMQP ``content_type``) indica el formato:
+
+- ``application/x-transafe-tx``: binario compacto con versión.
+- ``application/json`` (o sin content_type, mensajes antiguos): JSON.
+
+Formato binario v1 (little-endian)::
+
+    B   versión (1)
+    Q   id
+    d   monto
+    q   hora (microsegundos desde epoch, UTC)
+    B   status (índice en ESTADOS)
+    H+s cuenta_origen   (longitud + UTF-8)
+    H+s cuenta_destino
+    H+s ubicacion
+
+El worker decodifica ambos formatos, así el publicador puede cambiar de
+formato sin coordinar el despliegue. Una versión o un content_type
+desconocidos levantan ErrorDecodificacion (el mensaje va a la DLQ).
+Debe mantenerse igual en fraud_service/app/codec.py y
+transacciones/app/services/codec.py (backend/tests/test_modulos_compartidos.py
+lo verifica).
+"""
+import json
+import struct
+from datetime import datetime, timezone
+
+CONTENT_TYPE_BINARIO = "application/x-transafe-tx"
+CONTENT_TYPE_JSON = "application/json"
+VERSION_BINARIA = 1
+
+ESTADOS = ("PENDING", "APPROVED", "REJECTED")
+_INDICE_ESTADO = {estado: indice for indice, estado in enumerate(ESTADOS)}
+
+_CABECERA = struct.Struct("<BQdqB")
+_LONGITUD = struct.Struct("<H")
+
+
+class ErrorDecodificacion(ValueError):
+    """El mensaje no se puede decodificar (corrupto o formato desconocido)."""
+
+
+def _a_microsegundos(hora) -> int:
+    if isinstance(hora, str):
+        hora = datetime.fromisoformat(hora)
+    if hora.tzinfo is None:
+        # Las horas se guardan como UTC sin zona (datetime.utcnow)
+        hora = hora.replace(tzinfo=timezone.utc)
+    return int(hora.timestamp() * 1_000_000)
+
+
+def codificar_binario(datos: dict) -> bytes:
+    """Codifica una transacción en el formato binario v1."""
+    estado = datos.get("status") or "PENDING"
+    # Acepta el Enum del esquema o su valor
+    estado = getattr(estado, "value", estado)
+    cadenas = b"".join(
+        _LONGITUD.pack(len(valor)) + valor
+        for valor in (
+            str(datos["cuenta_origen"]).encode(),
+            str(datos["cuenta_destino"]).encode(),
+            str(datos["ubicacion"]).encode(),
+        )
+    )
+    return _CABECERA.pack(
+        VERSION_BINARIA,
+        int(datos["id"]),
+        float(datos["monto"]),
+        _a_microsegundos(datos["hora"]),
+        _INDICE_ESTADO[estado],
+    ) + cadenas
+
+
+def decodificar_binario(cuerpo: bytes) -> dict:
+    """
+    Decodifica el formato binario. La hora se entrega como 'hora_ts'
+    (epoch en segundos), que las reglas usan sin parsear texto.
+    """
+    if not cuerpo or cuerpo[0] != VERSION_BINARIA:
+        version = cuerpo[0] if cuerpo else None
+        raise ErrorDecodificacion(f"Versión binaria no soportada: {version}")
+    try:
+        _, id_trans, monto, hora_us, estado = _CABECERA.unpack_from(cuerpo, 0)
+        posicion = _CABECERA.size
+        cadenas = []
+        for _ in range(3):
+            (longitud,) = _LONGITUD.unpack_from(cuerpo, posicion)
+            posicion += _LONGITUD.size
+            cadenas.append(cuerpo[posicion:posicion + longitud].decode())
+            posicion += longitud
+        estado = ESTADOS[estado]
+    except (struct.error, UnicodeDecodeError, IndexError) as e:
+        raise ErrorDecodificacion(f"Mensaje binario corrupto: {e}") from e
+
+    return {
+        "id": id_trans,
+        "monto": monto,
+        "hora_ts": hora_us / 1_000_000,
+        "status": estado,
+        "cuenta_origen": cadenas[0],
+        "cuenta_destino": cadenas[1],
+        "ubicacion": cadenas[2],
+    }
+
+
+def codificar(datos: dict, formato: str) -> tuple[bytes, str]:
+    """Codifica según el formato ("binary" o "json"); retorna (cuerpo, content_type)."""
+    if formato == "binary":
+        return codificar_binario(datos), CONTENT_TYPE_BINARIO
+    return json.dumps(datos, default=str).encode(), CONTENT_TYPE_JSON
+
+
+def decodificar(cuerpo: bytes, content_type: str | None) -> dict:
+    """Decodifica según el content_type del mensaje (JSON si no viene)."""
+    if content_type == CONTENT_TYPE_BINARIO:
+        return decodificar_binario(cuerpo)
+    if content_type in (None, "", CONTENT_TYPE_JSON, "text/plain"):
+        try:
+            return json.loads(cuerpo)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ErrorDecodificacion(f"JSON inválido: {e}") from e
+    raise ErrorDecodificacion(f"content_type no soportado: {content_type}")
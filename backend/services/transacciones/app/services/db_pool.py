@@ -0,0 +1,198 @@
+# Copia idéntica en auth/ y transacciones/ (app/services/db_pool.py);
+# backend/tests/test_modulos_compartidos.py falla si divergen.
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from app.config import get_settings
+from app.metrics import registro
+from app.services.db_metrics import db_metrics
+
+settings = get_settings()
+
+MODOS_PRE_PING = ("always", "idle", "never")
+
+# Límites superiores (segundos) de los tramos del histograma de espera
+TRAMOS_ESPERA = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class EstadisticasPool:
+    """
+    Checkouts, timeouts, histograma de espera y pre-pings de un pool. Los
+    checkouts llegan desde los hilos del threadpool: se actualizan bajo lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.wait_max = 0.0
+        self.histograma = [0] * (len(TRAMOS_ESPERA) + 1)
+        self.pings = 0
+        self.pings_failed = 0
+
+    def registrar(self, espera: float, timeout: bool = False):
+        tramo = next((i for i, limite in enumerate(TRAMOS_ESPERA) if espera <= limite), len(TRAMOS_ESPERA))
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds += espera
+            self.wait_max = max(self.wait_max, espera)
+            self.histograma[tramo] += 1
+
+    def registrar_ping(self, fallo: bool = False):
+        with self._lock:
+            self.pings += 1
+            if fallo:
+                self.pings_failed += 1
+
+    def a_dict(self) -> dict:
+        etiquetas = [f"<={limite * 1000:g}ms" for limite in TRAMOS_ESPERA] + [f">{TRAMOS_ESPERA[-1] * 1000:g}ms"]
+        with self._lock:
+            intentos = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.wait_seconds * 1000 / intentos, 3) if intentos else None,
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+                "wait_histogram": dict(zip(etiquetas, self.histograma)),
+                "idle_pings": self.pings,
+                "idle_pings_failed": self.pings_failed,
+            }
+
+
+class QueuePoolMedido(QueuePool):
+    """
+    QueuePool que mide cuánto espera cada checkout por una conexión y
+    cuenta los que vencen por pool_timeout (pool agotado). La espera
+    también se atribuye a la petición en curso (db_metrics).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estadisticas = EstadisticasPool()
+
+    def recreate(self):
+        # engine.dispose() reemplaza el pool: las métricas siguen acumulando
+        nuevo = super().recreate()
+        nuevo.estadisticas = self.estadisticas
+        return nuevo
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            self._registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        self._registrar(time.perf_counter() - inicio)
+        return conexion
+
+    def _registrar(self, espera: float, timeout: bool = False):
+        self.estadisticas.registrar(espera, timeout)
+        if db_metrics is not None:
+            db_metrics.registrar_checkout(espera)
+
+
+def opciones_engine(url: str) -> dict:
+    """
+    Argumentos de create_engine para el pool según Settings. SQLite (los
+    scripts y benchmarks) conserva el pool que elige SQLAlchemy.
+    """
+    if settings.DB_POOL_PRE_PING not in MODOS_PRE_PING:
+        raise ValueError(f"DB_POOL_PRE_PING debe ser uno de {MODOS_PRE_PING}, no {settings.DB_POOL_PRE_PING!r}")
+    opciones = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING == "always",
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        opciones.update(
+            poolclass=QueuePoolMedido,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        )
+    return opciones
+
+
+def configurar_pre_ping(engine):
+    """
+    Con DB_POOL_PRE_PING="idle", solo se verifica la conexión si estuvo
+    devuelta en el pool más de DB_POOL_PRE_PING_IDLE_SECONDS: en ráfagas
+    (conexiones recién usadas) el checkout no paga la ida y vuelta del
+    ping. Si el ping falla, el pool descarta la conexión y abre otra.
+    """
+    if settings.DB_POOL_PRE_PING != "idle":
+        return
+    inactividad = settings.DB_POOL_PRE_PING_IDLE_SECONDS
+
+    @event.listens_for(engine, "checkin")
+    def _devuelta(_dbapi_conexion, registro):
+        registro.info["devuelta_en"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _verificar(dbapi_conexion, registro, _proxy):
+        devuelta = registro.info.get("devuelta_en")
+        if devuelta is None or time.monotonic() - devuelta < inactividad:
+            return
+        estadisticas = getattr(engine.pool, "estadisticas", None)
+        try:
+            engine.dialect.do_ping(dbapi_conexion)
+        except Exception as e:
+            if estadisticas is not None:
+                estadisticas.registrar_ping(fallo=True)
+            raise exc.DisconnectionError(f"Conexión inactiva caída: {e}") from e
+        if estadisticas is not None:
+            estadisticas.registrar_ping()
+
+
+def pool_stats(engine) -> dict:
+    """Estado actual del pool del engine y sus métricas acumuladas."""
+    pool = engine.pool
+    datos = {
+        "pool": type(pool).__name__,
+        "pre_ping": settings.DB_POOL_PRE_PING,
+        "recycle_seconds": settings.DB_POOL_RECYCLE_SECONDS,
+    }
+    if isinstance(pool, QueuePool):
+        datos.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # Conexiones abiertas por encima de pool_size
+            "overflow": max(0, pool.overflow()),
+        })
+    estadisticas = getattr(pool, "estadisticas", None)
+    if estadisticas is not None:
+        datos.update(estadisticas.a_dict())
+    return datos
+
+
+def registrar_metricas(obtener_engine):
+    """
+    Estado del pool en /metrics, leído al exponer. Recibe una función y
+    no el engine: los benchmarks reemplazan database.engine.
+    """
+    def _pool():
+        return obtener_engine().pool
+
+    def _estadisticas() -> EstadisticasPool:
+        return getattr(_pool(), "estadisticas", None) or EstadisticasPool()
+
+    registro.gauge("db_pool_checked_out", "Conexiones del pool en uso", funcion=lambda: _pool().checkedout())
+    registro.gauge("db_pool_overflow", "Conexiones abiertas por encima de pool_size",
+                   funcion=lambda: max(0, _pool().overflow()))
+    registro.contador("db_pool_checkouts_total", "Conexiones entregadas por el pool",
+                      funcion=lambda: _estadisticas().checkouts)
+    registro.contador("db_pool_timeouts_total", "Checkouts vencidos por pool_timeout (pool agotado)",
+                      funcion=lambda: _estadisticas().timeouts)
+    registro.contador("db_pool_wait_seconds_total", "Tiempo total esperando una conexión del pool",
+                      funcion=lambda: _estadisticas().wait_seconds)
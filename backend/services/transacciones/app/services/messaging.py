@@ -1,24 +1,75 @@
 # transactions_service/app/services/messaging.py
 import pika
-import json
 import logging
 import time  # Necesitamos 'time' para los reintentos
+from app.config import settings
+from app.services.codec import codificar
+from app.metrics import registro
 
 # Configuración básica de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Definimos el nombre de la cola
-TRANSACTION_QUEUE = 'fraud_detection_queue'
+# --- Topología de fraude ---
+# Deben coincidir con fraud_service/app/topologia.py.
+# Los mensajes se enrutan por 'cuenta_origen' a través de un exchange de
+# hash consistente hacia N colas shard, lo que mantiene el orden por
+# cuenta y permite consumir los shards en paralelo.
+# Las transferencias grandes van a un carril de alta prioridad con su
+# propio exchange y colas shard, para no esperar detrás de las chicas.
+FRAUD_EXCHANGE = 'fraud_transactions'
+SHARD_QUEUE_PREFIX = 'fraud_detection_queue.shard'
+HIGH_FRAUD_EXCHANGE = 'fraud_transactions.high'
+HIGH_SHARD_QUEUE_PREFIX = 'fraud_detection_queue.high.shard'
+DLQ_QUEUE = 'fraud_detection_queue.dlq'
+
+HIGH_LANE = 'high'
+NORMAL_LANE = 'normal'
+LANE_EXCHANGES = {HIGH_LANE: HIGH_FRAUD_EXCHANGE, NORMAL_LANE: FRAUD_EXCHANGE}
+LANE_QUEUE_PREFIXES = {HIGH_LANE: HIGH_SHARD_QUEUE_PREFIX, NORMAL_LANE: SHARD_QUEUE_PREFIX}
+
+# Duración de codificar + basic_publish, por carril y resultado.
+# Las series se crean una vez aquí, no en cada publicación
+PUBLICACION = registro.histograma(
+    "rabbitmq_publish_duration_seconds", "Duración de la publicación de un mensaje de fraude",
+    ("lane", "result"),
+)
+_PUBLICACION = {
+    (lane, resultado): PUBLICACION.labels(lane, resultado)
+    for lane in LANE_EXCHANGES for resultado in ("ok", "error")
+}
+
+
+def shard_queue_name(index: int, lane: str = NORMAL_LANE) -> str:
+    """Nombre de la cola del shard 'index' en el carril 'lane'."""
+    return f"{LANE_QUEUE_PREFIXES[lane]}.{index}"
+
+
+def lane_for(message_body: dict) -> str:
+    """Carril de prioridad según el monto de la transacción."""
+    monto = float(message_body.get("monto") or 0)
+    return HIGH_LANE if monto > settings.FRAUD_HIGH_PRIORITY_AMOUNT else NORMAL_LANE
+
+
+def shard_queue_arguments() -> dict:
+    """Argumentos de las colas shard (idénticos a los del worker)."""
+    return {
+        "x-single-active-consumer": True,
+        "x-dead-letter-exchange": "",
+        "x-dead-letter-routing-key": DLQ_QUEUE,
+    }
+
 
 class RabbitMQPublisher:
-    def __init__(self, host='rabbitmq', max_retries=15, retry_delay=5):
+    def __init__(self, host='rabbitmq', max_retries=15, retry_delay=5, shard_count=None, encoding=None):
         """
         Inicializa la conexión con reintentos.
         """
         self.host = host
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.shard_count = shard_count or settings.FRAUD_SHARD_COUNT
+        self.encoding = encoding or settings.FRAUD_MESSAGE_ENCODING
         self.connection = None
         self.channel = None
         
@@ -37,7 +88,7 @@ class RabbitMQPublisher:
                     pika.ConnectionParameters(host=self.host, heartbeat=600, blocked_connection_timeout=300)
                 )
                 self.channel = self.connection.channel()
-                self.channel.queue_declare(queue=TRANSACTION_QUEUE, durable=True)
+                self.declare_topology()
                 logger.info("✅ Conexión con RabbitMQ establecida exitosamente.")
                 return  # ¡Éxito! Salimos del bucle.
             
@@ -52,30 +103,66 @@ class RabbitMQPublisher:
         # para que el servicio se detenga.
         raise ConnectionError("No se pudo conectar a RabbitMQ.")
 
+    def declare_topology(self):
+        """
+        Declara los exchanges de hash consistente de cada carril y enlaza
+        sus colas shard. Se declaran aquí también para no perder mensajes
+        si el worker aún no arrancó (un exchange sin colas enlazadas los
+        descarta).
+        """
+        for lane, exchange in LANE_EXCHANGES.items():
+            self.channel.exchange_declare(
+                exchange=exchange,
+                exchange_type='x-consistent-hash',
+                durable=True
+            )
+            for index in range(self.shard_count):
+                queue_name = shard_queue_name(index, lane)
+                self.channel.queue_declare(
+                    queue=queue_name,
+                    durable=True,
+                    arguments=shard_queue_arguments()
+                )
+                # En x-consistent-hash la routing key del binding es el peso
+                self.channel.queue_bind(queue=queue_name, exchange=exchange, routing_key='1')
+
     def publish_message(self, message_body: dict):
         """
-        Publica un mensaje en la cola de transacciones.
+        Publica un mensaje en el exchange de fraude de su carril.
+        La cuenta de origen es la clave de hash: fija el shard.
         """
+        lane = NORMAL_LANE
+        inicio = None
         try:
             # Verificamos si la conexión está viva. Si no, reconectamos.
             if not self.connection or self.connection.is_closed or not self.channel or self.channel.is_closed:
                 logger.warning("Conexión perdida. Intentando reconectar...")
                 self.connect()
 
-            # Convertimos el dict a JSON string
-            message_str = json.dumps(message_body, default=str)
+            # La reconexión queda fuera de la medición
+            inicio = time.perf_counter()
+            lane = lane_for(message_body)
+            # Binario compacto o JSON; el content_type le dice al worker cuál
+            body, content_type = codificar(message_body, self.encoding)
+            exchange = LANE_EXCHANGES[lane]
 
             self.channel.basic_publish(
-                exchange='',
-                routing_key=TRANSACTION_QUEUE,
-                body=message_str,
+                exchange=exchange,
+                routing_key=str(message_body.get("cuenta_origen", "")),
+                body=body,
                 properties=pika.BasicProperties(
                     delivery_mode=2,  # Hacer el mensaje persistente
+                    content_type=content_type,
+                    # Momento de publicación (epoch s) para medir el lag en el worker
+                    headers={"x-published-at": time.time()},
                 )
             )
-            logger.info(f"📤 Mensaje publicado en '{TRANSACTION_QUEUE}': {message_str}")
+            _PUBLICACION[lane, "ok"].observe(time.perf_counter() - inicio)
+            logger.info(f"📤 Mensaje {message_body.get('id')} publicado en '{exchange}' ({content_type}, {len(body)} bytes)")
         
         except Exception as e:
+            if inicio is not None:
+                _PUBLICACION[lane, "error"].observe(time.perf_counter() - inicio)
             logger.error(f"❌ Error al publicar mensaje: {e}")
             # Si publicar falla, cerramos la conexión para forzar reconexión
             if self.connection and self.connection.is_open:
@@ -0,0 +1,122 @@
+# transactions_service/app/services/results_consumer.py
+import json
+import logging
+import threading
+import time
+
+import pika
+
+from app.config import settings
+from app.database import SessionLocal
+from app.schemas.transaccion_schema import TransactionStatus
+from app.services import transaccion_service
+
+logger = logging.getLogger(__name__)
+
+
+class ResultsConsumer:
+    """
+    Drena la cola 'fraud_results' en un hilo propio (pika no es thread-safe,
+    por eso tiene su propia conexión) y aplica las decisiones por lotes:
+    un UPDATE por estado y un solo commit por lote. Los mensajes se
+    confirman (ack múltiple) solo después del commit; si la BD falla el
+    lote vuelve a la cola.
+    """
+
+    def __init__(self, url: str = None, queue: str = None, batch_size: int = None, flush_seconds: float = None):
+        self.url = url or settings.RABBITMQ_URL
+        self.queue = queue or settings.RESULTS_QUEUE
+        self.batch_size = batch_size or settings.RESULTS_BATCH_SIZE
+        self.flush_seconds = flush_seconds or settings.RESULTS_FLUSH_SECONDS
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Contadores para observabilidad
+        self.batches = 0
+        self.applied = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="results-consumer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        """Bucle con reconexión: vuelve a conectar si RabbitMQ se cae."""
+        while not self._stop.is_set():
+            try:
+                self._consume()
+            except pika.exceptions.AMQPError as e:
+                logger.warning(f"❌ Consumidor de resultados desconectado: {e}. Reintentando en 5s...")
+                self._stop.wait(5)
+            except Exception as e:
+                logger.error(f"❌ Error inesperado en el consumidor de resultados: {e}")
+                self._stop.wait(5)
+
+    def _consume(self):
+        connection = pika.BlockingConnection(pika.URLParameters(self.url))
+        try:
+            channel = connection.channel()
+            channel.queue_declare(queue=self.queue, durable=True)
+            # El prefetch limita el lote: nunca hay más de batch_size sin ack
+            channel.basic_qos(prefetch_count=self.batch_size)
+            logger.info(f"✅ Consumiendo decisiones de '{self.queue}' en lotes de {self.batch_size}")
+
+            batch = []
+            deadline = None
+            for method, _properties, body in channel.consume(self.queue, inactivity_timeout=self.flush_seconds):
+                if method is not None:
+                    batch.append((method.delivery_tag, body))
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_seconds
+
+                expired = deadline is not None and time.monotonic() >= deadline
+                if batch and (len(batch) >= self.batch_size or method is None or expired):
+                    self._flush(channel, batch)
+                    batch = []
+                    deadline = None
+
+                if self._stop.is_set() and not batch:
+                    break
+
+            channel.cancel()
+        finally:
+            if connection.is_open:
+                connection.close()
+
+    def _flush(self, channel, batch: list):
+        """Aplica el lote en una transacción y confirma hasta el último tag."""
+        updates: dict[int, tuple[TransactionStatus, int]] = {}
+        for _tag, body in batch:
+            try:
+                data = json.loads(body)
+                # Si llegan dos decisiones para el mismo ID gana la
+                # primera, igual que contra una transacción ya decidida
+                updates.setdefault(int(data["id"]), (
+                    TransactionStatus(data["status"]),
+                    int(data.get("reglas_activadas", 0)),
+                ))
+            except (ValueError, KeyError, TypeError) as e:
+                # Mensaje inválido: se descarta (se confirma con el lote)
+                logger.error(f"❌ Decisión inválida descartada: {body!r} ({e})")
+
+        last_tag = batch[-1][0]
+        db = SessionLocal()
+        try:
+            rows = transaccion_service.apply_status_updates(db, updates) if updates else 0
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error aplicando lote de {len(batch)} decisiones: {e}. Se reencola.")
+            channel.basic_nack(delivery_tag=last_tag, multiple=True, requeue=True)
+            self._stop.wait(1)
+            return
+        finally:
+            db.close()
+
+        channel.basic_ack(delivery_tag=last_tag, multiple=True)
+        self.batches += 1
+        self.applied += rows
+        logger.info(f"📥 Lote de {len(batch)} decisiones aplicado ({rows} filas)")
@@ -0,0 +1,21 @@
+# transactions_service/app/services/rules_registry.py
+"""
+Registro de las reglas de fraude: bit de cada regla en la columna
+'reglas_activadas' de Transaction.
+
+Debe coincidir con BITS_REGLAS de fraud_service/app/logic.py. Los bits
+no se reutilizan ni se reordenan: el historial guardado depende de ellos.
+Para agregar una regla se usa el siguiente bit libre en ambos servicios.
+"""
+
+RULE_BITS = {
+    "Monto_Alto": 1 << 0,
+    "Ubicacion_Riesgosa": 1 << 1,
+    "Hora_Nocturna_Riesgosa": 1 << 2,
+    "Fan_In_Anormal": 1 << 3,
+}
+
+
+def rule_names(mask: int) -> list[str]:
+    """Nombres de las reglas activadas en la máscara."""
+    return [name for name, bit in RULE_BITS.items() if mask & bit]
@@ -1,8 +1,12 @@
 # transaction_services.py
+from datetime import datetime
+
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from app.models import transaccion_model 
-from app.schemas.transaccion_schema import TransactionBase, TransactionCreate, TransactionInDBBase, TransactionStatus
+from app.schemas.transaccion_schema import AnalyticsPeriod, TransactionBase, TransactionCreate, TransactionInDBBase, TransactionStatus
 from app.services.messaging import RabbitMQPublisher
+from app.services.rules_registry import RULE_BITS
 
 def create_transaction_and_notify(
     db: Session, 
@@ -57,28 +61,116 @@ def get_transaction_by_id(db: Session, transaction_id: int) -> transaccion_model
 def update_transaction_status(
     db: Session, 
     transaction_id: int, 
-    new_status: TransactionStatus
+    new_status: TransactionStatus,
+    rules_mask: int = 0
 ) -> transaccion_model.Transaction:
     """
-    Actualiza el estado de una transacción existente.
+    Registra la decisión de fraude de una transacción pendiente.
+
+    Solo cuenta la primera decisión: si la transacción ya fue decidida
+    (una reentrega tras reiniciarse el worker, con su deduplicador vacío)
+    no se escribe nada y se retorna tal como está. El endpoint compara
+    ese estado con el pedido y responde 409 si difieren.
     
     Args:
         db: Sesión de base de datos
         transaction_id: ID de la transacción a actualizar
         new_status: Nuevo estado (PENDING, APPROVED, REJECTED)
+        rules_mask: Máscara de bits de las reglas activadas
         
     Returns:
-        Transaction object actualizado, o None si no se encuentra
+        Transaction object con su estado vigente, o None si no se encuentra
     """
-    # Buscar la transacción
-    transaction = get_transaction_by_id(db, transaction_id)
+    # Estado y reglas que lo decidieron, solo si sigue pendiente
+    db.query(transaccion_model.Transaction).filter(
+        transaccion_model.Transaction.id == transaction_id,
+        transaccion_model.Transaction.status == TransactionStatus.PENDING
+    ).update(
+        {
+            transaccion_model.Transaction.status: new_status,
+            transaccion_model.Transaction.reglas_activadas: rules_mask,
+        },
+        synchronize_session=False
+    )
+    db.commit()
     
-    if not transaction:
-        return None
+    return get_transaction_by_id(db, transaction_id)
+
+
+def apply_status_updates(
+    db: Session,
+    updates: dict[int, tuple[TransactionStatus, int]]
+) -> int:
+    """
+    Aplica un lote de decisiones de fraude con un UPDATE por combinación
+    de estado y máscara de reglas (WHERE id IN ...) en una sola
+    transacción. Las combinaciones son pocas, así que el lote sigue
+    siendo de unas pocas sentencias. Como en update_transaction_status,
+    las transacciones ya decididas no se modifican.
     
-    # Actualizar el estado
-    transaction.status = new_status
+    Args:
+        db: Sesión de base de datos
+        updates: (nuevo estado, máscara de reglas) por ID de transacción
+        
+    Returns:
+        Número de filas actualizadas (sin las ya decididas)
+    """
+    ids_por_decision: dict[tuple[TransactionStatus, int], list[int]] = {}
+    for transaction_id, decision in updates.items():
+        ids_por_decision.setdefault(decision, []).append(transaction_id)
+
+    filas = 0
+    for (new_status, rules_mask), ids in ids_por_decision.items():
+        filas += db.query(transaccion_model.Transaction).filter(
+            transaccion_model.Transaction.id.in_(ids),
+            transaccion_model.Transaction.status == TransactionStatus.PENDING
+        ).update(
+            {
+                transaccion_model.Transaction.status: new_status,
+                transaccion_model.Transaction.reglas_activadas: rules_mask,
+            },
+            synchronize_session=False
+        )
     db.commit()
-    db.refresh(transaction)
+    return filas
+
+
+def rule_hit_counts(
+    db: Session,
+    desde: datetime,
+    hasta: datetime,
+    period: AnalyticsPeriod
+) -> list[dict]:
+    """
+    Cuenta las activaciones de cada regla por período en [desde, hasta).
     
-    return transaction
\ No newline at end of file
+    Una sola consulta agrupada: el rango sobre 'hora' y el filtro
+    'reglas_activadas <> 0' se resuelven en el índice compuesto
+    (hora, reglas_activadas), y cada regla es un SUM sobre un AND de
+    bits de esa misma columna, sin leer las filas de la tabla.
+    
+    Returns:
+        Lista de {"periodo", "total_con_reglas", "reglas": {nombre: n}}
+    """
+    Transaction = transaccion_model.Transaction
+    formato = "%Y-%m-%d %H:00" if period == AnalyticsPeriod.HOUR else "%Y-%m-%d"
+    periodo = func.date_format(Transaction.hora, formato).label("periodo")
+    columnas = [
+        func.sum(case((Transaction.reglas_activadas.op("&")(bit) != 0, 1), else_=0)).label(name)
+        for name, bit in RULE_BITS.items()
+    ]
+
+    filas = db.query(periodo, func.count().label("total"), *columnas).filter(
+        Transaction.hora >= desde,
+        Transaction.hora < hasta,
+        Transaction.reglas_activadas != 0,
+    ).group_by(periodo).order_by(periodo).all()
+
+    return [
+        {
+            "periodo": fila.periodo,
+            "total_con_reglas": int(fila.total),
+            "reglas": {name: int(getattr(fila, name) or 0) for name in RULE_BITS},
+        }
+        for fila in filas
+    ]
@@ -0,0 +1,127 @@
+"""
+Benchmark de extremo a extremo de los modos de entrega de decisiones.
+
+Crea N transacciones por el mismo camino que el endpoint (BD + RabbitMQ),
+espera a que el fraud_service las decida y mide el throughput y el
+tiempo hasta la decisión. El modo lo fija el worker (FRAUD_RESULTS_MODE);
+aquí solo se etiqueta el resultado. Se ejecuta dentro de la red de
+docker-compose, una vez por modo:
+
+    docker compose exec transactions_service \\
+        python -m benchmarks.bench_modos_resultados --modo http -n 2000
+    # reiniciar fraud_service con FRAUD_RESULTS_MODE=queue
+    docker compose exec transactions_service \\
+        python -m benchmarks.bench_modos_resultados --modo queue -n 2000
+
+Cada corrida se añade a benchmarks/resultados/modos_resultados.jsonl y se
+compara con la última corrida del otro modo.
+"""
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from app.database import SessionLocal
+from app.models.transaccion_model import Transaction
+from app.schemas.transaccion_schema import TransactionCreate, TransactionStatus
+from app.services import transaccion_service
+from app.services.messaging import RabbitMQPublisher
+
+RESULTADOS = Path(__file__).parent / "resultados" / "modos_resultados.jsonl"
+UBICACIONES = ["La Paz", "Santa Cruz", "Cochabamba", "Panamá", "Suiza"]
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def ejecutar(n: int, cuentas: int, timeout: float, intervalo: float) -> dict:
+    publisher = RabbitMQPublisher()
+    db = SessionLocal()
+    publicado_en = {}
+    try:
+        inicio = time.perf_counter()
+        for i in range(n):
+            transaction = TransactionCreate(
+                cuenta_origen=f"BENCH-{random.randrange(cuentas):06d}",
+                cuenta_destino=f"BENCH-{random.randrange(cuentas):06d}",
+                monto=round(random.uniform(1, 8000), 2),
+                ubicacion=random.choice(UBICACIONES),
+            )
+            creada = transaccion_service.create_transaction_and_notify(db, publisher, transaction)
+            publicado_en[creada.id] = time.perf_counter()
+        fin_publicacion = time.perf_counter()
+
+        # Sondea la BD hasta que todas tengan un estado final
+        decidido_en = {}
+        pendientes = set(publicado_en)
+        limite = time.perf_counter() + timeout
+        while pendientes and time.perf_counter() < limite:
+            db.expire_all()
+            filas = db.query(Transaction.id).filter(
+                Transaction.id.in_(pendientes),
+                Transaction.status != TransactionStatus.PENDING,
+            ).all()
+            ahora = time.perf_counter()
+            for (transaction_id,) in filas:
+                decidido_en[transaction_id] = ahora
+                pendientes.discard(transaction_id)
+            if pendientes:
+                time.sleep(intervalo)
+    finally:
+        db.close()
+        publisher.close()
+
+    latencias = [(decidido_en[i] - publicado_en[i]) * 1000 for i in decidido_en]
+    fin = max(decidido_en.values(), default=fin_publicacion)
+    return {
+        "n": n,
+        "decididas": len(decidido_en),
+        "sin_decidir": n - len(decidido_en),
+        "publicacion_tps": round(n / (fin_publicacion - inicio), 1),
+        "extremo_a_extremo_tps": round(len(decidido_en) / (fin - inicio), 1),
+        "decision_p50_ms": round(percentil(latencias, 50), 1),
+        "decision_p95_ms": round(percentil(latencias, 95), 1),
+        "decision_p99_ms": round(percentil(latencias, 99), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modo", choices=["http", "queue"], required=True, help="FRAUD_RESULTS_MODE del worker")
+    parser.add_argument("-n", type=int, default=2000, help="Transacciones a crear")
+    parser.add_argument("--cuentas", type=int, default=500, help="Cuentas de origen distintas")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--intervalo", type=float, default=0.02, help="Intervalo de sondeo de la BD (s)")
+    args = parser.parse_args()
+
+    resultado = ejecutar(args.n, args.cuentas, args.timeout, args.intervalo)
+    resultado["modo"] = args.modo
+    resultado["fecha"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+    anterior = None
+    if RESULTADOS.exists():
+        for linea in RESULTADOS.read_text().splitlines():
+            corrida = json.loads(linea)
+            if corrida["modo"] != args.modo:
+                anterior = corrida
+    if anterior is not None:
+        print(
+            f"Comparado con '{anterior['modo']}' ({anterior['fecha']}): "
+            f"{anterior['extremo_a_extremo_tps']} -> {resultado['extremo_a_extremo_tps']} tps, "
+            f"p95 {anterior['decision_p95_ms']} -> {resultado['decision_p95_ms']} ms"
+        )
+
+    RESULTADOS.parent.mkdir(parents=True, exist_ok=True)
+    with RESULTADOS.open("a") as f:
+        f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Los tests importan el paquete 'app' desde transacciones/, con una BD
+# SQLite temporal y sin RabbitMQ (el lifespan no se ejecuta)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp(prefix='transacciones-tests-')) / 'transacciones.db'}"
+os.environ.setdefault("SECRET_KEY", "tests")
+os.environ.setdefault("RESULTS_CONSUMER_ENABLED", "false")
@@ -0,0 +1,85 @@
+"""
+Reentregas del worker de fraude. Su deduplicador vive en memoria: tras
+una caída o un reinicio empieza vacío y los mensajes que quedaron sin
+ack se evalúan de nuevo y vuelven a enviar su decisión (PATCH o cola de
+resultados). Solo la primera decisión de cada transacción se registra;
+por HTTP, pedir otra decisión para una ya decidida responde 409.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models.transaccion_model import Transaction
+from app.schemas.transaccion_schema import TransactionStatus
+from app.services import transaccion_service
+
+
+@pytest.fixture(scope="module", autouse=True)
+def tablas():
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
+
+
+def _pendiente() -> int:
+    with SessionLocal() as db:
+        transaccion = Transaction(cuenta_origen="ACC-1", cuenta_destino="ACC-2", monto=100.0, ubicacion="La Paz")
+        db.add(transaccion)
+        db.commit()
+        return transaccion.id
+
+
+def _estado(id_transaccion: int) -> tuple[TransactionStatus, int]:
+    with SessionLocal() as db:
+        transaccion = db.get(Transaction, id_transaccion)
+        return transaccion.status, transaccion.reglas_activadas
+
+
+def test_reentrega_por_http_tras_reiniciar_el_worker_no_cambia_la_decision():
+    cliente = TestClient(app)
+    id_transaccion = _pendiente()
+
+    primera = cliente.patch(f"/transactions/{id_transaccion}/status", json={"status": "APPROVED", "reglas_activadas": 0})
+    assert primera.status_code == 200
+    assert primera.json()["status"] == "APPROVED"
+
+    # La misma decisión otra vez (reentrega tras reiniciar el worker): 200
+    repetida = cliente.patch(f"/transactions/{id_transaccion}/status", json={"status": "APPROVED", "reglas_activadas": 0})
+    assert repetida.status_code == 200
+    assert repetida.json()["status"] == "APPROVED"
+
+    # Otra decisión (los perfiles del worker cambiaron): 409, sin cambios
+    reentrega = cliente.patch(f"/transactions/{id_transaccion}/status", json={"status": "REJECTED", "reglas_activadas": 1})
+    assert reentrega.status_code == 409
+    assert _estado(id_transaccion) == (TransactionStatus.APPROVED, 0)
+
+
+def test_cambio_manual_de_una_transaccion_decidida_es_409():
+    cliente = TestClient(app)
+    id_transaccion = _pendiente()
+    cliente.patch(f"/transactions/{id_transaccion}/status", json={"status": "REJECTED", "reglas_activadas": 1})
+
+    respuesta = cliente.patch(f"/transactions/{id_transaccion}/status", json={"status": "APPROVED", "reglas_activadas": 0})
+    assert respuesta.status_code == 409
+    assert "REJECTED" in respuesta.json()["detail"]
+    assert _estado(id_transaccion) == (TransactionStatus.REJECTED, 1)
+
+
+def test_decision_de_transaccion_inexistente_sigue_siendo_404():
+    respuesta = TestClient(app).patch("/transactions/999999/status", json={"status": "APPROVED", "reglas_activadas": 0})
+    assert respuesta.status_code == 404
+
+
+def test_reentrega_en_lote_solo_actualiza_las_pendientes():
+    decidida, pendiente = _pendiente(), _pendiente()
+    with SessionLocal() as db:
+        transaccion_service.apply_status_updates(db, {decidida: (TransactionStatus.REJECTED, 1)})
+        filas = transaccion_service.apply_status_updates(db, {
+            decidida: (TransactionStatus.APPROVED, 0),
+            pendiente: (TransactionStatus.APPROVED, 0),
+        })
+
+    assert filas == 1
+    assert _estado(decidida) == (TransactionStatus.REJECTED, 1)
+    assert _estado(pendiente) == (TransactionStatus.APPROVED, 0)
@@ -0,0 +1,31 @@
+"""
+Módulos copiados entre servicios: cada imagen de Docker solo ve su
+servicio (el contexto de build es services/<servicio>), así que el código
+común vive en cada uno. Este test falla si alguna copia diverge; al
+cambiar uno, se copia el archivo completo a los demás.
+"""
+from pathlib import Path
+
+import pytest
+
+SERVICIOS = Path(__file__).resolve().parent.parent / "services"
+
+COPIAS = {
+    "metrics": [
+        "gateway/metrics.py",
+        "auth/app/metrics.py",
+        "transacciones/app/metrics.py",
+        "fraud_service/app/metrics.py",
+    ],
+    "db_metrics": ["auth/app/services/db_metrics.py", "transacciones/app/services/db_metrics.py"],
+    "db_pool": ["auth/app/services/db_pool.py", "transacciones/app/services/db_pool.py"],
+    "codec": ["fraud_service/app/codec.py", "transacciones/app/services/codec.py"],
+}
+
+
+@pytest.mark.parametrize("modulo", sorted(COPIAS))
+def test_copias_identicas(modulo):
+    original, *copias = COPIAS[modulo]
+    esperado = (SERVICIOS / original).read_bytes()
+    distintas = [copia for copia in copias if (SERVICIOS / copia).read_bytes() != esperado]
+    assert not distintas, f"{', '.join(distintas)} difiere(n) de {original}"